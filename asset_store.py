@@ -0,0 +1,253 @@
+"""
+asset_store.py
+
+Fundos pré-preparados para cada formato de post. Cada imagem de base_images/
+(ou imagens/, images/) é recortada no centro e redimensionada UMA vez por
+formato (feed 4:5, quadrado, story 9:16) e guardada em cache/backgrounds/ já
+pronta para compor: RGB cru (padrão) ou WebP.
+
+A chave é o SHA-256 do conteúdo do arquivo fonte; o índice guarda (mtime, tamanho)
+para não precisar re-hashear a cada execução. Se o arquivo fonte mudar, o hash
+muda e o cache antigo é ignorado (e apagado no próximo prepare_all).
+
+Também guardamos variantes já escurecidas (DARKEN_LEVELS), equivalentes ao
+overlay preto semitransparente que os renderizadores aplicavam a cada post:
+o render começa direto do fundo escuro, em RGB, sem alpha_composite.
+
+Uso:
+    python asset_store.py              # prepara todos os fundos em todos os formatos
+    from asset_store import prepared_background
+    img = prepared_background("base_images/006.jpg", "feed", darken=0.38)
+"""
+
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+
+from PIL import Image, ImageOps
+
+FORMATS = {
+    "feed": (1080, 1350),
+    "square": (1080, 1080),
+    "story": (1080, 1920),
+}
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".webp")
+DEFAULT_FOLDERS = ["base_images", "imagens", "images"]
+
+ASSET_DIR = os.path.join("cache", "backgrounds")
+INDEX_FILE = os.path.join(ASSET_DIR, "index.json")
+ASSET_FORMAT = "raw"        # "raw" (mais rápido de carregar) ou "webp" (ocupa menos disco)
+WEBP_QUALITY = 92
+DARKEN_LEVELS = (0.0, 0.38)  # níveis de overlay preto preparados por padrão (0..1)
+
+_LOCK = threading.Lock()
+_index = None               # {caminho_abs: {"mtime": ns, "size": bytes, "sha": hex}}
+_listing = {}               # {pasta_abs: (mtime_ns, [arquivos])}
+
+
+# ---------- índice de hashes ----------
+
+def _load_index():
+    global _index
+    if _index is None:
+        try:
+            with open(INDEX_FILE, "r", encoding="utf-8") as f:
+                _index = json.load(f)
+        except Exception:
+            _index = {}
+    return _index
+
+
+def _save_index():
+    try:
+        os.makedirs(ASSET_DIR, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=ASSET_DIR, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(_index, f, indent=1)
+        os.replace(tmp, INDEX_FILE)
+    except Exception:
+        pass
+
+
+def _file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def source_hash(path):
+    """SHA-256 do arquivo fonte, re-hasheado só se mtime/tamanho mudarem."""
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    with _LOCK:
+        index = _load_index()
+        entry = index.get(path)
+        if entry and entry.get("mtime") == st.st_mtime_ns and entry.get("size") == st.st_size:
+            return entry["sha"]
+    sha = _file_sha256(path)
+    with _LOCK:
+        _load_index()[path] = {"mtime": st.st_mtime_ns, "size": st.st_size, "sha": sha}
+        _save_index()
+    return sha
+
+
+# ---------- listagem ----------
+
+def list_backgrounds(folders=None):
+    """Lista os fundos disponíveis; cada pasta só é relida se o mtime dela mudar."""
+    out = []
+    for folder in folders or DEFAULT_FOLDERS:
+        folder = os.path.abspath(folder)
+        try:
+            mtime = os.stat(folder).st_mtime_ns
+        except OSError:
+            continue
+        cached = _listing.get(folder)
+        if cached is None or cached[0] != mtime:
+            files = sorted(
+                os.path.join(folder, f) for f in os.listdir(folder)
+                if f.lower().endswith(IMAGE_EXTS)
+            )
+            cached = _listing[folder] = (mtime, files)
+        out.extend(cached[1])
+    return out
+
+
+# ---------- preparação ----------
+
+def _asset_path(sha, size, darken=0.0):
+    w, h = size
+    ext = "webp" if ASSET_FORMAT == "webp" else "rgb"
+    suffix = f"_d{_darken_alpha(darken)}" if darken else ""
+    return os.path.join(ASSET_DIR, f"{sha[:24]}_{w}x{h}{suffix}.{ext}")
+
+
+def _darken_alpha(level):
+    # mesmo arredondamento do antigo Image.new("RGBA", ..., (0, 0, 0, int(255 * level)))
+    return max(0, min(255, int(255 * level)))
+
+
+def darken(img, level):
+    """
+    Equivale a Image.alpha_composite(img, overlay preto com alpha 255*level),
+    mas como uma LUT de 256 entradas aplicada direto no RGB.
+    """
+    alpha = _darken_alpha(level)
+    if not alpha:
+        return img
+    keep = 255 - alpha
+    lut = [(v * keep + 127) // 255 for v in range(256)]
+    return img.point(lut * len(img.getbands()))
+
+
+def _write_asset(img, path):
+    os.makedirs(ASSET_DIR, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=ASSET_DIR, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        if ASSET_FORMAT == "webp":
+            img.save(f, format="WEBP", quality=WEBP_QUALITY, method=4)
+        else:
+            f.write(img.tobytes())
+    os.replace(tmp, path)
+
+
+def _read_asset(path, size):
+    if ASSET_FORMAT == "webp":
+        img = Image.open(path)
+        img.load()
+        return img.convert("RGB") if img.mode != "RGB" else img
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) != size[0] * size[1] * 3:
+        raise ValueError(f"asset corrompido: {path}")
+    return Image.frombytes("RGB", size, data)
+
+
+def crop_to_format(img, size):
+    """Recorte central + LANCZOS para o tamanho final, sem distorcer a proporção."""
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    return ImageOps.fit(img, size, Image.LANCZOS, centering=(0.5, 0.5))
+
+
+def _open_fitted(src_path, size):
+    img = Image.open(src_path)
+    # draft() deixa o decoder JPEG reduzir já na decodificação quando possível
+    if img.format == "JPEG":
+        img.draft("RGB", (size[0], size[1]))
+    return crop_to_format(img, size)
+
+
+def prepared_background(src_path, fmt="feed", darken=0.0):
+    """
+    Fundo pronto (RGB, tamanho do formato) para src_path, já escurecido em
+    `darken` (0..1) se pedido. fmt pode ser um nome de FORMATS ou uma tupla (w, h).
+    """
+    size = FORMATS[fmt] if isinstance(fmt, str) else tuple(fmt)
+    sha = source_hash(src_path)
+    path = _asset_path(sha, size, darken)
+    try:
+        return _read_asset(path, size)
+    except Exception:
+        pass
+    img = _build_asset(src_path, size, darken)
+    try:
+        _write_asset(img, path)
+    except Exception:
+        pass
+    return img
+
+
+def _build_asset(src_path, size, level):
+    if not level:
+        return _open_fitted(src_path, size)
+    # a variante escura parte da clara (também cacheada)
+    return darken(prepared_background(src_path, size), level)
+
+
+def prepare_all(folders=None, formats=None, levels=None, prune=None):
+    """
+    Prepara (ou confirma) todos os fundos em todos os formatos/níveis e apaga os
+    órfãos. O cache não sabe de que pasta veio cada fundo, então por padrão só
+    apaga quando roda sobre DEFAULT_FOLDERS: `asset_store.py imagens` não pode
+    levar junto os fundos de base_images/.
+    """
+    if prune is None:
+        prune = folders is None
+    formats = formats or list(FORMATS)
+    levels = DARKEN_LEVELS if levels is None else levels
+    keep = set()
+    count = 0
+    for src in list_backgrounds(folders):
+        try:
+            sha = source_hash(src)
+            for fmt in formats:
+                size = FORMATS[fmt] if isinstance(fmt, str) else tuple(fmt)
+                for level in levels:
+                    path = _asset_path(sha, size, level)
+                    if not os.path.exists(path):
+                        _write_asset(_build_asset(src, size, level), path)
+                        count += 1
+            keep.add(sha[:24])
+        except Exception as e:
+            print(f"⚠️ Não consegui preparar {src}: {e}")
+
+    if prune and os.path.isdir(ASSET_DIR):
+        for fname in os.listdir(ASSET_DIR):
+            if fname.endswith((".rgb", ".webp")) and fname.split("_", 1)[0] not in keep:
+                try:
+                    os.remove(os.path.join(ASSET_DIR, fname))
+                except OSError:
+                    pass
+    return count
+
+
+if __name__ == "__main__":
+    n = prepare_all(sys.argv[1:] or None)
+    print(f"✅ {n} fundos preparados em {ASSET_DIR}")
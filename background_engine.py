@@ -0,0 +1,192 @@
+"""
+background_engine.py
+
+Motor de fundos abstratos escuros (ruído + blur + gradiente + spotlight + vinheta)
+feito inteiramente com arrays NumPy. Cada camada é calculada de uma vez sobre a
+imagem inteira; só cruzamos para o PIL no final, com um único Image.fromarray.
+
+As camadas que não dependem da semente (gradiente, spotlight e vinheta) ficam
+num cache de máscaras: em memória no processo e em cache/masks/*.npy no disco,
+para que outros processos (lotes, pool de workers) só carreguem o arquivo.
+
+Uso:
+    from background_engine import make_background
+    img = make_background((1080, 1350), variation=0.8, vignette_strength=0.6)
+"""
+
+import os
+import tempfile
+
+import numpy as np
+from PIL import Image
+
+# raios (desvio padrão) equivalentes aos GaussianBlur do gerador original
+NOISE_BLUR = 18
+SPOTLIGHT_BLUR = 160
+FINISH_BLUR = 1
+
+# pesos dos Image.blend originais
+NOISE_BLEND = 0.8
+GRADIENT_BLEND = 0.28
+SPOTLIGHT_BLEND = 0.22
+BASE_LEVEL = 10
+
+# cache de máscaras (memória + disco)
+MASK_CACHE_DIR = os.path.join("cache", "masks")
+MASK_VERSION = 1            # incremente se mudar a geometria das máscaras
+_MASKS = {}
+
+
+# ---------- blur gaussiano vetorizado ----------
+
+def _box_sizes_for_gauss(sigma, n=3):
+    # n passes de box blur aproximam uma gaussiana de desvio padrão sigma
+    w_ideal = np.sqrt(12 * sigma * sigma / n + 1)
+    wl = int(np.floor(w_ideal))
+    if wl % 2 == 0:
+        wl -= 1
+    wu = wl + 2
+    m = round((12 * sigma * sigma - n * wl * wl - 4 * n * wl - 3 * n) / (-4 * wl - 4))
+    return [wl if i < m else wu for i in range(n)]
+
+
+def _box_blur_axis(a, r, axis):
+    if r < 1:
+        return a
+    a = np.moveaxis(a, axis, 0)
+    n = a.shape[0]
+    padded = np.pad(a, [(r + 1, r)] + [(0, 0)] * (a.ndim - 1), mode="edge")
+    c = np.cumsum(padded, axis=0, dtype=np.float64)
+    out = (c[2 * r + 1:2 * r + 1 + n] - c[:n]) / (2 * r + 1)
+    return np.moveaxis(out.astype(np.float32), 0, axis)
+
+
+def gaussian_blur(a, sigma):
+    """Blur gaussiano aproximado por três box blurs separáveis (O(N) por passe)."""
+    if sigma <= 0:
+        return a
+    for size in _box_sizes_for_gauss(sigma):
+        r = (size - 1) // 2
+        a = _box_blur_axis(a, r, 0)
+        a = _box_blur_axis(a, r, 1)
+    return a
+
+
+# ---------- cache de máscaras ----------
+
+def _mask_key(name, size, *params):
+    w, h = size
+    extra = "".join(f"_{p}" for p in params)
+    return f"{name}_v{MASK_VERSION}_{w}x{h}{extra}"
+
+
+def cached_mask(name, size, params, build):
+    """
+    Devolve a máscara `name` para (size, params), calculando com build() só na
+    primeira vez. Ordem: memória -> cache/masks/<chave>.npy -> build().
+    """
+    key = _mask_key(name, size, *params)
+    arr = _MASKS.get(key)
+    if arr is not None:
+        return arr
+
+    path = os.path.join(MASK_CACHE_DIR, key + ".npy")
+    try:
+        arr = np.load(path)
+        if arr.shape != (size[1], size[0]):
+            arr = None
+    except Exception:
+        arr = None
+
+    if arr is None:
+        arr = np.ascontiguousarray(build(), dtype=np.float32)
+        try:
+            os.makedirs(MASK_CACHE_DIR, exist_ok=True)
+            # grava em arquivo temporário e renomeia: seguro com vários processos
+            fd, tmp = tempfile.mkstemp(dir=MASK_CACHE_DIR, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, arr)
+            os.replace(tmp, path)
+        except Exception:
+            pass
+
+    arr.setflags(write=False)
+    _MASKS[key] = arr
+    return arr
+
+
+def clear_mask_cache(disk=False):
+    _MASKS.clear()
+    if disk and os.path.isdir(MASK_CACHE_DIR):
+        for fname in os.listdir(MASK_CACHE_DIR):
+            if fname.endswith(".npy"):
+                try:
+                    os.remove(os.path.join(MASK_CACHE_DIR, fname))
+                except OSError:
+                    pass
+
+
+# ---------- camadas fixas (dependem só do tamanho e das constantes) ----------
+
+def vertical_gradient(size):
+    # gradiente com foco no terço superior (mais claro em cima)
+    w, h = size
+    pos = np.arange(h, dtype=np.float32) / max(h - 1, 1)
+    col = np.clip(np.floor(30 + 180 * (1 - pos ** 1.6)), 0, 255)
+    return np.broadcast_to(col[:, None], (h, w)).astype(np.float32)
+
+
+def spotlight_mask(size):
+    # elipse no topo central, borrada com raio grande
+    w, h = size
+    rx = int(w * 0.25)
+    ry = int(h * 0.18)
+    x0, x1 = w // 2 - rx, w // 2 + rx
+    y0 = int(h * 0.03)
+    y1 = y0 + ry * 2
+    cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+    ax, ay = max((x1 - x0) / 2, 1), max((y1 - y0) / 2, 1)
+    yy, xx = np.ogrid[:h, :w]
+    inside = ((xx - cx) / ax) ** 2 + ((yy - cy) / ay) ** 2 <= 1.0
+    mask = np.where(inside, 255.0, 0.0).astype(np.float32)
+    return gaussian_blur(mask, SPOTLIGHT_BLUR)
+
+
+def vignette_mask(size, strength):
+    # 1.0 no centro, escurecendo nas bordas conforme a distância normalizada
+    w, h = size
+    yy, xx = np.ogrid[:h, :w]
+    dx = (xx - w / 2) / (w / 2)
+    dy = (yy - h / 2) / (h / 2)
+    v = np.floor(255 * (1 - strength * (dx * dx + dy * dy)))
+    return (np.clip(v, 0, 255) / 255.0).astype(np.float32)
+
+
+# ---------- fundo completo ----------
+
+def noise_layer(size, variation):
+    w, h = size
+    noise = np.random.randn(h, w) * 255 * variation
+    # mesmo "wrap" de 8 bits do astype(np.uint8) original, mas bem definido
+    noise = noise.astype(np.int32).astype(np.uint8).astype(np.float32)
+    return gaussian_blur(noise, NOISE_BLUR)
+
+
+def make_background(size, variation=0.8, vignette_strength=0.6, spotlight=True):
+    """
+    Retorna uma PIL.Image RGB (tons de cinza) do tamanho pedido (w, h).
+    Usa np.random global, então random_seed() / np.random.seed continuam valendo.
+    """
+    img = BASE_LEVEL * (1 - NOISE_BLEND) + noise_layer(size, variation) * NOISE_BLEND
+    gradient = cached_mask("gradient", size, (), lambda: vertical_gradient(size))
+    img = img * (1 - GRADIENT_BLEND) + gradient * GRADIENT_BLEND
+    if spotlight:
+        spot = cached_mask("spotlight", size, (f"r{SPOTLIGHT_BLUR}",), lambda: spotlight_mask(size))
+        img = img * (1 - SPOTLIGHT_BLEND) + spot * SPOTLIGHT_BLEND
+    vign = cached_mask("vignette", size, (f"s{vignette_strength}",),
+                       lambda: vignette_mask(size, vignette_strength))
+    img = img * vign
+    img = gaussian_blur(img, FINISH_BLUR)
+
+    gray = np.clip(img + 0.5, 0, 255).astype(np.uint8)
+    return Image.fromarray(np.repeat(gray[:, :, None], 3, axis=2))
@@ -0,0 +1,367 @@
+"""
+benchmark.py
+
+Benchmarks dos caminhos quentes de renderização e publicação, com sementes e
+frases fixas (curta / média / longa) para que duas execuções sejam comparáveis.
+
+Seções:
+- formats    tempo de render por formato (1080x1080, 1080x1350, 1080x1920):
+             fundo abstrato (make_background) e post completo (fundo preparado +
+             ajuste de fonte + texto + JPEG)
+- hot        generate_image (render completo, sem o render_cache, e acerto do
+             cache à parte), make_abstract_background, fit_text_to_box e
+             build_caption por tamanho de frase
+- corpus     collect_phrases: build a frio (banco novo) e leitura a quente
+- throughput imagens/s com 1..N processos (generate_image)
+- pipeline   latência de publicação (publish_pipeline) contra o Cloudinary e a
+             Graph API falsos de fake_servers.py
+- memória    pico de RSS do processo e dos filhos, anotado ao fim de cada seção
+
+O resultado vai para benchmarks/<data>.json (ou --out). --compare antigo.json
+mostra a variação de cada métrica em relação a uma execução anterior.
+
+Uso:
+    python benchmark.py                       # tudo
+    python benchmark.py --only formats hot --repeat 5
+    python benchmark.py --quick --compare benchmarks/20260101_120000.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+from PIL import ImageDraw
+
+SEED = 1234
+RESULTS_DIR = "benchmarks"
+SECTIONS = ("formats", "hot", "corpus", "throughput", "pipeline")
+FORMAT_SIZES = {"square": (1080, 1080), "feed": (1080, 1350), "story": (1080, 1920)}
+
+PHRASES = {
+    "short": "Recomeçar é coragem.",
+    "medium": "Ninguém vê a luta de quem decide recomeçar todos os dias, mas todos veem o resultado.",
+    "long": (
+        "Existe uma força silenciosa em quem cai, levanta e continua sem plateia: ela não pede "
+        "aplausos, não espera o momento perfeito e não negocia com o medo. Ela simplesmente "
+        "decide que amanhã vai ser diferente e faz o trabalho de hoje."
+    ),
+}
+
+
+def seed_all(seed=SEED):
+    random.seed(seed)
+    np.random.seed(seed % (2 ** 32))
+
+
+def peak_rss_mb():
+    # ru_maxrss vem em KB no Linux e em bytes no macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale,
+    }
+
+
+def timed(fn, repeat, setup=None):
+    """Roda fn() `repeat` vezes (cada uma com a semente fixa) e resume os tempos em ms."""
+    samples = []
+    for i in range(repeat):
+        seed_all(SEED + i)
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return summarize(samples)
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        "n": len(samples),
+        "min_ms": round(ordered[0], 3),
+        "median_ms": round(statistics.median(ordered), 3),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+
+# ---------- seções ----------
+
+def bench_formats(agent, tmp, repeat):
+    from asset_store import prepared_background
+    from background_engine import make_background
+    from text_layout import fit_text, line_height
+
+    bg = agent.choose_background()
+    out = {}
+    for name, size in FORMAT_SIZES.items():
+        def post(size=size):
+            img = prepared_background(bg, size, darken=agent.OVERLAY_DARKEN) if bg else make_background(size)
+            draw = ImageDraw.Draw(img)
+            box_w, box_h = size[0] - 200, int(size[1] * 0.6)
+            font, lines = fit_text(PHRASES["medium"], agent.PLAYFAIR, box_w, box_h, max_size=86)
+            y, lh = (size[1] - len(lines) * line_height(font, 1.1)) // 2, line_height(font, 1.1)
+            for line in lines:
+                draw.text((size[0] // 2, y), line, font=font, fill=(255, 255, 255), anchor="mt")
+                y += lh
+            img.save(os.path.join(tmp, f"format_{name}.jpg"), quality=95)
+
+        post()  # aquece caches (fundo preparado, máscaras, fontes)
+        out[name] = {
+            "size": list(size),
+            "background_engine": timed(lambda size=size: make_background(size), repeat),
+            "post": timed(post, repeat),
+        }
+    return out
+
+
+def bench_hot(agent, tmp, repeat):
+    import create_and_publish_local as local
+    import renderer
+
+    draw = ImageDraw.Draw(local.make_abstract_background((64, 64)))
+    box_w = local.IMAGE_SIZE[0] - 2 * local.TEXT_MARGIN
+    box_h = int(local.IMAGE_SIZE[1] * 0.58)
+    out = {
+        "make_abstract_background": timed(lambda: local.make_abstract_background(local.IMAGE_SIZE), repeat),
+    }
+    # acerto do render_cache num banco/diretório do tmp: não toca o cache/renders real
+    renderer.set_render_cache(os.path.join(tmp, "renders.db"), os.path.join(tmp, "renders"))
+    try:
+        for length, phrase in PHRASES.items():
+            def cached(p=phrase):
+                agent.generate_image(p, output_dir=tmp, filename="hot_cached.jpg", cache=True)
+
+            seed_all(SEED)
+            cached()    # miss: grava no cache; com a semente fixa as próximas são acertos
+            out[length] = {
+                "chars": len(phrase),
+                "generate_image": timed(
+                    lambda p=phrase: agent.generate_image(p, output_dir=tmp, filename="hot.jpg", cache=False),
+                    repeat),
+                "generate_image_cache_hit": timed(cached, repeat, setup=seed_all),
+                "fit_text_to_box": timed(
+                    lambda p=phrase: local.fit_text_to_box(draw, p, local.FONT_MAIN_PATH, box_w, box_h, 96), repeat),
+                "build_caption": timed(lambda p=phrase: agent.build_caption(p), max(repeat, 50)),
+            }
+    finally:
+        renderer.set_render_cache()
+    return out
+
+
+def bench_corpus(agent, tmp, repeat):
+    from phrase_corpus import POST_CATEGORIES, build_corpus, open_corpus, phrase_texts
+
+    def cold():
+        db = os.path.join(tmp, f"corpus_{time.perf_counter_ns()}.db")
+        conn = open_corpus(db)
+        build_corpus(conn, base_dir=agent.BASE_DIR, force=True)
+        count = len(phrase_texts(conn, POST_CATEGORIES))
+        conn.close()
+        return count
+
+    phrases = agent.collect_phrases()
+    return {
+        "phrases": len(phrases),
+        "cold_build": timed(cold, repeat),
+        "collect_phrases_warm": timed(agent.collect_phrases, max(repeat, 20)),
+    }
+
+
+def _throughput_worker(args):
+    phrase, out_dir, filename, seed = args
+    import recomeco_agent_auto as agent
+    seed_all(seed)
+    agent.generate_image(phrase, output_dir=out_dir, filename=filename, cache=False)
+    return filename
+
+
+def bench_throughput(agent, tmp, images, max_workers):
+    phrases = list(PHRASES.values())
+    out = {}
+    for workers in range(1, max_workers + 1):
+        tasks = [(phrases[i % len(phrases)], tmp, f"tp_{workers}_{i}.jpg", SEED + i) for i in range(images)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(_throughput_worker, tasks[:workers]))     # aquece os processos
+            t0 = time.perf_counter()
+            list(pool.map(_throughput_worker, tasks))
+            elapsed = time.perf_counter() - t0
+        out[str(workers)] = {"images": images, "seconds": round(elapsed, 3),
+                             "images_per_s": round(images / elapsed, 3)}
+    return out
+
+
+def bench_pipeline(agent, tmp, posts, ready_after):
+    import graph_api
+    import graph_rate_limit
+    from cloudinary_api import upload_image
+    from fake_servers import start_fake_cloudinary, start_fake_graph
+    from publish_pipeline import run_pipeline
+
+    graph, graph_url = start_fake_graph(ready_after=ready_after)
+    cloud, upload_url = start_fake_cloudinary()
+    old_base = graph_api.GRAPH_API_BASE
+    graph_api.GRAPH_API_BASE = graph_url
+    # orçamento folgado e estado à parte: o benchmark não mexe na cota real
+    graph_rate_limit.set_limiter(graph_rate_limit.GraphRateLimiter(
+        state_path=os.path.join(tmp, "quota.json"), calls_per_hour=1e6, call_burst=1e4,
+        publish_limit=10 ** 6, publish_burst=10 ** 6))
+    try:
+        images = []
+        for i in range(posts):
+            seed_all(SEED + i)
+            images.append(agent.generate_image(list(PHRASES.values())[i % 3], output_dir=tmp,
+                                               filename=f"pipe_{i}.jpg", cache=False))
+
+        def upload(path):
+            return upload_image(path, upload_url, "bench", use_cache=False)["secure_url"]
+
+        def one_by_one():
+            for path in images:
+                run_pipeline([{"image": path, "caption": "bench"}], upload, "1", "token")
+
+        t0 = time.perf_counter()
+        results = run_pipeline([{"image": p, "caption": "bench"} for p in images], upload, "1", "token")
+        wall = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        one_by_one()
+        sequential = time.perf_counter() - t0
+
+        per_post = [sum(r["timings"].values()) * 1000 for r in results]
+        stages = {}
+        for r in results:
+            for stage, seconds in r["timings"].items():
+                stages.setdefault(stage, []).append(seconds * 1000)
+        return {
+            "posts": posts,
+            "container_ready_after_s": ready_after,
+            "errors": sum(1 for r in results if r["error"]),
+            "wall_s": round(wall, 3),
+            "sequential_wall_s": round(sequential, 3),
+            "posts_per_min": round(posts / wall * 60, 2),
+            "per_post": summarize(per_post),
+            "stages": {k: summarize(v) for k, v in stages.items()},
+            "graph_calls": dict(graph.state.calls),
+        }
+    finally:
+        graph_api.GRAPH_API_BASE = old_base
+        graph_rate_limit.set_limiter(None)
+        graph.shutdown()
+        cloud.shutdown()
+
+
+# ---------- relatório ----------
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "commit": commit,
+        "seed": SEED,
+    }
+
+
+def flatten(data, prefix=""):
+    out = {}
+    for key, value in data.items():
+        name = f"{prefix}.{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            out.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            out[name] = value
+    return out
+
+
+def compare(old, new, threshold=0.10):
+    """Imprime a variação das métricas (de tempo/memória) que mudaram mais que `threshold`."""
+    a, b = flatten(old.get("results", {})), flatten(new.get("results", {}))
+    rows = []
+    for key in sorted(set(a) & set(b)):
+        # mediana (min/max/p95 oscilam demais com poucas repetições), vazão e memória
+        if not key.endswith(("median_ms", "wall_s", "images_per_s", "posts_per_min")) and "rss" not in key:
+            continue
+        if not a[key]:
+            continue
+        change = (b[key] - a[key]) / a[key]
+        if abs(change) >= threshold:
+            higher_is_better = key.endswith(("images_per_s", "posts_per_min"))
+            worse = change < 0 if higher_is_better else change > 0
+            rows.append((key, a[key], b[key], change, worse))
+    if not rows:
+        print(f"≈ Nenhuma métrica variou mais que {threshold:.0%}.")
+    for key, old_v, new_v, change, worse in rows:
+        print(f"{'🔺' if worse else '🟢'} {key}: {old_v:g} -> {new_v:g} ({change:+.1%})")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de renderização e publicação")
+    parser.add_argument("--only", nargs="+", choices=SECTIONS, help="Roda só estas seções.")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetições por medida.")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1), help="Máximo de processos no throughput.")
+    parser.add_argument("--images", type=int, default=24, help="Imagens por medida de throughput.")
+    parser.add_argument("--posts", type=int, default=10, help="Posts no benchmark do pipeline.")
+    parser.add_argument("--ready-after", type=float, default=0.5, help="Segundos até o container falso ficar FINISHED.")
+    parser.add_argument("--quick", action="store_true", help="Menos repetições/imagens (checagem rápida).")
+    parser.add_argument("--out", help="Arquivo JSON de saída (padrão: benchmarks/<data>.json).")
+    parser.add_argument("--compare", metavar="JSON", help="Compara com o resultado de uma execução anterior.")
+    args = parser.parse_args()
+    if args.quick:
+        args.repeat, args.images, args.posts = 2, 8, 4
+        args.workers = min(args.workers, 2)
+
+    import recomeco_agent_auto as agent
+
+    sections = args.only or SECTIONS
+    report = {"started_at": datetime.now().isoformat(timespec="seconds"), "env": environment(),
+              "args": vars(args), "results": {}, "peak_rss_mb": {}}
+    with tempfile.TemporaryDirectory(prefix="bench_") as tmp:
+        runners = {
+            "formats": lambda: bench_formats(agent, tmp, args.repeat),
+            "hot": lambda: bench_hot(agent, tmp, args.repeat),
+            "corpus": lambda: bench_corpus(agent, tmp, args.repeat),
+            "throughput": lambda: bench_throughput(agent, tmp, args.images, max(1, args.workers)),
+            "pipeline": lambda: bench_pipeline(agent, tmp, args.posts, args.ready_after),
+        }
+        for name in SECTIONS:
+            if name not in sections:
+                continue
+            print(f"⏱️ {name}...")
+            t0 = time.perf_counter()
+            report["results"][name] = runners[name]()
+            report["peak_rss_mb"][name] = peak_rss_mb()
+            print(f"   ok ({time.perf_counter() - t0:.1f}s, pico RSS {report['peak_rss_mb'][name]['self']:.0f} MB)")
+
+    out = args.out or os.path.join(RESULTS_DIR, datetime.now().strftime("%Y%m%d_%H%M%S") + ".json")
+    if os.path.dirname(out):
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"📄 Resultado em {out}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
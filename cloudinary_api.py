@@ -0,0 +1,82 @@
+"""
+cloudinary_api.py
+
+Upload de imagens para o Cloudinary (upload sem assinatura, com preset) que
+passa pelo upload_cache: se os mesmos bytes já foram enviados para o mesmo
+destino e a URL não expirou, devolve a resposta guardada sem subir nada.
+
+Uso:
+    from cloudinary_api import upload_image
+    resp = upload_image("post.jpg", CLOUDINARY_UPLOAD_URL, CLOUDINARY_UPLOAD_PRESET)
+    url = resp["secure_url"]        # resp["cached"] diz se veio do cache
+    forget_upload("post.jpg", CLOUDINARY_UPLOAD_URL, CLOUDINARY_UPLOAD_PRESET)   # URL recusada
+"""
+
+import os
+
+import http_client
+from upload_cache import (
+    UPLOAD_CACHE_DB, UPLOAD_TTL, content_hash, forget, lookup, open_upload_cache, store, target_key,
+)
+
+
+class UploadError(Exception):
+    def __init__(self, message, response=None):
+        super().__init__(message)
+        self.response = response
+
+
+def upload_image(path, upload_url, preset=None, timeout=60, use_cache=True,
+                 cache_db=UPLOAD_CACHE_DB, ttl=UPLOAD_TTL):
+    """
+    Sobe `path` e devolve o JSON do Cloudinary (secure_url, public_id, bytes...)
+    com "cached": True/False. Levanta UploadError se o Cloudinary recusar.
+    """
+    if not upload_url:
+        raise UploadError("Cloudinary não configurado (URL de upload vazia)")
+    with open(path, "rb") as f:
+        data = f.read()
+    sha = content_hash(data)
+    target = target_key(upload_url, preset)
+
+    conn = None
+    if use_cache:
+        try:
+            conn = open_upload_cache(cache_db)
+        except Exception as e:
+            print("⚠️ Cache de upload indisponível:", e)
+    try:
+        hit = lookup(conn, sha, target) if conn is not None else None
+        if hit:
+            return dict(hit, cached=True)
+
+        form = {"upload_preset": preset} if preset else {}
+        r = http_client.post(upload_url, files={"file": (os.path.basename(path), data)}, data=form,
+                             timeout=timeout)
+        try:
+            body = r.json()
+        except ValueError:
+            body = {"raw": r.text}
+        if r.status_code != 200 or not (body.get("secure_url") or body.get("url")):
+            raise UploadError(f"Erro ao enviar ao Cloudinary ({r.status_code}): {body}", response=body)
+
+        if conn is not None:
+            store(conn, sha, target, body, ttl=ttl)
+        return dict(body, cached=False)
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+def forget_upload(path, upload_url, preset=None, cache_db=UPLOAD_CACHE_DB):
+    """
+    Tira a URL guardada de `path` do upload_cache (o Instagram não conseguiu
+    baixá-la: asset apagado/expirado): o próximo upload_image sobe de novo.
+    """
+    with open(path, "rb") as f:
+        sha = content_hash(f.read())
+    conn = open_upload_cache(cache_db)
+    try:
+        forget(conn, sha, target_key(upload_url, preset))
+    finally:
+        conn.close()
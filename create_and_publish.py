@@ -1,14 +1,16 @@
 import os
 import random
-from PIL import Image, ImageDraw, ImageFont
 from datetime import datetime
-import requests
 import time
 from dotenv import load_dotenv
-import textwrap
 
+# antes dos módulos do projeto: eles leem o ambiente (.env) ao serem importados
 load_dotenv()
 
+import renderer
+from cloudinary_api import UploadError, upload_image
+from graph_api import graph_post, wait_for_container
+
 # ========================
 # CONFIGURAÇÕES DO PROJETO
 # ========================
@@ -19,6 +21,8 @@ FONTS_FOLDER = "fonts"
 FONT_CINZEL = os.path.join(FONTS_FOLDER, "Cinzel-VariableFont_wght.ttf")
 FONT_PLAYFAIR = os.path.join(FONTS_FOLDER, "PlayfairDisplay-Italic.ttf")
 
+TEMPLATE = renderer.get_template("photo", text={"font": FONT_CINZEL}, signature={"font": FONT_PLAYFAIR})
+
 INSTAGRAM_ACCESS_TOKEN = os.getenv("INSTAGRAM_ACCESS_TOKEN")
 INSTAGRAM_USER_ID = os.getenv("IG_USER_ID")
 CLOUDINARY_UPLOAD_URL = os.getenv("CLOUDINARY_UPLOAD_URL")
@@ -49,48 +53,10 @@ def create_post_image():
     frases = carregar_frases()
     frase = random.choice(frases)
 
-    original_path = pick_random_image()
-    img = Image.open(original_path)
-    draw = ImageDraw.Draw(img)
-
-    # Fonte
-    font_frase = ImageFont.truetype(FONT_CINZEL, 70)
-    font_assinatura = ImageFont.truetype(FONT_PLAYFAIR, 45)
-
-    # Quebra a frase se ficar grande demais
-    max_width = int(img.width * 0.85)
-    wrapped = []
-    for line in textwrap.wrap(frase, width=25):
-        wrapped.append(line)
-
-    # Calcula altura total
-    total_height = sum(draw.textbbox((0, 0), line, font=font_frase)[3] for line in wrapped)
-    y_start = (img.height - total_height) / 2 - 50
-
-    # Escreve cada linha centralizada
-    for line in wrapped:
-        bbox = draw.textbbox((0, 0), line, font=font_frase)
-        text_w = bbox[2] - bbox[0]
-        x = (img.width - text_w) / 2
-        draw.text((x, y_start), line, font=font_frase, fill=(255, 255, 255))
-        y_start += bbox[3]
-
-    # Assinatura centralizada embaixo
-    assinatura = "@iamjulianocezarh"
-    bbox2 = draw.textbbox((0, 0), assinatura, font=font_assinatura)
-    sig_w = bbox2[2] - bbox2[0]
-    sx = (img.width - sig_w) / 2
-    sy = img.height - bbox2[3] - 60
-
-    draw.text((sx, sy), assinatura, font=font_assinatura, fill=(255, 255, 255))
-
-    # Salva imagem
-    if not os.path.exists(GENERATED_FOLDER):
-        os.makedirs(GENERATED_FOLDER)
-
+    # template "photo" do renderer: a foto no tamanho original, frase em Cinzel e assinatura
     filename = f"post_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
-    save_path = os.path.join(GENERATED_FOLDER, filename)
-    img.save(save_path, quality=95)
+    save_path = renderer.render_to_file(frase, TEMPLATE, background=pick_random_image(),
+                                        output_dir=GENERATED_FOLDER, filename=filename)
 
     # ===============================
     # NARRATIVA AUTOMÁTICA DA LEGENDA
@@ -125,15 +91,9 @@ def create_post_image():
 # UPLOAD PARA CLOUDINARY
 # ==========================================
 def upload_to_cloudinary(image_path):
-    with open(image_path, "rb") as img_file:
-        response = requests.post(
-            CLOUDINARY_UPLOAD_URL,
-            files={"file": img_file},
-            data={"upload_preset": os.getenv("CLOUDINARY_UPLOAD_PRESET")}
-        )
-
-    result = response.json()
-    if "secure_url" not in result:
+    try:
+        result = upload_image(image_path, CLOUDINARY_UPLOAD_URL, os.getenv("CLOUDINARY_UPLOAD_PRESET"))
+    except UploadError:
         raise Exception("Erro ao enviar ao Cloudinary 🚫")
 
     return result["secure_url"]
@@ -144,7 +104,7 @@ def upload_to_cloudinary(image_path):
 # ==========================================
 def post_to_instagram(image_url, caption):
 
-    creation = requests.post(
+    creation = graph_post(
         f"https://graph.facebook.com/v20.0/{INSTAGRAM_USER_ID}/media",
         data={
             "image_url": image_url,
@@ -158,9 +118,10 @@ def post_to_instagram(image_url, caption):
         raise Exception("Falha ao criar mídia")
 
     media_id = creation["id"]
-    time.sleep(5)
+    # espera o container ficar FINISHED (levanta PublishError se falhar)
+    wait_for_container(media_id, INSTAGRAM_ACCESS_TOKEN)
 
-    publish = requests.post(
+    publish = graph_post(
         f"https://graph.facebook.com/v20.0/{INSTAGRAM_USER_ID}/media_publish",
         data={
             "creation_id": media_id,
@@ -19,13 +19,16 @@ Como usar:
 Ajuste parâmetros no bloco CONFIG abaixo.
 """
 
-from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageOps
 import numpy as np
 import os
 import random
 import uuid
 from datetime import datetime
 
+import renderer
+from background_engine import make_background
+from text_layout import fit_text, wrap_lines
+
 # -------------------- CONFIG --------------------
 IMAGE_SIZE = (1080, 1080)              # (width, height)
 OUTPUT_DIR = "generated_posts"
@@ -47,7 +50,7 @@ TEXT_MARGIN = 120           # margem lateral para o bloco de texto
 LINE_SPACING = 1.08         # multiplicador do tamanho da linha
 
 # geração
-NUM_TRIES = 6               # tentativas para ajustar o tamanho da fonte
+MIN_FONT_SIZE = 16          # menor tamanho aceito ao ajustar a fonte ao box
 # ------------------------------------------------
 
 os.makedirs(OUTPUT_DIR, exist_ok=True)
@@ -62,65 +65,13 @@ def random_seed():
 
 
 def make_abstract_background(size):
-    w, h = size
-    # gerando ruído base
-    noise = np.random.randn(h, w) * 255 * BACKGROUND_VARIATION
-    noise = noise.astype(np.uint8)
-    img = Image.fromarray(noise, mode="L")
-
-    # aplicar blur pesado para formar nuvens abstratas
-    img = img.filter(ImageFilter.GaussianBlur(radius=18))
-
-    # converter para RGB e aplicar gradiente suave vertical (escuro no topo)
-    base = Image.new("RGB", (w, h), (10, 10, 10))
-    img_rgb = Image.merge("RGB", (img, img, img))
-    img_rgb = Image.blend(base, img_rgb, 0.8)
-
-    # gradiente vertical leve (mais claro no centro superior)
-    grad = Image.new("L", (1, h))
-    for y in range(h):
-        # gradiente com foco no terço superior
-        pos = y / (h - 1)
-        val = int(30 + 180 * (1 - (pos ** 1.6)))
-        grad.putpixel((0, y), max(0, min(255, val)))
-    grad = grad.resize((w, h))
-    grad_rgb = Image.merge("RGB", (grad, grad, grad))
-    img_rgb = Image.blend(img_rgb, grad_rgb, 0.28)
-
-    # spotlight no topo central (opcional)
-    if SPOTLIGHT:
-        spotlight = Image.new("L", (w, h), 0)
-        draw = ImageDraw.Draw(spotlight)
-        rx = int(w * 0.25)
-        ry = int(h * 0.18)
-        x0 = w // 2 - rx
-        y0 = int(h * 0.03)
-        x1 = w // 2 + rx
-        y1 = y0 + ry * 2
-        draw.ellipse([x0, y0, x1, y1], fill=255)
-        spotlight = spotlight.filter(ImageFilter.GaussianBlur(radius=160))
-        spotlight_rgb = Image.merge("RGB", (spotlight, spotlight, spotlight))
-        img_rgb = ImageChops = None
-        img_rgb = Image.blend(img_rgb, spotlight_rgb, 0.22)
-
-    # vinheta para escurecer bordas
-    vign = Image.new("L", (w, h), 255)
-    for y in range(h):
-        for x in range(w):
-            # distância do centro normalizada
-            dx = (x - w / 2) / (w / 2)
-            dy = (y - h / 2) / (h / 2)
-            d = np.sqrt(dx * dx + dy * dy)
-            # curva para vinheta
-            v = int(255 * (1 - VIGNETTE_STRENGTH * (d ** 2)))
-            vign.putpixel((x, y), max(0, min(255, v)))
-    img_rgb.putalpha(vign)
-    background = Image.new("RGB", (w, h), (0, 0, 0))
-    background.paste(img_rgb, (0, 0), img_rgb.split()[-1])
-
-    # pequenas correções: contrast, leve granulação
-    background = background.filter(ImageFilter.GaussianBlur(radius=1))
-    return background
+    # fundo calculado em arrays NumPy (ver background_engine.py)
+    return make_background(
+        size,
+        variation=BACKGROUND_VARIATION,
+        vignette_strength=VIGNETTE_STRENGTH,
+        spotlight=SPOTLIGHT,
+    )
 
 
 # ---------- gerador de frases no estilo do projeto ----------
@@ -168,100 +119,45 @@ def generate_phrase():
 # ---------- funções de texto e layout ----------
 
 def wrap_text(text, draw, font, max_width):
-    words = text.split()
-    lines = []
-    cur = ""
-    for w in words:
-        test = (cur + " " + w).strip()
-        wsize = draw.textsize(test, font=font)[0]
-        if wsize <= max_width:
-            cur = test
-        else:
-            if cur:
-                lines.append(cur)
-            cur = w
-    if cur:
-        lines.append(cur)
-    return lines
+    # larguras vêm do cache de glifos (text_layout), sem rasterizar
+    return wrap_lines(text, font, max_width)
 
 
 def fit_text_to_box(draw, text, font_path, box_width, box_height, starting_size=72):
-    # tenta reduzir a fonte até caber no box (tentações limitadas)
-    size = starting_size
-    for i in range(NUM_TRIES):
-        font = ImageFont.truetype(font_path, size=size)
-        lines = wrap_text(text, draw, font, box_width)
-        line_h = font.getsize("A")[1] * LINE_SPACING
-        total_h = len(lines) * line_h
-        max_line_w = max([draw.textsize(l, font=font)[0] for l in lines]) if lines else 0
-        if total_h <= box_height and max_line_w <= box_width:
-            return font, lines
-        size = int(size * 0.84)
-        if size < 18:
-            break
-    # fallback: return the smallest tested font
-    font = ImageFont.truetype(font_path, size=max(size, 16))
-    lines = wrap_text(text, draw, font, box_width)
-    return font, lines
+    # busca binária pelo maior tamanho (até starting_size) que cabe no box
+    return fit_text(text, font_path, box_width, box_height,
+                    max_size=starting_size, min_size=MIN_FONT_SIZE, spacing=LINE_SPACING)
 
 
 # ---------- geração final da imagem ----------
 
+# template "abstract_square" do renderer com os parâmetros do CONFIG acima
+TEMPLATE = renderer.get_template(
+    "abstract_square",
+    size=IMAGE_SIZE,
+    background={"variation": BACKGROUND_VARIATION, "vignette": VIGNETTE_STRENGTH, "spotlight": SPOTLIGHT},
+    text={"font": FONT_MAIN_PATH, "fit": (MIN_FONT_SIZE, 96), "spacing": LINE_SPACING, "color": TEXT_COLOR,
+          # área do bloco de texto: retângulo central, topo um pouco acima do centro
+          "box": (TEXT_MARGIN, 0.22, IMAGE_SIZE[0] - 2 * TEXT_MARGIN, 0.58)},
+    signature={"text": SIGNATURE, "font": [FONT_SIG_PATH, FONT_MAIN_PATH], "color": SIG_COLOR,
+               "bottom": IMAGE_SIZE[1] - int(IMAGE_SIZE[1] * 0.92)},
+    output={"dir": OUTPUT_DIR},
+)
+
+
 def create_post_image(save=True, phrase=None):
     random_seed()
     if phrase is None:
         phrase = generate_phrase()
 
-    img = make_abstract_background(IMAGE_SIZE)
-    draw = ImageDraw.Draw(img)
-    w, h = IMAGE_SIZE
-
-    # área disponível para o bloco de texto (um retângulo central)
-    box_w = w - 2 * TEXT_MARGIN
-    box_h = int(h * 0.58)
-    # posição do topo do bloco de texto (um pouco acima do centro)
-    box_x = TEXT_MARGIN
-    box_y = int(h * 0.22)
-
-    # ajustar fonte principal para caber
     if not os.path.exists(FONT_MAIN_PATH):
         raise FileNotFoundError(f"Fonte principal não encontrada: {FONT_MAIN_PATH}")
-    font_main, lines = fit_text_to_box(draw, phrase, FONT_MAIN_PATH, box_w, box_h, starting_size=96)
-
-    # calcular posição vertical do bloco para centralizar na área
-    line_h = font_main.getsize("A")[1] * LINE_SPACING
-    total_h = len(lines) * line_h
-    start_y = box_y + max(0, (box_h - total_h) // 2)
-
-    # desenhar cada linha alinhada à esquerda, mas posicionada no centro horizontal da área de texto
-    text_x = box_x
-    y = start_y
-    for line in lines:
-        draw.text((text_x, y), line, font=font_main, fill=TEXT_COLOR)
-        y += line_h
-
-    # assinatura pequena no rodapé central
-    sig_font = None
-    if os.path.exists(FONT_SIG_PATH):
-        try:
-            sig_font = ImageFont.truetype(FONT_SIG_PATH, size=28)
-        except Exception:
-            sig_font = None
-    if sig_font is None:
-        sig_font = ImageFont.truetype(FONT_MAIN_PATH, size=26)
-
-    sig_w, sig_h = draw.textsize(SIGNATURE, font=sig_font)
-    sig_x = (w - sig_w) // 2
-    sig_y = int(h * 0.92) - sig_h
-    draw.text((sig_x, sig_y), SIGNATURE, font=sig_font, fill=SIG_COLOR)
+    img = renderer.render(phrase, TEMPLATE)
 
     # salvar
     if save:
         fname = datetime.utcnow().strftime("%Y%m%d_%H%M%S") + "_" + str(uuid.uuid4())[:8] + ".jpg"
-        out_path = os.path.join(OUTPUT_DIR, fname)
-        # salvar com qualidade
-        img.save(out_path, quality=92, optimize=True)
-        return out_path, phrase
+        return renderer.save_image(img, TEMPLATE, filename=fname), phrase
     return None, phrase
 
 
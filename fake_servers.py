@@ -0,0 +1,236 @@
+"""
+fake_servers.py
+
+Servidores HTTP locais que imitam as APIs externas, para testar e medir o
+pipeline de publicação sem tocar no Instagram de verdade.
+
+Graph API falsa:
+- POST /{ig-user}/media          cria container (fica IN_PROGRESS por `ready_after` s)
+- GET  /{creation-id}?fields=... devolve status_code (IN_PROGRESS / FINISHED / PUBLISHED)
+- POST /{ig-user}/media_publish  publica se FINISHED; senão erro 9007 como a API real
+- toda resposta traz X-App-Usage; com `call_budget` > 0, passar de N chamadas
+  por hora devolve o erro #4 (limite do app)
+
+Cloudinary falso:
+- POST /image/upload             aceita qualquer corpo (multipart) e devolve secure_url
+
+Uso:
+    python fake_servers.py --port 8765 --ready-after 3
+    # e no .env: GRAPH_API_URL=http://127.0.0.1:8765
+    #            CLOUDINARY_UPLOAD_URL=http://127.0.0.1:8766/image/upload
+
+    from fake_servers import start_fake_graph
+    server, url = start_fake_graph(ready_after=0.5)
+    ...
+    server.shutdown()
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import re
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+_VERSION_PREFIX = re.compile(r"^/v\d+(\.\d+)?")
+
+
+class FakeGraphState:
+    def __init__(self, ready_after=2.0, fail_every=0, call_budget=0):
+        self.ready_after = ready_after
+        self.fail_every = fail_every        # a cada N containers, um termina em ERROR
+        self.call_budget = call_budget      # chamadas por hora (0 = sem limite)
+        self.call_times = deque()
+        self.lock = threading.Lock()
+        self.ids = itertools.count(17900000000000001)
+        self.containers = {}                # creation_id -> dict
+        self.published = []                 # [(media_id, creation_id, caption)]
+        self.calls = {"media": 0, "status": 0, "publish": 0}
+
+    def status(self, creation_id):
+        c = self.containers.get(creation_id)
+        if c is None:
+            return None
+        if c["status"] == "IN_PROGRESS" and time.monotonic() - c["created"] >= self.ready_after:
+            c["status"] = "ERROR" if c["fail"] else "FINISHED"
+        return c["status"]
+
+    def usage(self):
+        """Registra uma chamada e devolve o % de uso da última hora."""
+        now = time.monotonic()
+        self.call_times.append(now)
+        while self.call_times and self.call_times[0] <= now - 3600:
+            self.call_times.popleft()
+        if not self.call_budget:
+            return 0
+        return int(100 * len(self.call_times) / self.call_budget)
+
+
+class FakeGraphHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive, como a API real
+    disable_nagle_algorithm = True
+    state = None                    # FakeGraphState, definido em start_fake_graph
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send(self, code, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _app_usage(self):
+        # como a API real: % de uso na hora e, estourado, o erro #4 em vez da resposta
+        with self.state.lock:
+            pct = self.state.usage()
+        headers = {"X-App-Usage": json.dumps({"call_count": pct, "total_cputime": 0, "total_time": 0})}
+        if pct > 100:
+            self._send(400, {"error": {"message": "(#4) Application request limit reached", "code": 4}}, headers)
+            return None
+        return headers
+
+    def _path(self):
+        return _VERSION_PREFIX.sub("", urlparse(self.path).path).rstrip("/")
+
+    def _form(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length).decode("utf-8") if length else ""
+        form = {k: v[0] for k, v in parse_qs(raw).items()}
+        form.update({k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()})
+        return form
+
+    def do_GET(self):
+        st = self.state
+        creation_id = self._path().lstrip("/")
+        headers = self._app_usage()
+        if headers is None:
+            return
+        with st.lock:
+            st.calls["status"] += 1
+            status = st.status(creation_id)
+        if status is None:
+            return self._send(400, {"error": {"message": "Unsupported get request", "code": 100}}, headers)
+        self._send(200, {"status_code": status, "status": status, "id": creation_id}, headers)
+
+    def do_POST(self):
+        st = self.state
+        path = self._path()
+        form = self._form()
+        headers = self._app_usage()
+        if headers is None:
+            return
+        if not form.get("access_token"):
+            return self._send(400, {"error": {"message": "An access token is required", "code": 104}}, headers)
+
+        if path.endswith("/media"):
+            if not form.get("image_url"):
+                return self._send(400, {"error": {"message": "image_url is required", "code": 100}}, headers)
+            with st.lock:
+                st.calls["media"] += 1
+                creation_id = str(next(st.ids))
+                n = len(st.containers) + 1
+                st.containers[creation_id] = {
+                    "created": time.monotonic(),
+                    "status": "IN_PROGRESS",
+                    "caption": form.get("caption", ""),
+                    "image_url": form["image_url"],
+                    "fail": bool(st.fail_every and n % st.fail_every == 0),
+                }
+            return self._send(200, {"id": creation_id}, headers)
+
+        if path.endswith("/media_publish"):
+            creation_id = form.get("creation_id", "")
+            with st.lock:
+                st.calls["publish"] += 1
+                status = st.status(creation_id)
+                if status != "FINISHED":
+                    return self._send(400, {"error": {
+                        "message": "Media ID is not available", "code": 9007,
+                        "error_subcode": 2207027}}, headers)
+                st.containers[creation_id]["status"] = "PUBLISHED"
+                media_id = str(next(st.ids))
+                st.published.append((media_id, creation_id, st.containers[creation_id]["caption"]))
+            return self._send(200, {"id": media_id}, headers)
+
+        self._send(404, {"error": {"message": "Unknown path", "code": 803}}, headers)
+
+
+class FakeCloudinaryHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    state = None            # dict com "uploads" e "bytes", definido em start_fake_cloudinary
+    delay = 0.0             # latência simulada por upload (s)
+
+    def log_message(self, fmt, *args):
+        pass
+
+    _send = FakeGraphHandler._send
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        if not urlparse(self.path).path.rstrip("/").endswith("/upload") or not body:
+            return self._send(400, {"error": {"message": "Missing required parameter - file"}})
+        if self.delay:
+            time.sleep(self.delay)
+        digest = hashlib.sha256(body).hexdigest()[:20]
+        with self.state["lock"]:
+            self.state["uploads"] += 1
+            self.state["bytes"] += len(body)
+        host = self.headers.get("Host", "127.0.0.1")
+        url = f"http://{host}/res/{digest}.jpg"
+        self._send(200, {"public_id": digest, "secure_url": url, "url": url, "bytes": len(body)})
+
+
+def _serve(handler_cls, host, port):
+    server = ThreadingHTTPServer((host, port), handler_cls)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def start_fake_graph(host="127.0.0.1", port=0, ready_after=2.0, fail_every=0, call_budget=0):
+    """Sobe a Graph API falsa numa thread. Devolve (server, base_url); server.state tem o estado."""
+    state = FakeGraphState(ready_after=ready_after, fail_every=fail_every, call_budget=call_budget)
+    handler = type("Handler", (FakeGraphHandler,), {"state": state})
+    server, url = _serve(handler, host, port)
+    server.state = state
+    return server, url
+
+
+def start_fake_cloudinary(host="127.0.0.1", port=0, delay=0.0):
+    """Sobe o Cloudinary falso. Devolve (server, upload_url); server.state conta uploads e bytes."""
+    state = {"lock": threading.Lock(), "uploads": 0, "bytes": 0}
+    handler = type("Handler", (FakeCloudinaryHandler,), {"state": state, "delay": delay})
+    server, url = _serve(handler, host, port)
+    server.state = state
+    return server, f"{url}/image/upload"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Graph API falsa para testes locais")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--ready-after", type=float, default=2.0, help="segundos até o container ficar FINISHED")
+    parser.add_argument("--fail-every", type=int, default=0, help="a cada N containers, um termina em ERROR")
+    parser.add_argument("--call-budget", type=int, default=0, help="chamadas por hora antes do erro #4 (0 = sem limite)")
+    args = parser.parse_args()
+    server, url = start_fake_graph(args.host, args.port, args.ready_after, args.fail_every, args.call_budget)
+    cloud, upload_url = start_fake_cloudinary(args.host, args.port + 1)
+    print(f"🧪 Graph API falsa em {url} (GRAPH_API_URL={url})")
+    print(f"🧪 Cloudinary falso em {upload_url} (CLOUDINARY_UPLOAD_URL={upload_url})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        cloud.shutdown()
@@ -0,0 +1,90 @@
+"""
+font_cache.py
+
+Registro de fontes do processo inteiro. Cada ImageFont.truetype relê e parseia o
+arquivo TTF (a Playfair tem ~280 KB); aqui cada (arquivo, tamanho, eixos de
+variação) é carregado uma única vez e reaproveitado por todos os renderizadores.
+Despejo LRU para não crescer sem limite em lotes com muitos tamanhos diferentes.
+
+Uso:
+    from font_cache import get_font
+    font = get_font("fonts/PlayfairDisplay-Italic.ttf", 72)
+    bold = get_font("fonts/Cinzel-VariableFont_wght.ttf", 70, axes={"Weight": 700})
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+from PIL import ImageFont
+
+MAX_FONTS = 64              # quantos objetos de fonte manter vivos
+
+_FONTS = OrderedDict()
+_LOCK = threading.Lock()
+_STATS = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def _axes_key(axes):
+    # dict {"Weight": 700}, lista [700] ou nome de estilo ("Bold")
+    if not axes:
+        return ()
+    if isinstance(axes, dict):
+        return tuple(sorted(axes.items()))
+    if isinstance(axes, (str, bytes)):
+        return (axes,)
+    return tuple(axes)
+
+
+def _apply_axes(font, axes):
+    if isinstance(axes, (str, bytes)):
+        font.set_variation_by_name(axes)
+    elif isinstance(axes, dict):
+        values = []
+        for axis in font.get_variation_axes():
+            name = axis.get("name")
+            if isinstance(name, bytes):
+                name = name.decode("utf-8", "ignore")
+            values.append(axes.get(name, axis.get("default")))
+        font.set_variation_by_axes(values)
+    else:
+        font.set_variation_by_axes(list(axes))
+
+
+def get_font(path, size, axes=None):
+    """
+    Devolve um FreeTypeFont compartilhado para (path, size, axes).
+    Levanta a mesma exceção do ImageFont.truetype se o arquivo não abrir.
+    Não altere o objeto devolvido (ex.: set_variation_*): ele é compartilhado.
+    """
+    key = (os.path.abspath(path), int(size), _axes_key(axes))
+    with _LOCK:
+        font = _FONTS.get(key)
+        if font is not None:
+            _FONTS.move_to_end(key)
+            _STATS["hits"] += 1
+            return font
+
+    font = ImageFont.truetype(path, int(size))
+    if axes:
+        _apply_axes(font, axes)
+    font.axes_key = key[2]      # identifica a variação (ex.: chave do text_sprites)
+
+    with _LOCK:
+        _STATS["misses"] += 1
+        _FONTS[key] = font
+        _FONTS.move_to_end(key)
+        while len(_FONTS) > MAX_FONTS:
+            _FONTS.popitem(last=False)
+            _STATS["evictions"] += 1
+    return font
+
+
+def font_cache_stats():
+    with _LOCK:
+        return dict(_STATS, size=len(_FONTS))
+
+
+def clear_font_cache():
+    with _LOCK:
+        _FONTS.clear()
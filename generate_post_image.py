@@ -1,11 +1,15 @@
 import os
 import time
-import requests
 import subprocess
 from dotenv import load_dotenv
 
+# antes dos módulos do projeto: eles leem o ambiente (.env) ao serem importados
 load_dotenv()
 
+from cloudinary_api import UploadError, upload_image
+from graph_api import graph_post, wait_for_container
+from ledger import is_used, mark_used, open_ledger
+
 # ===============================
 # CONFIGURAÇÕES
 # ===============================
@@ -18,7 +22,7 @@ INSTAGRAM_ID = os.getenv("INSTAGRAM_ID")
 ACCESS_TOKEN = os.getenv("ACCESS_TOKEN")
 
 GENERATED_FOLDER = "generated_images"
-USED_IMAGES_FILE = "used_images.txt"
+LEDGER_DB = "ledger.db"      # substitui o antigo used_images.txt (migrado na 1ª abertura)
 
 # ===============================
 # FUNÇÕES
@@ -40,33 +44,31 @@ def pegar_ultima_imagem():
     print(f"✅ Imagem selecionada: {caminho}")
     return caminho
 
+_ledger = None   # (pid, conexão)
+
+def get_ledger():
+    # uma conexão por processo, aberta na primeira consulta
+    global _ledger
+    if _ledger is None or _ledger[0] != os.getpid():
+        _ledger = (os.getpid(), open_ledger(LEDGER_DB))
+    return _ledger[1]
+
 def imagem_ja_usada(caminho):
-    if not os.path.exists(USED_IMAGES_FILE):
-        return False
-    with open(USED_IMAGES_FILE, "r") as f:
-        usadas = f.read().splitlines()
-    return os.path.basename(caminho) in usadas
+    return is_used(get_ledger(), "image", caminho)
 
 def marcar_como_usada(caminho):
-    with open(USED_IMAGES_FILE, "a") as f:
-        f.write(os.path.basename(caminho) + "\n")
+    mark_used(get_ledger(), "image", caminho)
 
 def upload_cloudinary(caminho):
     print("🌩 Enviando imagem para Cloudinary...")
 
     url_upload = CLOUDINARY_UPLOAD_URL.format(cloud_name=CLOUD_NAME)
 
-    with open(caminho, "rb") as file:
-        response = requests.post(
-            url_upload,
-            files={"file": file},
-            data={"upload_preset": CLOUD_PRESET}
-        )
-
-    if response.status_code != 200:
-        raise Exception(f"Erro ao enviar para Cloudinary: {response.text}")
+    try:
+        img_url = upload_image(caminho, url_upload, CLOUD_PRESET)["secure_url"]
+    except UploadError as e:
+        raise Exception(f"Erro ao enviar para Cloudinary: {e}")
 
-    img_url = response.json()["secure_url"]
     print(f"✅ Upload feito: {img_url}")
     return img_url
 
@@ -80,7 +82,7 @@ def criar_midia(img_url):
         "access_token": ACCESS_TOKEN
     }
 
-    response = requests.post(create_url, data=params)
+    response = graph_post(create_url, data=params)
 
     if response.status_code != 200:
         raise Exception(f"Erro ao criar mídia: {response.text}")
@@ -98,7 +100,7 @@ def publicar_midia(creation_id):
         "access_token": ACCESS_TOKEN
     }
 
-    response = requests.post(publish_url, data=params)
+    response = graph_post(publish_url, data=params)
 
     if response.status_code != 200:
         raise Exception(f"Erro ao publicar mídia: {response.text}")
@@ -123,7 +125,7 @@ def executar():
     creation_id = criar_midia(img_url)
 
     print("⏳ Aguardando processamento da mídia...")
-    time.sleep(10)
+    wait_for_container(creation_id, ACCESS_TOKEN)
 
     publicar_midia(creation_id)
 
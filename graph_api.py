@@ -0,0 +1,190 @@
+"""
+graph_api.py
+
+Publicação no Instagram Graph API sem sleeps fixos. Depois de criar o container
+(POST /{ig-user}/media), consultamos o status_code dele (a mesma consulta do
+src/check_media_status.py) com backoff exponencial + jitter e publicamos assim
+que o status chega a FINISHED.
+
+Estados: CREATED -> IN_PROGRESS (polling) -> FINISHED -> PUBLISHED
+         ERROR / EXPIRED / timeout = falha (PublishError)
+
+Toda chamada passa por graph_request, que respeita o orçamento de
+graph_rate_limit (chamadas por hora + publicações por 24 h).
+
+GRAPH_API_URL no .env troca a base (ex.: http://127.0.0.1:8765 para o servidor
+falso de fake_servers.py).
+
+Uso:
+    from graph_api import create_container, publish_when_ready
+    creation_id = create_container(ig_user_id, image_url, caption, token)
+    media_id = publish_when_ready(ig_user_id, creation_id, token)
+"""
+
+import os
+import random
+import time
+
+import requests
+
+import http_client
+from graph_rate_limit import PUBLISH_MAX_WAIT, get_limiter
+
+GRAPH_API_BASE = os.getenv("GRAPH_API_URL", "https://graph.facebook.com/v21.0").rstrip("/")
+
+# polling do container
+POLL_INITIAL = 1.0          # primeiro intervalo (s)
+POLL_FACTOR = 2.0           # multiplicador a cada tentativa
+POLL_MAX_DELAY = 15.0       # teto de cada intervalo (s)
+POLL_TIMEOUT = 180.0        # desiste depois disso (s)
+
+# status_code do container
+IN_PROGRESS = "IN_PROGRESS"
+FINISHED = "FINISHED"
+PUBLISHED = "PUBLISHED"
+ERROR = "ERROR"
+EXPIRED = "EXPIRED"
+FAILED_STATES = (ERROR, EXPIRED)
+
+
+class PublishError(Exception):
+    def __init__(self, message, state=None, response=None):
+        super().__init__(message)
+        self.state = state
+        self.response = response
+
+
+class RateLimitError(PublishError):
+    """Sem vaga de publicação dentro da espera permitida; tente de novo depois de `retry_after` s."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message, state="RATE_LIMIT")
+        self.retry_after = retry_after
+
+
+def _json(r):
+    try:
+        return r.json()
+    except ValueError:
+        return {"raw": r.text}
+
+
+def _error_code(r):
+    if r.status_code < 400:
+        return None
+    try:
+        return (r.json().get("error") or {}).get("code")
+    except (ValueError, AttributeError):
+        return None
+
+
+def graph_request(method, url, publish=None, max_wait=PUBLISH_MAX_WAIT, **kwargs):
+    """
+    Chamada à Graph API passando pelo limitador. `url` pode ser completa ou
+    relativa a GRAPH_API_BASE. Chamadas a /media_publish também esperam uma vaga
+    de publicação; se ela demorar mais que `max_wait`, levanta RateLimitError.
+    """
+    if not url.startswith(("http://", "https://")):
+        url = f"{GRAPH_API_BASE}/{url.lstrip('/')}"
+    if publish is None:
+        publish = url.rstrip("/").endswith("/media_publish")
+    limiter = get_limiter()
+    if publish:
+        wait = limiter.reserve_publish(max_wait)
+        if wait:
+            raise RateLimitError(f"Limite de publicações atingido; próxima vaga em {wait / 60:.0f} min",
+                                 retry_after=wait)
+    limiter.acquire()
+    r = http_client.request(method, url, **kwargs)
+    limiter.observe(r.headers, _error_code(r))
+    if publish and r.status_code == 200:
+        limiter.record_publish()
+    return r
+
+
+def graph_get(url, **kwargs):
+    return graph_request("GET", url, **kwargs)
+
+
+def graph_post(url, **kwargs):
+    return graph_request("POST", url, **kwargs)
+
+
+def create_container(ig_user_id, image_url, caption, access_token, timeout=30):
+    """POST /{ig_user_id}/media; devolve o creation_id."""
+    r = graph_post(
+        f"{GRAPH_API_BASE}/{ig_user_id}/media",
+        data={"image_url": image_url, "caption": caption, "access_token": access_token},
+        timeout=timeout,
+    )
+    body = _json(r)
+    if r.status_code != 200 or "id" not in body:
+        raise PublishError(f"Erro ao criar mídia: {body}", state="CREATE", response=body)
+    return body["id"]
+
+
+def container_status(creation_id, access_token, timeout=15):
+    """status_code atual do container (IN_PROGRESS, FINISHED, ERROR, EXPIRED, PUBLISHED)."""
+    r = graph_get(
+        f"{GRAPH_API_BASE}/{creation_id}",
+        params={"fields": "status_code,status", "access_token": access_token},
+        timeout=timeout,
+    )
+    body = _json(r)
+    if r.status_code != 200:
+        raise PublishError(f"Erro ao consultar status: {body}", state="STATUS", response=body)
+    return body.get("status_code"), body
+
+
+def backoff_delays(initial=POLL_INITIAL, factor=POLL_FACTOR, max_delay=POLL_MAX_DELAY):
+    # intervalo exponencial com "equal jitter": metade fixa + metade aleatória
+    delay = initial
+    while True:
+        yield delay / 2 + random.uniform(0, delay / 2)
+        delay = min(max_delay, delay * factor)
+
+
+def wait_for_container(creation_id, access_token, timeout=POLL_TIMEOUT, sleep=time.sleep):
+    """
+    Faz polling do status até FINISHED. Devolve o status final; levanta PublishError
+    se o container falhar (ERROR/EXPIRED) ou o tempo acabar.
+    """
+    deadline = time.monotonic() + timeout
+    delays = backoff_delays()
+    while True:
+        try:
+            status, body = container_status(creation_id, access_token)
+        except (PublishError, requests.RequestException) as e:
+            # erro transitório na consulta: tenta de novo até o prazo
+            status, body = None, {"error": str(e)}
+        if status in (FINISHED, PUBLISHED):
+            return status
+        if status in FAILED_STATES:
+            raise PublishError(f"Container {creation_id} terminou em {status}: {body}",
+                               state=status, response=body)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise PublishError(f"Container {creation_id} não ficou pronto em {timeout:.0f}s "
+                               f"(último status: {status})", state=status, response=body)
+        sleep(min(next(delays), remaining))
+
+
+def publish_container(ig_user_id, creation_id, access_token, timeout=30):
+    """POST /{ig_user_id}/media_publish; devolve o id da mídia publicada."""
+    r = graph_post(
+        f"{GRAPH_API_BASE}/{ig_user_id}/media_publish",
+        data={"creation_id": creation_id, "access_token": access_token},
+        timeout=timeout,
+    )
+    body = _json(r)
+    if r.status_code != 200 or "id" not in body:
+        raise PublishError(f"Erro ao publicar mídia: {body}", state="PUBLISH", response=body)
+    return body["id"]
+
+
+def publish_when_ready(ig_user_id, creation_id, access_token, timeout=POLL_TIMEOUT, sleep=time.sleep):
+    """Espera o container ficar FINISHED e publica na hora. Devolve o media id."""
+    status = wait_for_container(creation_id, access_token, timeout=timeout, sleep=sleep)
+    if status == PUBLISHED:
+        raise PublishError(f"Container {creation_id} já foi publicado", state=PUBLISHED)
+    return publish_container(ig_user_id, creation_id, access_token)
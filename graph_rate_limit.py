@@ -0,0 +1,249 @@
+"""
+graph_rate_limit.py
+
+Orçamento de chamadas à Graph API. Dois limites da Meta nos afetam:
+- limite de chamadas por hora (app / business use case), informado em % de uso
+  nos headers X-App-Usage e X-Business-Use-Case-Usage de cada resposta
+- limite de publicações por conta em 24 h (janela móvel)
+
+GraphRateLimiter fica na frente de toda chamada (graph_api.graph_request):
+- um token bucket de chamadas (CALLS_PER_HOUR, rajada de CALL_BURST) que
+  desacelera quando o uso informado pelos headers passa de USAGE_SOFT e para
+  de vez (até a cota voltar) em USAGE_HARD ou num erro de limite (#4, #17, #32...)
+- um token bucket de publicações (rajada de PUBLISH_BURST, reposição de
+  PUBLISH_LIMIT por 24 h) + contador da janela de 24 h; um lote grande é
+  espaçado sozinho em vez de ser recusado pela API no meio
+
+Publicações e pausas ficam em cache/graph_quota.json, então o contador vale
+entre execuções e entre scripts.
+
+Uso:
+    limiter = get_limiter()
+    limiter.acquire()                 # antes de cada chamada
+    limiter.observe(r.headers, code)  # depois de cada resposta
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+
+QUOTA_STATE = os.path.join("cache", "graph_quota.json")
+
+CALLS_PER_HOUR = float(os.getenv("GRAPH_CALLS_PER_HOUR", "200"))
+CALL_BURST = 50                 # chamadas seguidas antes de o balde começar a segurar
+
+PUBLISH_WINDOW = 24 * 3600      # janela móvel do limite de publicações (s)
+PUBLISH_LIMIT = int(os.getenv("IG_PUBLISH_LIMIT", "25"))
+PUBLISH_BURST = 5               # publicações seguidas antes de começar a espaçar
+PUBLISH_MAX_WAIT = 3600.0       # espera máxima por uma vaga de publicação (s)
+
+USAGE_SOFT = 60.0               # % de uso a partir do qual o balde desacelera
+USAGE_HARD = 95.0               # % de uso em que paramos até a cota voltar
+HARD_PAUSE = 300.0              # pausa quando a API não diz quanto esperar (s)
+
+# códigos de erro de limite da Graph API (app, usuário, página, BUC)
+RATE_LIMIT_CODES = {4, 17, 32, 613, 80001, 80002, 80006}
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity, tokens=None, updated=None):
+        self.rate = rate                # tokens por segundo
+        self.capacity = capacity
+        self.tokens = capacity if tokens is None else min(capacity, tokens)
+        self.updated = updated
+
+    def _refill(self, now):
+        if self.updated is not None and now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now, n=1):
+        """Segundos até haver `n` tokens (0 se já houver)."""
+        self._refill(now)
+        if self.tokens >= n - 1e-6:     # tolerância: relógio em epoch perde precisão
+            return 0.0
+        return (n - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+    def take(self, now, n=1):
+        self._refill(now)
+        self.tokens -= n
+
+
+def usage_from_headers(headers):
+    """(maior % de uso, minutos até recuperar o acesso) de X-App-Usage / X-Business-Use-Case-Usage."""
+    pct, regain = 0.0, 0.0
+    for name in ("X-App-Usage", "X-Business-Use-Case-Usage"):
+        raw = headers.get(name) if headers else None
+        if not raw:
+            continue
+        try:
+            data = json.loads(raw)
+        except ValueError:
+            continue
+        if name == "X-App-Usage":
+            entries = [data]
+        else:
+            # {"<business-id>": [{"type": ..., "call_count": ..., ...}]}
+            entries = [e for v in data.values() for e in (v if isinstance(v, list) else [v])]
+        for entry in entries:
+            if not isinstance(entry, dict):
+                continue
+            for key in ("call_count", "total_cputime", "total_time"):
+                pct = max(pct, float(entry.get(key) or 0))
+            regain = max(regain, float(entry.get("estimated_time_to_regain_access") or 0))
+    return pct, regain
+
+
+class GraphRateLimiter:
+    def __init__(self, state_path=QUOTA_STATE, calls_per_hour=CALLS_PER_HOUR, call_burst=CALL_BURST,
+                 publish_limit=PUBLISH_LIMIT, publish_burst=PUBLISH_BURST,
+                 clock=time.time, sleep=time.sleep):
+        self.state_path = state_path
+        self.base_rate = calls_per_hour / 3600.0
+        self.publish_limit = publish_limit
+        self.clock = clock
+        self.sleep = sleep
+        self.lock = threading.Lock()
+        self.calls = TokenBucket(self.base_rate, call_burst)
+        self.publish = TokenBucket(publish_limit / PUBLISH_WINDOW, min(publish_burst, publish_limit))
+        self.publishes = []             # timestamps das publicações na janela
+        self.blocked_until = 0.0
+        self.usage = 0.0
+        self._load()
+
+    # ---------- estado persistido ----------
+
+    def _load(self):
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except Exception:
+            return
+        self.publishes = sorted(float(t) for t in state.get("publishes", []))
+        self.blocked_until = max(self.blocked_until, float(state.get("blocked_until", 0)))
+        bucket = state.get("publish_bucket")
+        if bucket and bucket[1] is not None:
+            self.publish = TokenBucket(self.publish.rate, self.publish.capacity,
+                                       tokens=float(bucket[0]), updated=float(bucket[1]))
+
+    def _save(self):
+        state = {
+            "publishes": self.publishes,
+            "publish_bucket": [self.publish.tokens, self.publish.updated],
+            "blocked_until": self.blocked_until,
+        }
+        try:
+            folder = os.path.dirname(self.state_path) or "."
+            os.makedirs(folder, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=folder, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp, self.state_path)
+        except Exception:
+            pass
+
+    def _prune(self, now):
+        cutoff = now - PUBLISH_WINDOW
+        while self.publishes and self.publishes[0] <= cutoff:
+            self.publishes.pop(0)
+
+    # ---------- chamadas ----------
+
+    def acquire(self):
+        """Bloqueia até o orçamento permitir mais uma chamada."""
+        while True:
+            with self.lock:
+                now = self.clock()
+                wait = max(self.blocked_until - now, self.calls.wait_time(now))
+                if wait <= 0:
+                    self.calls.take(now)
+                    return
+            self.sleep(wait)
+
+    def observe(self, headers, error_code=None):
+        """Ajusta o ritmo com os headers de uso (e o código de erro, se houver) de uma resposta."""
+        pct, regain = usage_from_headers(headers)
+        with self.lock:
+            now = self.clock()
+            self.usage = pct
+            if pct < USAGE_SOFT:
+                factor = 1.0
+            else:
+                # entre SOFT e HARD o ritmo cai linearmente até 10%
+                factor = max(0.1, (USAGE_HARD - pct) / (USAGE_HARD - USAGE_SOFT))
+            self.calls.rate = self.base_rate * factor
+            if pct >= USAGE_HARD or regain > 0 or error_code in RATE_LIMIT_CODES:
+                pause = regain * 60 if regain > 0 else HARD_PAUSE
+                if now + pause > self.blocked_until:
+                    self.blocked_until = now + pause
+                    self._save()
+
+    # ---------- publicações ----------
+
+    def publish_wait(self):
+        """Segundos até poder publicar de novo (0 = pode agora)."""
+        with self.lock:
+            self._load()        # outro processo pode ter publicado
+            now = self.clock()
+            self._prune(now)
+            wait = self.publish.wait_time(now)
+            if len(self.publishes) >= self.publish_limit:
+                wait = max(wait, self.publishes[0] + PUBLISH_WINDOW - now)
+            return max(0.0, wait)
+
+    def reserve_publish(self, max_wait=PUBLISH_MAX_WAIT):
+        """
+        Espera uma vaga de publicação. Devolve 0 quando pode publicar, ou os
+        segundos que faltariam se a espera passar de `max_wait`.
+        """
+        while True:
+            wait = self.publish_wait()
+            if wait <= 0:
+                return 0.0
+            if max_wait is not None and wait > max_wait:
+                return wait
+            self.sleep(wait)
+
+    def record_publish(self):
+        with self.lock:
+            self._load()
+            now = self.clock()
+            self._prune(now)
+            self.publish.take(now)
+            self.publishes.append(now)
+            self._save()
+
+    def stats(self):
+        with self.lock:
+            now = self.clock()
+            self._prune(now)
+            return {
+                "usage_pct": self.usage,
+                "call_rate_per_hour": self.calls.rate * 3600,
+                "call_tokens": round(self.calls.tokens, 2),
+                "published_24h": len(self.publishes),
+                "publish_limit": self.publish_limit,
+                "blocked_for": max(0.0, self.blocked_until - now),
+            }
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter():
+    """Limitador compartilhado do processo (todas as threads usam o mesmo balde)."""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = GraphRateLimiter()
+        return _limiter
+
+
+def set_limiter(limiter):
+    """Troca o limitador do processo (ex.: outro arquivo de estado nos testes)."""
+    global _limiter
+    with _limiter_lock:
+        _limiter = limiter
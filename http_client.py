@@ -0,0 +1,102 @@
+"""
+http_client.py
+
+Cliente HTTP compartilhado por todos os publicadores (Cloudinary, Graph API,
+Telegram). Uma requests.Session por processo, com:
+- pool de conexões por host (keep-alive: TCP/TLS reaproveitados entre chamadas)
+- timeout padrão em toda chamada que não passar o seu
+- retry com backoff para 429/502/503/504 (POST: só 429/503) respeitando o
+  header Retry-After, e para falhas de conexão (quando a requisição nem chegou
+  ao servidor)
+
+A API imita a do requests: troque requests.post(...) por http_client.post(...).
+
+Uso:
+    import http_client
+    r = http_client.post(url, data=..., files=...)
+"""
+
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_TIMEOUT = (5, 60)   # (conexão, leitura) em segundos
+POOL_HOSTS = 8              # quantos hosts diferentes mantêm pool aberto
+POOL_SIZE = 8               # conexões simultâneas por host
+
+RETRY_STATUSES = (429, 502, 503, 504)
+POST_RETRY_STATUSES = (429, 503)    # 502/504 do gateway podem vir depois de um POST processado
+RETRY_TOTAL = 3
+RETRY_BACKOFF = 0.5         # 0.5s, 1s, 2s... (ou o Retry-After do servidor)
+
+_session = None             # (pid, Session) — não reaproveitar sockets depois de fork
+_lock = threading.Lock()
+
+
+class _TimeoutSession(requests.Session):
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+        return super().request(method, url, **kwargs)
+
+
+class _Retry(Retry):
+    def is_retry(self, method, status_code, has_retry_after=False):
+        # POST não é idempotente: um 502/504 pode ter criado o container / publicado o post
+        if method.upper() == "POST" and status_code not in POST_RETRY_STATUSES:
+            return False
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+def make_retry():
+    # read=0: uma leitura que falhou pode já ter sido processada (ex.: POST /media);
+    # 429/503 e erros de conexão significam que o servidor não fez nada, então é seguro repetir
+    return _Retry(
+        total=RETRY_TOTAL,
+        connect=RETRY_TOTAL,
+        read=0,
+        status=RETRY_TOTAL,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET", "HEAD", "OPTIONS", "POST"}),
+        backoff_factor=RETRY_BACKOFF,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+
+
+def make_session():
+    session = _TimeoutSession()
+    adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=POOL_SIZE, max_retries=make_retry())
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session():
+    global _session
+    with _lock:
+        if _session is None or _session[0] != os.getpid():
+            _session = (os.getpid(), make_session())
+        return _session[1]
+
+
+def request(method, url, **kwargs):
+    return get_session().request(method, url, **kwargs)
+
+
+def get(url, **kwargs):
+    return get_session().get(url, **kwargs)
+
+
+def post(url, **kwargs):
+    return get_session().post(url, **kwargs)
+
+
+def close():
+    global _session
+    with _lock:
+        if _session is not None:
+            _session[1].close()
+            _session = None
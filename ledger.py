@@ -0,0 +1,190 @@
+"""
+ledger.py
+
+Histórico de publicações em SQLite (ledger.db, modo WAL), substituindo o
+used_images.txt / used_phrases.txt. Guarda imagens, frases, legendas e os ids
+de mídia do Instagram com data/hora, e responde "já foi postado?" por chave
+primária (O(1) na prática), sem ler o histórico inteiro.
+
+Vários processos podem publicar ao mesmo tempo: o WAL deixa leituras
+concorrentes e cada gravação é uma transação BEGIN IMMEDIATE com busy_timeout.
+
+Uso:
+    from ledger import open_ledger, is_used, record_post
+    conn = open_ledger()
+    if not is_used(conn, "phrase", frase): ...
+    record_post(conn, image="post_1.jpg", phrase=frase, caption=legenda, media_id="179...")
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime
+
+from phrase_corpus import norm_hash
+
+LEDGER_DB = "ledger.db"
+LEGACY_FILES = {"image": "used_images.txt", "phrase": "used_phrases.txt"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    posted_at   TEXT NOT NULL,
+    image       TEXT,
+    phrase      TEXT,
+    caption     TEXT,
+    media_id    TEXT,
+    creation_id TEXT,
+    extra       TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_posts_posted_at ON posts(posted_at);
+
+-- uma linha por (tipo, chave) já usada: image, phrase, caption, media
+CREATE TABLE IF NOT EXISTS used (
+    kind     TEXT NOT NULL,
+    key      TEXT NOT NULL,
+    first_at TEXT NOT NULL,
+    last_at  TEXT NOT NULL,
+    times    INTEGER NOT NULL DEFAULT 1,
+    post_id  INTEGER,
+    PRIMARY KEY (kind, key)
+) WITHOUT ROWID;
+
+-- estado pequeno (JSON) compartilhado entre processos, ex.: cursor do phrase_scheduler
+CREATE TABLE IF NOT EXISTS state (
+    name       TEXT PRIMARY KEY,
+    value      TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def used_key(kind, value):
+    """Chave canônica: nome do arquivo para imagens, hash normalizado para textos."""
+    if kind == "image":
+        return os.path.basename(value)
+    if kind == "phrase":
+        return norm_hash(value)
+    if kind == "caption":
+        return hashlib.sha1(value.strip().encode("utf-8")).hexdigest()
+    return str(value)
+
+
+def open_ledger(db_path=LEDGER_DB, import_legacy=True):
+    if os.path.dirname(db_path):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    # autocommit: as transações são abertas explicitamente com BEGIN IMMEDIATE
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=30000")
+    conn.executescript(SCHEMA)
+    if import_legacy:
+        _import_legacy(conn, os.path.dirname(os.path.abspath(db_path)))
+    return conn
+
+
+class _write:
+    """Transação de escrita que pega o lock logo no início (evita deadlock no upgrade)."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+def _mark(conn, kind, key, post_id=None, when=None):
+    when = when or _now()
+    conn.execute(
+        "INSERT INTO used (kind, key, first_at, last_at, times, post_id) VALUES (?, ?, ?, ?, 1, ?) "
+        "ON CONFLICT(kind, key) DO UPDATE SET last_at = excluded.last_at, times = times + 1, "
+        "post_id = COALESCE(excluded.post_id, post_id)",
+        (kind, key, when, when, post_id),
+    )
+
+
+def mark_used(conn, kind, value):
+    with _write(conn):
+        _mark(conn, kind, used_key(kind, value))
+
+
+def is_used(conn, kind, value):
+    row = conn.execute(
+        "SELECT 1 FROM used WHERE kind = ? AND key = ?", (kind, used_key(kind, value))
+    ).fetchone()
+    return row is not None
+
+
+def record_post(conn, image=None, phrase=None, caption=None, media_id=None, creation_id=None, **extra):
+    """Grava uma publicação e marca imagem/frase/legenda/mídia como usadas. Retorna o id."""
+    when = _now()
+    with _write(conn):
+        cur = conn.execute(
+            "INSERT INTO posts (posted_at, image, phrase, caption, media_id, creation_id, extra) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (when, image and os.path.basename(image), phrase, caption, media_id, creation_id,
+             json.dumps(extra, ensure_ascii=False) if extra else None),
+        )
+        post_id = cur.lastrowid
+        for kind, value in (("image", image), ("phrase", phrase), ("caption", caption), ("media", media_id)):
+            if value:
+                _mark(conn, kind, used_key(kind, value), post_id, when)
+    return post_id
+
+
+def recent_keys(conn, kind, limit):
+    """Chaves do tipo `kind` usadas mais recentemente (mais nova primeiro)."""
+    return [r[0] for r in conn.execute(
+        "SELECT key FROM used WHERE kind = ? ORDER BY last_at DESC LIMIT ?", (kind, limit)
+    )]
+
+
+def update_state(conn, name, fn):
+    """
+    Lê o estado `name` (JSON ou None), grava o que fn(estado) devolver como
+    (novo_estado, resultado) e devolve o resultado, tudo numa transação
+    BEGIN IMMEDIATE: dois processos não se sobrescrevem.
+    """
+    with _write(conn):
+        row = conn.execute("SELECT value FROM state WHERE name = ?", (name,)).fetchone()
+        value, result = fn(json.loads(row[0]) if row else None)
+        conn.execute(
+            "INSERT INTO state (name, value, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+            (name, json.dumps(value, ensure_ascii=False), _now()),
+        )
+    return result
+
+
+def _import_legacy(conn, base_dir):
+    # migra used_images.txt / used_phrases.txt uma única vez (ledger vazio)
+    if conn.execute("SELECT 1 FROM used LIMIT 1").fetchone():
+        return
+    with _write(conn):
+        for kind, fname in LEGACY_FILES.items():
+            path = os.path.join(base_dir, fname)
+            if not os.path.exists(path):
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        _mark(conn, kind, used_key(kind, line.strip()))
+
+
+if __name__ == "__main__":
+    conn = open_ledger(sys.argv[1] if len(sys.argv) > 1 else LEDGER_DB)
+    print("📒 Ledger:", conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0], "posts")
+    for kind, count in conn.execute("SELECT kind, COUNT(*) FROM used GROUP BY kind ORDER BY kind"):
+        print(f"   {kind}: {count}")
@@ -0,0 +1,351 @@
+"""
+metrics.py
+
+Instrumentação leve do ciclo de postagem: timers, contadores e histogramas por
+etapa (frase, fundo, layout, encode, upload, container, publicação...).
+
+- cada etapa medida vira uma linha JSON em logs/metrics.jsonl
+  ({"ts", "event": "stage", "stage", "seconds", "ok", "cycle", ...})
+- os histogramas (buckets fixos, como no Prometheus) ficam na memória do
+  processo; METRICS_PROM_FILE grava o formato texto do Prometheus a cada ciclo
+  (textfile collector) e METRICS_PORT serve o mesmo em http://host:porta/metrics
+- `python metrics.py` resume o JSONL: p50/p95/máx e falhas por etapa, exatos,
+  sobre milhares de ciclos (e entre reinícios do agente)
+
+Uso:
+    from metrics import cycle, stage, stopwatch
+    with cycle() as c:
+        with stage("upload"):
+            ...
+        c.ok = True
+    sw = stopwatch("render")        # etapas em sequência, sem aninhar blocos
+    ...; sw.lap("background")
+    ...; sw.lap("encode")
+
+Configuração (.env): METRICS_LOG (vazio desliga), METRICS_PROM_FILE, METRICS_PORT.
+"""
+
+import argparse
+import contextvars
+import itertools
+import json
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_LOG = os.getenv("METRICS_LOG", os.path.join("logs", "metrics.jsonl"))
+METRICS_PROM_FILE = os.getenv("METRICS_PROM_FILE", "")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0") or 0)
+PREFIX = "recomeco"
+
+# limites superiores dos buckets (s): de 1 ms a 5 min
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_cycle_id = contextvars.ContextVar("metrics_cycle", default=None)
+_cycle_seq = itertools.count(1)
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)      # último = +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Estimativa por interpolação linear dentro do bucket (como histogram_quantile)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                lo = self.buckets[i - 1] if i > 0 else 0.0
+                hi = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(self.max, lo + (hi - lo) * (rank - seen) / n)
+            seen += n
+        return self.max
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = defaultdict(float)      # (nome, labels) -> valor
+        self.histograms = {}                    # (nome, labels) -> Histogram
+
+    def inc(self, name, value=1, **labels):
+        with self.lock:
+            self.counters[(name, tuple(sorted(labels.items())))] += value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = Histogram()
+            hist.observe(value)
+
+    def summary(self):
+        """{etapa: {count, failures, p50, p95, max, mean}} do processo atual."""
+        with self.lock:
+            out = {}
+            for (name, labels), hist in self.histograms.items():
+                if name != "stage_duration_seconds":
+                    continue
+                stage_name = dict(labels)["stage"]
+                out[stage_name] = {
+                    "count": hist.count,
+                    "failures": int(self.counters.get(("stage_failures_total", labels), 0)),
+                    "p50": hist.quantile(0.5),
+                    "p95": hist.quantile(0.95),
+                    "max": hist.max,
+                    "mean": hist.sum / hist.count if hist.count else None,
+                }
+            return out
+
+    def prometheus(self):
+        """Formato texto de exposição do Prometheus."""
+        def fmt_labels(labels, extra=()):
+            items = list(labels) + list(extra)
+            if not items:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+        lines = []
+        with self.lock:
+            typed = set()
+            for (name, labels), value in sorted(self.counters.items()):
+                metric = f"{PREFIX}_{name}"
+                if metric not in typed:
+                    lines.append(f"# TYPE {metric} counter")
+                    typed.add(metric)
+                lines.append(f"{metric}{fmt_labels(labels)} {value:g}")
+            for (name, labels), hist in sorted(self.histograms.items(), key=lambda kv: kv[0]):
+                metric = f"{PREFIX}_{name}"
+                if metric not in typed:
+                    lines.append(f"# TYPE {metric} histogram")
+                    typed.add(metric)
+                cumulative = 0
+                for bound, n in zip(list(hist.buckets) + [math.inf], hist.counts):
+                    cumulative += n
+                    le = "+Inf" if bound == math.inf else f"{bound:g}"
+                    lines.append(f"{metric}_bucket{fmt_labels(labels, [('le', le)])} {cumulative}")
+                lines.append(f"{metric}_sum{fmt_labels(labels)} {hist.sum:.6f}")
+                lines.append(f"{metric}_count{fmt_labels(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+_log_lock = threading.Lock()
+
+
+def emit(event, **fields):
+    """Acrescenta uma linha JSON ao METRICS_LOG (nunca levanta)."""
+    if not METRICS_LOG:
+        return
+    record = {"ts": datetime.now().isoformat(timespec="milliseconds"), "event": event, "pid": os.getpid()}
+    if _cycle_id.get() is not None:
+        record["cycle"] = _cycle_id.get()
+    record.update(fields)
+    try:
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with _log_lock:
+            if os.path.dirname(METRICS_LOG):
+                os.makedirs(os.path.dirname(METRICS_LOG), exist_ok=True)
+            with open(METRICS_LOG, "a", encoding="utf-8") as f:
+                f.write(line)
+    except Exception:
+        pass
+
+
+def count(name, value=1, **labels):
+    REGISTRY.inc(name, value, **labels)
+
+
+def record_stage(name, seconds, ok=True, log=True, **fields):
+    """Registra a duração de uma etapa já medida (ex.: medida em outro processo)."""
+    REGISTRY.observe("stage_duration_seconds", seconds, stage=name)
+    if not ok:
+        REGISTRY.inc("stage_failures_total", stage=name)
+    if log:
+        emit("stage", stage=name, seconds=round(seconds, 6), ok=ok, **fields)
+
+
+class stage:
+    """Context manager: mede a etapa; exceção conta como falha (e segue subindo)."""
+
+    def __init__(self, name, **fields):
+        self.name = name
+        self.fields = fields
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        fields = dict(self.fields)
+        if exc_type is not None:
+            fields["error"] = f"{exc_type.__name__}: {exc}"
+        record_stage(self.name, time.perf_counter() - self.t0, ok=exc_type is None, **fields)
+        return False
+
+
+class stopwatch:
+    """Etapas em sequência: cada lap(nome) mede desde o lap anterior. .laps guarda os tempos."""
+
+    def __init__(self, prefix=None):
+        self.prefix = prefix
+        self.laps = {}
+        self.t = time.perf_counter()
+
+    def lap(self, name):
+        now = time.perf_counter()
+        full = f"{self.prefix}.{name}" if self.prefix else name
+        self.laps[full] = now - self.t
+        record_stage(full, now - self.t)
+        self.t = now
+        return self.laps[full]
+
+
+class cycle:
+    """Um ciclo de postagem: id nas linhas JSON, duração total e resultado (c.ok)."""
+
+    def __init__(self, name="cycle"):
+        self.name = name
+        self.ok = False
+
+    def __enter__(self):
+        self.id = f"{os.getpid()}-{int(time.time())}-{next(_cycle_seq)}"
+        self.token = _cycle_id.set(self.id)
+        self.t0 = time.perf_counter()
+        emit("cycle_start")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        ok = self.ok and exc_type is None
+        seconds = time.perf_counter() - self.t0
+        record_stage(self.name, seconds, ok=ok, log=False)
+        count("cycles_total", result="ok" if ok else "fail")
+        emit("cycle_end", seconds=round(seconds, 6), ok=ok)
+        _cycle_id.reset(self.token)
+        write_prometheus()
+        return False
+
+
+def write_prometheus(path=None):
+    path = path or METRICS_PROM_FILE
+    if not path:
+        return
+    try:
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(REGISTRY.prometheus())
+        os.replace(tmp, path)
+    except Exception:
+        pass
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, fmt, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.rstrip("/") not in ("", "/metrics"):
+            self.send_response(404)
+            self.end_headers()
+            return
+        data = REGISTRY.prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def serve(port=None, host="0.0.0.0"):
+    """Sobe /metrics numa thread (se METRICS_PORT / port > 0). Devolve o server ou None."""
+    port = METRICS_PORT if port is None else port
+    if not port:
+        return None
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# ---------- resumo do JSONL ----------
+
+def _percentile(ordered, q):
+    if not ordered:
+        return None
+    pos = (len(ordered) - 1) * q
+    lo, hi = math.floor(pos), math.ceil(pos)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+
+def summarize_log(path=None, last=None):
+    """{etapa: {count, failures, p50, p95, max}} exatos a partir do JSONL (últimos `last` ciclos)."""
+    path = path or METRICS_LOG
+    stages = defaultdict(list)
+    failures = defaultdict(int)
+    cycles = []
+    with open(path, "r", encoding="utf-8") as f:
+        records = []
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    if last:
+        keep = [r["cycle"] for r in records if r.get("event") == "cycle_end"][-last:]
+        keep = set(keep)
+        records = [r for r in records if r.get("cycle") in keep]
+    for r in records:
+        if r.get("event") == "stage":
+            stages[r["stage"]].append(r["seconds"])
+            if not r.get("ok", True):
+                failures[r["stage"]] += 1
+        elif r.get("event") == "cycle_end":
+            cycles.append(r)
+    out = {}
+    for name, values in stages.items():
+        values.sort()
+        out[name] = {"count": len(values), "failures": failures[name],
+                     "p50": _percentile(values, 0.5), "p95": _percentile(values, 0.95), "max": values[-1]}
+    if cycles:
+        durations = sorted(c["seconds"] for c in cycles)
+        out["cycle"] = {"count": len(cycles), "failures": sum(1 for c in cycles if not c.get("ok")),
+                        "p50": _percentile(durations, 0.5), "p95": _percentile(durations, 0.95),
+                        "max": durations[-1]}
+    return out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resumo por etapa do log de métricas (JSON lines)")
+    parser.add_argument("log", nargs="?", default=METRICS_LOG)
+    parser.add_argument("--last", type=int, help="Só os últimos N ciclos.")
+    args = parser.parse_args()
+    if not os.path.exists(args.log):
+        print(f"❌ Log de métricas não encontrado: {args.log}")
+        raise SystemExit(1)
+    summary = summarize_log(args.log, args.last)
+    print(f"{'etapa':28} {'n':>7} {'falhas':>7} {'p50':>9} {'p95':>9} {'máx':>9}")
+    for name, s in sorted(summary.items()):
+        print(f"{name:28} {s['count']:7d} {s['failures']:7d} "
+              f"{s['p50'] * 1000:8.1f}ms {s['p95'] * 1000:8.1f}ms {s['max'] * 1000:8.1f}ms")
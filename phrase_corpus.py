@@ -0,0 +1,268 @@
+"""
+phrase_corpus.py
+
+Corpus de frases indexado em SQLite (cache/phrases.db). Junta todas as fontes
+de texto do projeto numa tabela só, com:
+- id estável (nunca reaproveitado, mesmo se a frase sair do arquivo)
+- hash do texto normalizado para deduplicar (caixa, espaços, aspas, NFC)
+- comprimento, categoria e arquivo de origem
+- mtime/tamanho de cada fonte: só arquivos alterados são relidos (rebuild incremental)
+
+Fontes: frases/*.txt, frases_curta_impacto.txt, frases_assertivas.txt,
+frases_reflexao.txt, frases.txt, frases_recomeço.json/.txt, frases_500.json
+(que não é JSON válido: são listas Python e objetos JSON concatenados),
+legendas_automaticas.txt e os arquivos de perguntas dos stories.
+
+Uso:
+    python phrase_corpus.py            # compila/atualiza e mostra contagens
+    from phrase_corpus import open_corpus, build_corpus, phrase_texts
+    conn = open_corpus(); build_corpus(conn)
+    frases = phrase_texts(conn, POST_CATEGORIES)
+"""
+
+import glob
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import sys
+import unicodedata
+from datetime import datetime
+
+CORPUS_DB = os.path.join("cache", "phrases.db")
+
+# (padrão relativo à raiz do projeto, categoria)
+SOURCES = [
+    ("frases/*.txt", "frase"),
+    ("frases_curta_impacto.txt", "curta_impacto"),
+    ("frases_assertivas.txt", "assertiva"),
+    ("frases_reflexao.txt", "reflexao"),
+    ("frases.txt", "frase"),
+    ("frases_recomeço.json", "frase"),
+    ("frases_recomeço.txt", "frase"),
+    ("frases_500.json", "frase"),
+    ("legendas_automaticas.txt", "legenda"),
+    ("stories_perguntas.txt", "story"),
+    ("stories_perguntas_gatilhos.txt", "story"),
+]
+
+# categorias que viram arte de post (o resto é legenda / story)
+POST_CATEGORIES = ("frase", "curta_impacto", "assertiva", "reflexao")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS phrases (
+    id        INTEGER PRIMARY KEY AUTOINCREMENT,
+    text      TEXT NOT NULL,
+    norm_hash TEXT NOT NULL UNIQUE,
+    length    INTEGER NOT NULL,
+    category  TEXT NOT NULL,
+    source    TEXT NOT NULL,
+    added_at  TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_phrases_category ON phrases(category);
+CREATE INDEX IF NOT EXISTS idx_phrases_length ON phrases(length);
+
+CREATE TABLE IF NOT EXISTS phrase_sources (
+    phrase_id INTEGER NOT NULL,
+    source    TEXT NOT NULL,
+    PRIMARY KEY (phrase_id, source)
+);
+CREATE INDEX IF NOT EXISTS idx_phrase_sources_source ON phrase_sources(source);
+
+CREATE TABLE IF NOT EXISTS sources (
+    path     TEXT PRIMARY KEY,
+    category TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size     INTEGER NOT NULL,
+    count    INTEGER NOT NULL
+);
+
+-- frases ainda presentes em pelo menos um arquivo fonte
+CREATE VIEW IF NOT EXISTS active_phrases AS
+    SELECT * FROM phrases WHERE id IN (SELECT phrase_id FROM phrase_sources);
+"""
+
+_STRING_LINE = re.compile(r'^\s*"((?:[^"\\]|\\.)*)"\s*,?\s*$')
+
+
+# ---------- normalização ----------
+
+def normalize(text):
+    t = unicodedata.normalize("NFC", text).strip().strip('"“”\'').strip()
+    t = re.sub(r"\s+", " ", t)
+    return t.casefold()
+
+
+def norm_hash(text):
+    return hashlib.sha1(normalize(text).encode("utf-8")).hexdigest()
+
+
+# ---------- leitura das fontes ----------
+
+def _read_text_lines(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [l.strip() for l in f if l.strip()]
+
+
+def _read_json_like(path):
+    with open(path, "r", encoding="utf-8") as f:
+        raw = f.read()
+    try:
+        data = json.loads(raw)
+        if isinstance(data, dict):
+            data = data.get("frases", [])
+        if isinstance(data, list):
+            return [str(x).strip() for x in data if str(x).strip()]
+    except ValueError:
+        pass
+    # arquivo "quase JSON" (ex.: frases_500.json): pega cada linha que é só uma string
+    out = []
+    for line in raw.splitlines():
+        m = _STRING_LINE.match(line)
+        if not m:
+            continue
+        try:
+            text = json.loads(f'"{m.group(1)}"').strip()
+        except ValueError:
+            continue
+        # ignora marcadores como "... (continua até 500 linhas ...)"
+        if text and not text.startswith("..."):
+            out.append(text)
+    return out
+
+
+def read_source(path):
+    if path.lower().endswith(".json"):
+        return _read_json_like(path)
+    return _read_text_lines(path)
+
+
+def discover_sources(base_dir="."):
+    """[(caminho relativo, categoria)] das fontes que existem hoje."""
+    found = []
+    seen = set()
+    for pattern, category in SOURCES:
+        for path in sorted(glob.glob(os.path.join(base_dir, pattern))):
+            rel = os.path.relpath(path, base_dir).replace(os.sep, "/")
+            if rel not in seen and os.path.isfile(path):
+                seen.add(rel)
+                found.append((rel, category))
+    return found
+
+
+# ---------- banco ----------
+
+def open_corpus(db_path=CORPUS_DB):
+    if os.path.dirname(db_path):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def build_corpus(conn, base_dir=".", force=False):
+    """
+    Atualiza o índice: só relê fontes novas ou com mtime/tamanho diferentes.
+    Retorna {"changed": fontes relidas, "removed": fontes sumidas, "total": frases ativas}.
+    """
+    known = {row[0]: (row[1], row[2]) for row in
+             conn.execute("SELECT path, mtime_ns, size FROM sources")}
+    current = discover_sources(base_dir)
+    changed = removed = 0
+    now = datetime.now().isoformat(timespec="seconds")
+
+    with conn:
+        for rel, category in current:
+            st = os.stat(os.path.join(base_dir, rel))
+            if not force and known.get(rel) == (st.st_mtime_ns, st.st_size):
+                continue
+            try:
+                texts = read_source(os.path.join(base_dir, rel))
+            except Exception as e:
+                print(f"⚠️ Não consegui ler {rel}: {e}")
+                continue
+            conn.execute("DELETE FROM phrase_sources WHERE source = ?", (rel,))
+            for text in texts:
+                h = norm_hash(text)
+                conn.execute(
+                    "INSERT OR IGNORE INTO phrases (text, norm_hash, length, category, source, added_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (text, h, len(text), category, rel, now),
+                )
+                conn.execute(
+                    "INSERT OR IGNORE INTO phrase_sources (phrase_id, source) "
+                    "SELECT id, ? FROM phrases WHERE norm_hash = ?",
+                    (rel, h),
+                )
+            conn.execute(
+                "INSERT OR REPLACE INTO sources (path, category, mtime_ns, size, count) VALUES (?, ?, ?, ?, ?)",
+                (rel, category, st.st_mtime_ns, st.st_size, len(texts)),
+            )
+            changed += 1
+
+        present = {rel for rel, _ in current}
+        for rel in set(known) - present:
+            conn.execute("DELETE FROM phrase_sources WHERE source = ?", (rel,))
+            conn.execute("DELETE FROM sources WHERE path = ?", (rel,))
+            removed += 1
+
+    total = conn.execute("SELECT COUNT(*) FROM active_phrases").fetchone()[0]
+    return {"changed": changed, "removed": removed, "total": total}
+
+
+def _category_filter(categories):
+    if not categories:
+        return "", ()
+    marks = ",".join("?" for _ in categories)
+    return f" WHERE category IN ({marks})", tuple(categories)
+
+
+def phrase_ids(conn, categories=None):
+    where, params = _category_filter(categories)
+    return [r[0] for r in conn.execute(f"SELECT id FROM active_phrases{where} ORDER BY id", params)]
+
+
+def phrase_texts(conn, categories=None):
+    where, params = _category_filter(categories)
+    return [r[0] for r in conn.execute(f"SELECT text FROM active_phrases{where} ORDER BY id", params)]
+
+
+PHRASE_FIELDS = ("id", "text", "length", "category", "source", "norm_hash")
+
+
+def get_phrase(conn, phrase_id, active_only=False):
+    """
+    Busca por chave primária: dict com PHRASE_FIELDS ou None.
+    active_only=True ignora frases que já não estão em nenhum arquivo fonte.
+    """
+    table = "active_phrases" if active_only else "phrases"
+    row = conn.execute(
+        f"SELECT {', '.join(PHRASE_FIELDS)} FROM {table} WHERE id = ?", (phrase_id,)
+    ).fetchone()
+    if not row:
+        return None
+    return dict(zip(PHRASE_FIELDS, row))
+
+
+def random_phrase(conn, categories=None):
+    where, params = _category_filter(categories)
+    n = conn.execute(f"SELECT COUNT(*) FROM active_phrases{where}", params).fetchone()[0]
+    if not n:
+        return None
+    row = conn.execute(
+        f"SELECT id FROM active_phrases{where} ORDER BY id LIMIT 1 OFFSET ?",
+        params + (random.randrange(n),),
+    ).fetchone()
+    return get_phrase(conn, row[0])
+
+
+if __name__ == "__main__":
+    conn = open_corpus()
+    stats = build_corpus(conn, force="--force" in sys.argv)
+    print(f"✅ Corpus: {stats['total']} frases ativas ({stats['changed']} fontes relidas)")
+    for category, count in conn.execute(
+        "SELECT category, COUNT(*) FROM active_phrases GROUP BY category ORDER BY category"
+    ):
+        print(f"   {category}: {count}")
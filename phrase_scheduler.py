@@ -0,0 +1,167 @@
+"""
+phrase_scheduler.py
+
+Escolha da próxima frase sem repetição. Em vez de random.choice sobre a lista
+inteira a cada post, mantemos um cursor sobre uma ordem embaralhada dos ids do
+corpus (uma "época"); cada escolha é avançar o cursor e buscar a frase pela
+chave primária, O(1) amortizado. O estado (ordem + posição) fica na tabela
+`state` do ledger.db e sobrevive entre execuções; cada escolha lê, avança e grava
+o cursor numa transação BEGIN IMMEDIATE, então o worker da fila render-ahead e o
+publicador não sobrescrevem o cursor um do outro. Sem ledger, o estado fica em
+cache/phrase_scheduler.json (que também serve de ponto de partida na migração).
+
+- janela de não-repetição: frases postadas nos últimos `window` posts do ledger
+  são puladas. Só conta o que foi publicado (record_post no arquivamento):
+  --test, posts ainda na fila e posts que falharam não ocupam a janela
+- pesos por categoria ou por arquivo fonte (ex.: {"curta_impacto": 2.0,
+  "frases.txt": 0.5}); o embaralhamento é ponderado (Efraimidis-Spirakis), então
+  frases de peso maior tendem a aparecer mais cedo em cada época
+
+Uso:
+    sched = PhraseScheduler(open_corpus(), open_ledger(), weights={"reflexao": 2})
+    row = sched.next()      # {"id", "text", "category", ...} ou None
+"""
+
+import json
+import os
+import random
+import tempfile
+
+from ledger import recent_keys, update_state
+from phrase_corpus import POST_CATEGORIES, build_corpus, get_phrase
+
+SCHEDULER_STATE = os.path.join("cache", "phrase_scheduler.json")
+NO_REPEAT_WINDOW = 180      # quantos posts recentes não podem repetir frase
+STATE_NAME = "phrase_scheduler"     # linha da tabela state do ledger
+
+
+def weighted_order(items, weight_of, rng=random):
+    # Efraimidis-Spirakis: chave u^(1/w), ordem decrescente = amostra ponderada sem reposição
+    keyed = []
+    for item in items:
+        w = weight_of(item)
+        if w > 0:
+            keyed.append((rng.random() ** (1.0 / w), item))
+    keyed.sort(reverse=True)
+    return [item for _, item in keyed]
+
+
+class PhraseScheduler:
+    def __init__(self, corpus, ledger=None, state_path=SCHEDULER_STATE,
+                 categories=POST_CATEGORIES, weights=None, window=NO_REPEAT_WINDOW,
+                 base_dir=None):
+        """
+        corpus / ledger: conexões de phrase_corpus.open_corpus / ledger.open_ledger.
+        base_dir: se informado, o corpus é atualizado (build_corpus) a cada nova época;
+        entre épocas nenhuma fonte é relida.
+        """
+        self.corpus = corpus
+        self.ledger = ledger
+        self.state_path = state_path
+        self.categories = tuple(categories or ())
+        self.weights = dict(weights or {})
+        self.window = window
+        self.base_dir = base_dir
+        self.order = []
+        self.pos = 0
+        self.recent = set()     # norm_hash das frases publicadas nos últimos `window` posts
+        self._load()
+
+    # ---------- estado persistido ----------
+
+    def _signature(self):
+        return {"categories": list(self.categories), "weights": self.weights}
+
+    def _state(self):
+        return {"signature": self._signature(), "order": self.order, "pos": self.pos}
+
+    def _restore(self, state):
+        if state.get("signature") == self._signature():
+            self.order = [int(i) for i in state.get("order", [])]
+            self.pos = int(state.get("pos", 0))
+        else:
+            self.order, self.pos = [], 0
+
+    def _load(self):
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                self._restore(json.load(f))
+        except Exception:
+            return
+
+    def _save(self):
+        state = self._state()
+        try:
+            folder = os.path.dirname(self.state_path) or "."
+            os.makedirs(folder, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=folder, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp, self.state_path)
+        except Exception:
+            pass
+
+    # ---------- épocas ----------
+
+    def _weight(self, row):
+        _, category, source = row
+        return self.weights.get(source, self.weights.get(category, 1.0))
+
+    def _new_epoch(self):
+        if self.base_dir is not None:
+            try:
+                build_corpus(self.corpus, base_dir=self.base_dir)
+            except Exception as e:
+                print("⚠️ Não consegui atualizar o corpus de frases:", e)
+        where, params = "", ()
+        if self.categories:
+            where = f" WHERE category IN ({','.join('?' for _ in self.categories)})"
+            params = self.categories
+        rows = self.corpus.execute(
+            f"SELECT id, category, source FROM active_phrases{where}", params
+        ).fetchall()
+        self.order = [row[0] for row in weighted_order(rows, self._weight)]
+        self.pos = 0
+
+    # ---------- escolha ----------
+
+    def next(self):
+        """Próxima frase (dict de get_phrase) respeitando a janela; None se o corpus estiver vazio."""
+        if self.ledger is None:
+            row = self._advance()
+            self._save()
+            return row
+        # a janela vem do ledger a cada escolha: só frases de fato publicadas
+        self.recent = set(recent_keys(self.ledger, "phrase", self.window)) if self.window else set()
+
+        def step(state):
+            if state is not None:       # sem estado no ledger: continua do JSON antigo
+                self._restore(state)
+            row = self._advance()
+            return self._state(), row
+
+        return update_state(self.ledger, STATE_NAME, step)
+
+    def _advance(self):
+        skipped = None
+        fresh_epoch = False
+        while True:
+            if self.pos >= len(self.order):
+                if fresh_epoch:
+                    break       # época inteira caiu na janela
+                self._new_epoch()
+                fresh_epoch = True
+                if not self.order:
+                    break
+            phrase_id = self.order[self.pos]
+            self.pos += 1
+            row = get_phrase(self.corpus, phrase_id, active_only=True)
+            if row is None:
+                continue
+            if row["norm_hash"] in self.recent:
+                skipped = skipped or row
+                continue
+            return row
+
+        # tudo recente demais (janela >= corpus): melhor repetir do que não postar
+        return skipped
@@ -0,0 +1,175 @@
+"""
+post_jobs.py
+
+Diário (journal) de posts em andamento, na tabela `jobs` do ledger.db. Cada post
+é um job que avança por estados duráveis:
+
+    rendered -> uploaded -> container_created -> published -> archived
+    (failed = desistimos depois de MAX_ATTEMPTS erros seguidos; um adiamento
+    por cota não conta como erro)
+
+Cada passo concluído é gravado na hora, junto com o que ele produziu (URL do
+Cloudinary, creation_id, media id). Se o processo cair no meio, o próximo ciclo
+retoma o job do último passo concluído em vez de renderizar e subir outra
+imagem: um post custa um upload e uma publicação, mesmo depois de uma queda.
+
+Containers do Instagram expiram em 24 h; um job parado em container_created há
+mais de CONTAINER_TTL volta para uploaded e ganha um container novo.
+
+Uso:
+    conn = open_journal()
+    job = next_resumable(conn) or create_job(conn, phrase=frase, image=caminho)
+    job = advance(conn, job["id"], "uploaded", url=url)
+"""
+
+import sys
+import time
+
+from ledger import LEDGER_DB, open_ledger
+
+JOB_STATES = ("rendered", "uploaded", "container_created", "published", "archived")
+FAILED = "failed"
+MAX_ATTEMPTS = 3                # erros seguidos antes de desistir do job
+CONTAINER_TTL = 23 * 3600       # containers valem 24 h; margem de 1 h (s)
+
+JOB_FIELDS = ("id", "state", "phrase", "caption", "image", "url", "creation_id", "media_id",
+              "created_at", "updated_at", "container_at", "attempts", "error")
+
+JOB_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    state        TEXT NOT NULL,
+    phrase       TEXT,
+    caption      TEXT,
+    image        TEXT,
+    url          TEXT,
+    creation_id  TEXT,
+    media_id     TEXT,
+    created_at   REAL NOT NULL,
+    updated_at   REAL NOT NULL,
+    container_at REAL,
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    error        TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs(state);
+"""
+
+
+def open_journal(db_path=LEDGER_DB):
+    """Conexão do ledger com a tabela de jobs garantida."""
+    conn = open_ledger(db_path)
+    conn.executescript(JOB_SCHEMA)
+    return conn
+
+
+def _row(row):
+    return dict(zip(JOB_FIELDS, row)) if row else None
+
+
+def get_job(conn, job_id):
+    return _row(conn.execute(
+        f"SELECT {', '.join(JOB_FIELDS)} FROM jobs WHERE id = ?", (job_id,)
+    ).fetchone())
+
+
+def create_job(conn, phrase=None, image=None, caption=None):
+    """Novo job já no estado rendered (a imagem existe em disco)."""
+    now = time.time()
+    cur = conn.execute(
+        "INSERT INTO jobs (state, phrase, caption, image, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+        ("rendered", phrase, caption, image, now, now),
+    )
+    return get_job(conn, cur.lastrowid)
+
+
+def job_for_image(conn, image):
+    """Job mais recente desta imagem (qualquer estado), ou None."""
+    return _row(conn.execute(
+        f"SELECT {', '.join(JOB_FIELDS)} FROM jobs WHERE image = ? ORDER BY id DESC LIMIT 1", (image,)
+    ).fetchone())
+
+
+def advance(conn, job_id, state, **fields):
+    """Grava que o job concluiu `state` (só para frente) com os dados produzidos no passo."""
+    if state not in JOB_STATES:
+        raise ValueError(f"Estado desconhecido: {state}")
+    job = get_job(conn, job_id)
+    if job is None:
+        raise KeyError(job_id)
+    if job["state"] in JOB_STATES and JOB_STATES.index(state) < JOB_STATES.index(job["state"]):
+        raise ValueError(f"Job {job_id} já está em {job['state']}, não volta para {state}")
+    unknown = set(fields) - set(JOB_FIELDS)
+    if unknown:
+        raise ValueError(f"Campos desconhecidos: {sorted(unknown)}")
+    now = time.time()
+    if state == "container_created":
+        fields.setdefault("container_at", now)
+    fields.update(state=state, updated_at=now, attempts=0, error=None)
+    conn.execute(
+        f"UPDATE jobs SET {', '.join(f'{k} = ?' for k in fields)} WHERE id = ?",
+        (*fields.values(), job_id),
+    )
+    return get_job(conn, job_id)
+
+
+def record_failure(conn, job_id, error, max_attempts=MAX_ATTEMPTS):
+    """Conta um erro no passo atual; depois de `max_attempts` seguidos o job vira failed."""
+    conn.execute(
+        "UPDATE jobs SET attempts = attempts + 1, error = ?, updated_at = ? WHERE id = ?",
+        (str(error), time.time(), job_id),
+    )
+    conn.execute(
+        "UPDATE jobs SET state = ? WHERE id = ? AND attempts >= ? AND state != 'archived'",
+        (FAILED, job_id, max_attempts),
+    )
+    return get_job(conn, job_id)
+
+
+def defer(conn, job_id, reason):
+    """Adiamento (ex.: cota de publicação): o job fica no passo atual sem contar um erro."""
+    conn.execute("UPDATE jobs SET error = ?, updated_at = ? WHERE id = ?", (str(reason), time.time(), job_id))
+    return get_job(conn, job_id)
+
+
+def reset_container(conn, job_id):
+    """Descarta um container expirado/com erro: o job volta para uploaded e cria outro."""
+    conn.execute(
+        "UPDATE jobs SET state = 'uploaded', creation_id = NULL, container_at = NULL, updated_at = ? "
+        "WHERE id = ? AND state = 'container_created'", (time.time(), job_id),
+    )
+    return get_job(conn, job_id)
+
+
+def reset_upload(conn, job_id):
+    """A URL do Cloudinary não serve mais (o Instagram não baixou): o job volta para rendered e sobe de novo."""
+    conn.execute(
+        "UPDATE jobs SET state = 'rendered', url = NULL, creation_id = NULL, container_at = NULL, updated_at = ? "
+        "WHERE id = ? AND state IN ('uploaded', 'container_created')", (time.time(), job_id),
+    )
+    return get_job(conn, job_id)
+
+
+def container_expired(job, now=None):
+    now = time.time() if now is None else now
+    return job["container_at"] is not None and now - job["container_at"] > CONTAINER_TTL
+
+
+def resumable_jobs(conn):
+    """Jobs que pararam no meio (nem archived nem failed), mais antigos primeiro."""
+    return [_row(r) for r in conn.execute(
+        f"SELECT {', '.join(JOB_FIELDS)} FROM jobs WHERE state NOT IN ('archived', ?) ORDER BY id",
+        (FAILED,),
+    )]
+
+
+def next_resumable(conn):
+    jobs = resumable_jobs(conn)
+    return jobs[0] if jobs else None
+
+
+if __name__ == "__main__":
+    conn = open_journal(sys.argv[1] if len(sys.argv) > 1 else LEDGER_DB)
+    for state, count in conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state ORDER BY state"):
+        print(f"   {state}: {count}")
+    for job in resumable_jobs(conn):
+        print(f"♻️ job {job['id']} parado em {job['state']} ({job['attempts']} erros): {job['error'] or ''}")
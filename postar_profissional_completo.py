@@ -1,13 +1,15 @@
 import os
 import json
 import random
-from PIL import Image, ImageDraw, ImageFont
-import textwrap
-import requests
 from dotenv import load_dotenv
 
+# antes dos módulos do projeto: eles leem o ambiente (.env) ao serem importados
 load_dotenv()
 
+import renderer
+from cloudinary_api import upload_image
+from graph_api import PublishError, graph_post, wait_for_container
+
 ACCESS_TOKEN = os.getenv("INSTAGRAM_ACCESS_TOKEN")
 IG_USER_ID = os.getenv("IG_USER_ID")
 CLOUD_URL = os.getenv("CLOUDINARY_UPLOAD_URL")
@@ -21,6 +23,13 @@ BACKGROUND_COLOR = (10, 10, 10)
 TEXT_COLOR = (255, 255, 255)
 SIGN_COLOR = (255, 255, 255, 90)
 
+TEMPLATE = renderer.get_template(
+    "profissional",
+    background={"color": BACKGROUND_COLOR},
+    text={"font": FONT_PATH, "color": TEXT_COLOR},
+    signature={"font": FONT_PATH, "color": SIGN_COLOR},
+)
+
 HASHTAGS = "#mentalidade #disciplina #mindsetbrasil #mudança #crescimento #motivacao #sucesso #foco #autoconhecimento #frasesmotivacionais"
 
 # ---------- helpers ----------
@@ -69,72 +78,37 @@ def gerar_legenda_profunda(frase):
 
 # ---------- imagem ----------
 def criar_imagem(frase):
-    if not os.path.exists(OUTPUT_DIR):
-        os.makedirs(OUTPUT_DIR)
-
-    img = Image.new("RGBA", (1080, 1350), (*BACKGROUND_COLOR, 255))
-    draw = ImageDraw.Draw(img)
-
-    # fontes proporcionais
-    tamanho_head = 86
-    tamanho_sign = 52
-    try:
-        font_head = ImageFont.truetype(FONT_PATH, tamanho_head)
-        font_sign = ImageFont.truetype(FONT_PATH, tamanho_sign)
-    except Exception:
-        font_head = ImageFont.load_default()
-        font_sign = ImageFont.load_default()
-
-    # quebra inteligente para imagem
-    wrapped = textwrap.fill(frase, width=16)
-
-    # calcula bbox e posiciona visualmente um pouco mais alto
-    bbox = draw.multiline_textbbox((0,0), wrapped, font=font_head, spacing=6)
-    w = bbox[2] - bbox[0]
-    h = bbox[3] - bbox[1]
-    x = (1080 - w) // 2
-    y = (1350 - h) // 2 - 40
-
-    draw.multiline_text((x, y), wrapped, fill=TEXT_COLOR, font=font_head, align="center", spacing=6)
-
-    # assinatura com transparência real
-    assinatura = "@iamjulianocezarh"
-    bbox2 = draw.textbbox((0,0), assinatura, font=font_sign)
-    w2 = bbox2[2] - bbox2[0]
-    x2 = (1080 - w2) // 2
-    y2 = 1350 - 150
-    draw.text((x2, y2), assinatura, fill=SIGN_COLOR, font=font_sign)
-
-    final = img.convert("RGB")
-    filename = os.path.join(OUTPUT_DIR, f"post_prof_{random.randint(1000,9999)}.jpg")
-    final.save(filename, "JPEG", quality=95)
+    # template "profissional" do renderer: fundo liso, frase centralizada e assinatura translúcida
+    nome = f"post_prof_{random.randint(1000,9999)}.jpg"
+    filename = renderer.render_to_file(frase, TEMPLATE, output_dir=OUTPUT_DIR, filename=nome)
     print("✅ Imagem criada:", filename)
     return filename
 
 # ---------- cloudinary ----------
 def upload_cloudinary(caminho):
-    with open(caminho, "rb") as f:
-        data = {"upload_preset": PRESET}
-        files = {"file": f}
-        r = requests.post(CLOUD_URL, data=data, files=files)
     try:
-        return r.json().get("secure_url")
+        return upload_image(caminho, CLOUD_URL, PRESET).get("secure_url")
     except Exception as e:
-        print("❌ Erro Cloudinary:", r.text)
+        print("❌ Erro Cloudinary:", e)
         return None
 
 # ---------- instagram ----------
 def publicar_instagram(image_url, legenda):
     create_url = f"https://graph.facebook.com/v21.0/{IG_USER_ID}/media"
     payload = {"image_url": image_url, "caption": legenda, "access_token": ACCESS_TOKEN}
-    r = requests.post(create_url, data=payload).json()
+    r = graph_post(create_url, data=payload).json()
     print("➡ Criado:", r)
     if "id" not in r:
         print("❌ Falha ao criar mídia")
         return False
-    # publish
+    # publish (só depois do container ficar pronto)
+    try:
+        wait_for_container(r["id"], ACCESS_TOKEN)
+    except PublishError as e:
+        print("❌ Container não ficou pronto:", e)
+        return False
     publish_url = f"https://graph.facebook.com/v21.0/{IG_USER_ID}/media_publish"
-    r2 = requests.post(publish_url, data={"creation_id": r["id"], "access_token": ACCESS_TOKEN}).json()
+    r2 = graph_post(publish_url, data={"creation_id": r["id"], "access_token": ACCESS_TOKEN}).json()
     print("➡ Publicado:", r2)
     return True
 
@@ -0,0 +1,158 @@
+"""
+publish_pipeline.py
+
+Pipeline assíncrono (asyncio) para publicar vários posts de uma vez. Cada etapa
+roda com sua própria concorrência e as etapas são ligadas por filas limitadas:
+
+    render -> upload (Cloudinary) -> create (container) -> poll (status) -> publish -> bookkeeping
+
+Enquanto o post N espera o container ficar FINISHED ou está sendo publicado, o
+upload e a criação do container do post N+1 já estão andando. As chamadas HTTP
+continuam síncronas (http_client, conexões reaproveitadas) e rodam em threads
+via asyncio.to_thread; o polling espera com asyncio.sleep, sem prender thread.
+
+Cada post é um dict: {"phrase", "caption", "image", "url", "creation_id",
+"media_id", "error", "failed_stage", "timings"}. Um post que falha numa etapa
+segue direto para o bookkeeping com "error" preenchido; os outros continuam.
+
+Uso:
+    from publish_pipeline import run_pipeline
+    results = run_pipeline(posts, upload=upload_cloudinary, ig_user_id=IG, access_token=TOKEN,
+                           on_published=mover_arquivo)
+"""
+
+import asyncio
+import time
+
+from graph_api import (
+    FAILED_STATES, FINISHED, POLL_TIMEOUT, PUBLISHED, PublishError,
+    backoff_delays, container_status, create_container, publish_container,
+)
+
+STAGES = ("render", "upload", "create", "poll", "publish", "bookkeeping")
+
+# quantos posts cada etapa processa ao mesmo tempo
+STAGE_LIMITS = {
+    "render": 1,
+    "upload": 3,
+    "create": 2,
+    "poll": 8,
+    "publish": 1,       # publicações uma de cada vez (limite da API)
+    "bookkeeping": 1,
+}
+QUEUE_SIZE = 4          # posts esperando entre uma etapa e outra
+
+_DONE = object()
+
+
+async def _poll_until_ready(creation_id, access_token, timeout=POLL_TIMEOUT):
+    deadline = time.monotonic() + timeout
+    delays = backoff_delays()
+    status = None
+    while True:
+        try:
+            status, body = await asyncio.to_thread(container_status, creation_id, access_token)
+        except Exception as e:
+            status, body = None, {"error": str(e)}
+        if status in (FINISHED, PUBLISHED):
+            return status
+        if status in FAILED_STATES:
+            raise PublishError(f"Container {creation_id} terminou em {status}: {body}", state=status)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise PublishError(f"Container {creation_id} não ficou pronto em {timeout:.0f}s", state=status)
+        await asyncio.sleep(min(next(delays), remaining))
+
+
+def _make_steps(render, upload, ig_user_id, access_token, on_published):
+    async def do_render(post):
+        if not post.get("image"):
+            if render is None:
+                raise ValueError("post sem imagem e sem função de render")
+            post["image"] = await asyncio.to_thread(render, post["phrase"])
+
+    async def do_upload(post):
+        url = await asyncio.to_thread(upload, post["image"])
+        if not url:
+            raise RuntimeError("upload não devolveu URL")
+        post["url"] = url
+
+    async def do_create(post):
+        post["creation_id"] = await asyncio.to_thread(
+            create_container, ig_user_id, post["url"], post.get("caption", ""), access_token)
+
+    async def do_poll(post):
+        status = await _poll_until_ready(post["creation_id"], access_token)
+        if status == PUBLISHED:
+            raise PublishError(f"Container {post['creation_id']} já foi publicado", state=PUBLISHED)
+
+    async def do_publish(post):
+        post["media_id"] = await asyncio.to_thread(
+            publish_container, ig_user_id, post["creation_id"], access_token)
+
+    async def do_bookkeeping(post):
+        if on_published and not post.get("error"):
+            await asyncio.to_thread(on_published, post)
+
+    return {
+        "render": do_render, "upload": do_upload, "create": do_create,
+        "poll": do_poll, "publish": do_publish, "bookkeeping": do_bookkeeping,
+    }
+
+
+async def _stage(name, step, inq, outq, workers):
+    async def worker():
+        while True:
+            post = await inq.get()
+            if post is _DONE:
+                await inq.put(_DONE)    # deixa os outros workers da etapa verem o fim
+                return
+            if not post.get("error") or name == "bookkeeping":
+                t0 = time.perf_counter()
+                try:
+                    await step(post)
+                except Exception as e:
+                    post["error"] = str(e)
+                    post["failed_stage"] = name
+                post["timings"][name] = time.perf_counter() - t0
+            await outq.put(post)
+
+    await asyncio.gather(*(worker() for _ in range(max(1, workers))))
+    await outq.put(_DONE)
+
+
+async def run_pipeline_async(posts, upload, ig_user_id, access_token, render=None,
+                             on_published=None, limits=None, queue_size=QUEUE_SIZE):
+    limits = dict(STAGE_LIMITS, **(limits or {}))
+    steps = _make_steps(render, upload, ig_user_id, access_token, on_published)
+    queues = [asyncio.Queue(maxsize=queue_size) for _ in range(len(STAGES) + 1)]
+
+    tasks = [
+        asyncio.create_task(_stage(name, steps[name], queues[i], queues[i + 1], limits[name]))
+        for i, name in enumerate(STAGES)
+    ]
+
+    async def feed():
+        for post in posts:
+            post.setdefault("error", None)
+            post.setdefault("timings", {})
+            await queues[0].put(post)
+        await queues[0].put(_DONE)
+
+    async def collect():
+        out = []
+        while True:
+            post = await queues[-1].get()
+            if post is _DONE:
+                return out
+            out.append(post)
+
+    feeder = asyncio.create_task(feed())
+    results = await collect()
+    await asyncio.gather(feeder, *tasks)
+    return results
+
+
+def run_pipeline(posts, upload, ig_user_id, access_token, **kwargs):
+    """Versão síncrona de run_pipeline_async (para scripts)."""
+    return asyncio.run(run_pipeline_async(posts, upload, ig_user_id, access_token, **kwargs))
@@ -4,6 +4,7 @@ recomeco_agent_auto.py
 Versão completa: gera artes legíveis (overlay + sombra), monta legenda emocional,
 faz upload para Cloudinary e publica no Instagram Graph API.
 Modo --test = gera imagem e envia para Cloudinary (não publica).
+Modo --render-batch N = renderiza N posts em paralelo em input_images/ (não publica).
 """
 
 import os
@@ -11,18 +12,39 @@ import sys
 import time
 import random
 import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 from dotenv import load_dotenv
-from PIL import Image, ImageDraw, ImageFont, ImageFilter
 
-import requests
+# antes dos módulos do projeto: eles leem o ambiente (.env) ao serem importados
+load_dotenv()
+
+import http_client
 import json
+import metrics
+import renderer
+import requests
+
+from asset_store import list_backgrounds
+from cloudinary_api import forget_upload, upload_image
+from graph_api import GRAPH_API_BASE, PublishError, RateLimitError, graph_post, wait_for_container
+from ledger import is_used, record_post
+from phrase_corpus import POST_CATEGORIES, build_corpus, open_corpus, phrase_texts
+from phrase_scheduler import PhraseScheduler
+from render_queue import (
+    MANIFEST_NAME, QUEUE_LOW_WATER, QUEUE_TARGET, RENDER_QUEUE_DIR, RenderQueue, load_manifest, save_manifest,
+)
+from slot_scheduler import (
+    CATCH_UP, CATCH_UP_POLICIES, DEFAULT_SLOTS, PRERENDER_LEAD, SCHEDULE_STATE, SlotSchedule, run_schedule,
+)
+from post_jobs import (
+    FAILED, advance, container_expired, create_job, defer, job_for_image, next_resumable, open_journal,
+    record_failure, reset_container, reset_upload,
+)
 
 # -----------------------
 # Config / Environment
 # -----------------------
-load_dotenv()
-
 ACCESS_TOKEN = os.getenv("INSTAGRAM_ACCESS_TOKEN") or os.getenv("IG_ACCESS_TOKEN")
 IG_USER_ID = os.getenv("IG_USER_ID")
 CLOUDINARY_UPLOAD_URL = os.getenv("CLOUDINARY_UPLOAD_URL")
@@ -33,7 +55,29 @@ TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 BASE_DIR = os.path.abspath(".")
 INPUT_IMAGES_DIR = os.path.join(BASE_DIR, "input_images")
 POSTED_DIR = os.path.join(BASE_DIR, "postadas")
-USED_FILE = os.path.join(BASE_DIR, "used_images.txt")
+USED_FILE = os.path.join(BASE_DIR, "used_images.txt")   # legado: migrado para o ledger
+LEDGER_DB = os.path.join(BASE_DIR, "ledger.db")
+SCHEDULER_STATE = os.path.join(BASE_DIR, "cache", "phrase_scheduler.json")
+
+# Escolha de frases: nenhuma frase repete dentro dos últimos N posts;
+# pesos opcionais por categoria ou arquivo, ex.: {"curta_impacto": 2.0, "frases.txt": 0.5}
+NO_REPEAT_WINDOW = 180
+PHRASE_WEIGHTS = {}
+CORPUS_DB = os.path.join(BASE_DIR, "cache", "phrases.db")
+MANIFEST_FILE = os.path.join(INPUT_IMAGES_DIR, MANIFEST_NAME)
+
+# Fila render-ahead: quantos posts manter prontos e quando repor (pasta só da fila,
+# fora de input_images/, que o postar_5_imagens.py esvazia)
+QUEUE_DIR = os.path.join(BASE_DIR, RENDER_QUEUE_DIR)
+RENDER_AHEAD = QUEUE_TARGET
+RENDER_LOW_WATER = QUEUE_LOW_WATER
+RENDER_WAIT = 600           # quanto o publicador espera a fila se ela estiver vazia (s)
+PUBLISH_WAIT = 120          # quanto o slot espera uma vaga de publicação antes de adiar o job (s)
+
+# Erros da Graph API de "não consegui baixar a imagem da URL" (asset apagado/expirado no
+# Cloudinary): a URL sai do cache de upload e a imagem sobe de novo
+MEDIA_URL_ERROR_CODES = (9004,)
+MEDIA_URL_ERROR_SUBCODES = (2207003, 2207052)
 
 # Candidate background folders (uses first that exists and has files)
 BACKGROUND_FOLDERS = [
@@ -47,6 +91,9 @@ FONTS_DIR = os.path.join(BASE_DIR, "fonts")
 PLAYFAIR = os.path.join(FONTS_DIR, "PlayfairDisplay-Italic.ttf")
 FALLBACK_FONT_SIZE = 80
 
+# Escurecimento do fundo (legibilidade); o asset_store guarda o fundo já escurecido
+OVERLAY_DARKEN = 0.38
+
 # Ensure folders exist
 os.makedirs(INPUT_IMAGES_DIR, exist_ok=True)
 os.makedirs(POSTED_DIR, exist_ok=True)
@@ -61,195 +108,140 @@ def telegram_notify(text: str):
     try:
         url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
         data = {"chat_id": TELEGRAM_CHAT_ID, "text": text}
-        requests.post(url, data=data, timeout=10)
+        http_client.post(url, data=data, timeout=10)
     except Exception:
         pass
 
-def safe_load_font(path, size):
-    try:
-        return ImageFont.truetype(path, size)
-    except Exception:
-        try:
-            return ImageFont.load_default()
-        except Exception:
-            return None
-
 # -----------------------
 # Ler frases / fontes externas
 # -----------------------
-def collect_phrases():
+_corpus = None   # (pid, conexão) — sqlite não deve atravessar fork
+
+def get_corpus():
     """
-    Procura por várias fontes de frases e retorna uma lista limpa.
-    Prioridade: pasta 'frases/' (arquivos .txt), depois arquivos raiz conhecidos.
+    Conexão com o corpus indexado (cache/phrases.db), uma por processo.
+    A cada chamada só confere mtime/tamanho das fontes; arquivos alterados são relidos.
     """
-    frases = []
-
-    # 1) pasta frases/ (uma frase por arquivo ou linhas)
-    pasta_frases = os.path.join(BASE_DIR, "frases")
-    if os.path.isdir(pasta_frases):
-        for fname in sorted(os.listdir(pasta_frases)):
-            if fname.lower().endswith(".txt"):
-                path = os.path.join(pasta_frases, fname)
-                try:
-                    with open(path, "r", encoding="utf-8") as f:
-                        text = f.read().strip()
-                        if not text:
-                            continue
-                        # se arquivo contém múltiplas linhas, cada linha pode ser uma frase
-                        lines = [l.strip() for l in text.splitlines() if l.strip()]
-                        frases.extend(lines)
-                except Exception:
-                    continue
-
-    # 2) arquivos raiz conhecidos
-    fallback_files = [
-        "frases_curta_impacto.txt",
-        "frases_assertivas.txt",
-        "frases_reflexao.txt",
-        "frases.txt",
-        "frases_recomeço.json",
-        "frases_recomeço.txt",
-    ]
-    for fname in fallback_files:
-        path = os.path.join(BASE_DIR, fname)
-        if os.path.exists(path):
-            try:
-                if path.lower().endswith(".json"):
-                    with open(path, "r", encoding="utf-8") as f:
-                        data = json.load(f)
-                        if isinstance(data, list):
-                            frases.extend([str(x).strip() for x in data if str(x).strip()])
-                else:
-                    with open(path, "r", encoding="utf-8") as f:
-                        lines = [l.strip() for l in f.readlines() if l.strip()]
-                        frases.extend(lines)
-            except Exception:
-                continue
+    global _corpus
+    if _corpus is None or _corpus[0] != os.getpid():
+        _corpus = (os.getpid(), open_corpus(CORPUS_DB))
+    conn = _corpus[1]
+    try:
+        build_corpus(conn, base_dir=BASE_DIR)
+    except Exception as e:
+        print("⚠️ Não consegui atualizar o corpus de frases:", e)
+    return conn
 
-    # clean and unique while preserving order
-    seen = set()
-    out = []
-    for s in frases:
-        if s not in seen:
-            out.append(s)
-            seen.add(s)
-    return out
+def collect_phrases():
+    """
+    Retorna a lista limpa (deduplicada) das frases de post do corpus indexado.
+    Fontes: pasta 'frases/', arquivos raiz conhecidos e frases_500.json (ver phrase_corpus).
+    """
+    return phrase_texts(get_corpus(), POST_CATEGORIES)
 
 # -----------------------
 # Selecionar background
 # -----------------------
 def choose_background():
-    available = []
-    for folder in BACKGROUND_FOLDERS:
-        if os.path.isdir(folder):
-            for f in os.listdir(folder):
-                if f.lower().endswith((".jpg", ".jpeg", ".png", ".webp")):
-                    available.append(os.path.join(folder, f))
+    # listagem fica em cache enquanto as pastas não mudam (asset_store)
+    available = list_backgrounds(BACKGROUND_FOLDERS)
     if not available:
         return None
     return random.choice(available)
 
 # -----------------------
-# Gerador de imagem com overlay + sombra + assinatura
+# Gerador de imagem: template "feed" do renderer (overlay + sombra + assinatura)
 # -----------------------
-def generate_image(phrase: str, output_dir=INPUT_IMAGES_DIR):
-    # Escolher background (se não houver, criar fundo simples)
-    bg = choose_background()
-    if bg:
-        try:
-            img = Image.open(bg).convert("RGBA")
-        except Exception:
-            img = Image.new("RGBA", (1080, 1350), (12, 12, 12, 255))
-    else:
-        img = Image.new("RGBA", (1080, 1350), (12, 12, 12, 255))
-
-    # Redimensionar mantendo proporção para 1080x1350 (padrão IG)
-    target_w, target_h = 1080, 1350
-    img = img.resize((target_w, target_h), Image.LANCZOS)
-
-    # Escurecer o fundo com overlay (para garantir legibilidade)
-    overlay = Image.new("RGBA", img.size, (0, 0, 0, int(255 * 0.38)))  # ~38% escuro
-    img = Image.alpha_composite(img, overlay)
-
-    draw = ImageDraw.Draw(img)
-
-    # Fonte principal (reduz -10% do tamanho base)
-    # usamos tamanho dinâmico: frase curta = maior, longa = menor
-    base_size = 86  # referência antiga
-    # Ajuste de tamanho em função do comprimento
-    phrase_len = len(phrase)
-    if phrase_len < 40:
-        font_size = int(base_size * 0.90)  # -10% global
-    elif phrase_len < 90:
-        font_size = int(base_size * 0.80)
-    else:
-        font_size = int(base_size * 0.70)
-
-    font_head = safe_load_font(PLAYFAIR, font_size) or ImageFont.load_default()
-    # assinatura menor e também -10%
-    font_sign = safe_load_font(PLAYFAIR, int(52 * 0.90)) or ImageFont.load_default()
-
-    # Quebra de texto inteligente: limita largura e usa multiline
-    max_width = int(target_w * 0.78)
-    words = phrase.split()
-    lines = []
-    curr = ""
-    for w in words:
-        test = (curr + " " + w).strip()
-        bbox = draw.textbbox((0, 0), test, font=font_head)
-        if bbox[2] - bbox[0] <= max_width:
-            curr = test
-        else:
-            if curr:
-                lines.append(curr)
-            curr = w
-    if curr:
-        lines.append(curr)
-
-    # Calcular posição vertical centrada (visualmente um pouco acima)
-    line_height = draw.textbbox((0,0), "Ay", font=font_head)[3] - draw.textbbox((0,0), "Ay", font=font_head)[1]
-    total_h = line_height * len(lines) + (len(lines) - 1) * int(line_height * 0.25)
-    start_y = (target_h - total_h) // 2 - int(line_height * 0.2)  # deslocamento visual
-
-    # Draw text with shadow + stroke for legibility
-    for i, line in enumerate(lines):
-        bbox = draw.textbbox((0, 0), line, font=font_head)
-        w = bbox[2] - bbox[0]
-        x = target_w // 2
-        y = start_y + i * int(line_height * 1.25)
-
-        # Shadow (soft) by drawing offset multiple times with low alpha
-        shadow_color = (0, 0, 0, 200)
-        # Draw stroke-like shadow by repeating slightly shifted draws
-        for ox, oy in ((-2, -2), (-2,2), (2,-2), (2,2)):
-            draw.text((x+ox, y+oy), line, font=font_head, fill=shadow_color, anchor="mm")
-
-        # Main white text
-        draw.text((x, y), line, font=font_head, fill=(255,255,255,255), anchor="mm")
-
-    # assinatura com sombra leve (na parte inferior)
-    sign = "@iamjulianocezarh"
-    bbox_s = draw.textbbox((0,0), sign, font=font_sign)
-    w_s = bbox_s[2] - bbox_s[0]
-    h_s = bbox_s[3] - bbox_s[1]
-    x_s = target_w // 2
-    y_s = target_h - h_s - 72
-
-    # assinatura sombra
-    draw.text((x_s+1, y_s+1), sign, font=font_sign, fill=(0,0,0,200), anchor="mm")
-    draw.text((x_s, y_s), sign, font=font_sign, fill=(255,255,255,220), anchor="mm")
-
-    # Converter para RGB antes de salvar (JPEG)
-    final = img.convert("RGB")
-
-    # Nome do arquivo
-    ts = int(time.time())
-    rand = random.randint(1000, 9999)
-    filename = f"post_{ts}_{rand}.jpg"
-    path_out = os.path.join(output_dir, filename)
-    final.save(path_out, format="JPEG", quality=95)
-
-    return path_out
+def generate_image(phrase: str, output_dir=INPUT_IMAGES_DIR, filename=None, sw=None, cache=None):
+    # tempos por etapa (render.background / layout / draw / encode) vão para o metrics
+    sw = sw or metrics.stopwatch()
+    # fundo de base_images/ pré-recortado em 1080x1350 e já escurecido pelo asset_store;
+    # sem fundo, o template cai num fundo liso escuro
+    tpl = renderer.get_template("feed", overlay=OVERLAY_DARKEN, text={"font": PLAYFAIR},
+                                signature={"font": PLAYFAIR})
+    return renderer.render_to_file(phrase, tpl, background=choose_background(),
+                                   output_dir=output_dir, filename=filename, sw=sw, cache=cache)
+
+# -----------------------
+# Render em lote (pool de processos, sem publicar)
+# -----------------------
+def _render_worker_init():
+    # cada worker com sua própria sequência aleatória (fork copia o estado do pai)
+    random.seed()
+
+def _render_worker(phrase, filename):
+    path = generate_image(phrase, filename=filename)
+    return {
+        "file": os.path.basename(path),
+        "phrase": phrase,
+        "rendered_at": datetime.now().isoformat(timespec="seconds"),
+    }
+
+def render_batch(n, workers=None):
+    """
+    Renderiza N frases de collect_phrases() num ProcessPoolExecutor (um worker por CPU).
+    Grava os JPEGs e o manifest.json em input_images/. Nunca publica nada.
+    """
+    phrases = collect_phrases()
+    if not phrases:
+        print("❌ Nenhuma frase encontrada nos arquivos. Coloque frases em 'frases/' ou arquivos fallback.")
+        return []
+    if n > len(phrases):
+        print(f"⚠️ Só há {len(phrases)} frases; renderizando todas.")
+    chosen = random.sample(phrases, min(n, len(phrases)))
+
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    jobs = [(phrase, f"batch_{stamp}_{i:04d}.jpg") for i, phrase in enumerate(chosen)]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs)))
+
+    print(f"🔧 Renderizando {len(jobs)} posts com {workers} processos...")
+    t0 = time.time()
+    rendered = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_render_worker_init) as pool:
+        futures = [pool.submit(_render_worker, phrase, filename) for phrase, filename in jobs]
+        for fut in as_completed(futures):
+            try:
+                rendered.append(fut.result())
+            except Exception as e:
+                print("❌ Erro ao gerar imagem:", e)
+
+    rendered.sort(key=lambda p: p["file"])
+    save_manifest(MANIFEST_FILE, load_manifest(MANIFEST_FILE) + rendered)
+    print(f"✅ {len(rendered)} imagens em {INPUT_IMAGES_DIR} ({time.time() - t0:.1f}s)")
+    return rendered
+
+# -----------------------
+# Fila render-ahead: posts prontos em cache/render_queue/ antes do horário
+# -----------------------
+def _render_ahead_worker(filename):
+    # roda num processo do pool da fila: escolhe a frase, renderiza e já gera a legenda.
+    # Os tempos vão junto no post ("timings"): o publicador os soma às métricas dele
+    sw = metrics.stopwatch()
+    with metrics.stage("render"):
+        row = get_scheduler().next()
+        if not row:
+            raise RuntimeError("nenhuma frase disponível")
+        sw.lap("phrase")
+        generate_image(row["text"], output_dir=QUEUE_DIR, filename=filename, sw=sw)
+        caption = build_caption(row["text"])
+        sw.lap("caption")
+    return {
+        "phrase": row["text"],
+        "phrase_id": row["id"],
+        "caption": caption,
+        "rendered_at": datetime.now().isoformat(timespec="seconds"),
+        "timings": sw.laps,
+    }
+
+_render_queue = None   # (pid, RenderQueue)
+
+def get_render_queue():
+    global _render_queue
+    if _render_queue is None or _render_queue[0] != os.getpid():
+        queue = RenderQueue(QUEUE_DIR, _render_ahead_worker, target=RENDER_AHEAD,
+                            low_water=RENDER_LOW_WATER, initializer=_render_worker_init)
+        _render_queue = (os.getpid(), queue)
+    return _render_queue[1]
 
 # -----------------------
 # Legenda emocional automática (não repete literal a frase)
@@ -298,14 +290,11 @@ def upload_cloudinary(image_path):
         print("❌ Cloudinary não configurado. Defina CLOUDINARY_UPLOAD_URL e CLOUDINARY_UPLOAD_PRESET.")
         return None
     try:
-        with open(image_path, "rb") as f:
-            files = {"file": f}
-            data = {"upload_preset": CLOUDINARY_UPLOAD_PRESET}
-            r = requests.post(CLOUDINARY_UPLOAD_URL, files=files, data=data, timeout=60)
-        r.raise_for_status()
-        resp = r.json()
-        url = resp.get("secure_url") or resp.get("url")
-        return url
+        # upload_cache: mesma imagem (retry / repost) não é enviada de novo
+        resp = upload_image(image_path, CLOUDINARY_UPLOAD_URL, CLOUDINARY_UPLOAD_PRESET)
+        if resp.get("cached"):
+            print("☁️ Imagem já hospedada (cache de upload):", resp["secure_url"])
+        return resp.get("secure_url") or resp.get("url")
     except Exception as e:
         telegram_notify(f"❌ Erro upload Cloudinary: {e}")
         print("❌ Erro upload Cloudinary:", e)
@@ -319,14 +308,14 @@ def create_instagram_media(image_url, caption):
         telegram_notify("❌ Instagram credentials missing in .env")
         print("❌ Instagram credentials faltando (.env).")
         return None
-    endpoint = f"https://graph.facebook.com/v21.0/{IG_USER_ID}/media"
+    endpoint = f"{GRAPH_API_BASE}/{IG_USER_ID}/media"
     data = {
         "image_url": image_url,
         "caption": caption,
         "access_token": ACCESS_TOKEN
     }
     try:
-        r = requests.post(endpoint, data=data, timeout=30)
+        r = graph_post(endpoint, data=data, timeout=30)
         r.raise_for_status()
         return r.json()
     except Exception as e:
@@ -335,120 +324,267 @@ def create_instagram_media(image_url, caption):
         if hasattr(e, "response") and e.response is not None:
             try:
                 print(e.response.text)
+                return e.response.json()    # {"error": ...}: o job decide se sobe de novo
             except Exception:
                 pass
         return None
 
+def is_media_url_error(body):
+    err = (body or {}).get("error") or {}
+    return err.get("code") in MEDIA_URL_ERROR_CODES or err.get("error_subcode") in MEDIA_URL_ERROR_SUBCODES
+
+def forget_uploaded_image(job):
+    # a URL guardada no upload_cache não serve mais: o próximo upload manda os bytes de novo
+    try:
+        forget_upload(job["image"], CLOUDINARY_UPLOAD_URL, CLOUDINARY_UPLOAD_PRESET)
+    except Exception as e:
+        print("⚠️ Não consegui limpar o cache de upload:", e)
+
 def publish_instagram_media(creation_id):
-    endpoint = f"https://graph.facebook.com/v21.0/{IG_USER_ID}/media_publish"
+    # RateLimitError (sem vaga de publicação em PUBLISH_WAIT) sobe: run_job adia o job
+    endpoint = f"{GRAPH_API_BASE}/{IG_USER_ID}/media_publish"
     data = {"creation_id": creation_id, "access_token": ACCESS_TOKEN}
     try:
-        r = requests.post(endpoint, data=data, timeout=30)
+        r = graph_post(endpoint, data=data, timeout=30, max_wait=PUBLISH_WAIT)
         r.raise_for_status()
         return r.json()
-    except Exception as e:
+    except RateLimitError:
+        raise
+    except (PublishError, requests.RequestException, ValueError) as e:
         telegram_notify(f"❌ Erro publicar mídia Instagram: {e}")
         print("❌ Erro publicar mídia Instagram:", e)
         return None
 
 # -----------------------
-# Used images bookkeeping
+# Used images bookkeeping (ledger.db + journal de jobs)
 # -----------------------
-def mark_image_used(filename):
-    try:
-        with open(USED_FILE, "a", encoding="utf-8") as f:
-            f.write(filename + "\n")
-    except Exception:
-        pass
+_ledger = None   # (pid, conexão)
+
+def get_ledger():
+    global _ledger
+    if _ledger is None or _ledger[0] != os.getpid():
+        _ledger = (os.getpid(), open_journal(LEDGER_DB))
+    return _ledger[1]
 
 # -----------------------
 # Main flow
 # -----------------------
+_scheduler = None   # (pid, PhraseScheduler)
+
+def get_scheduler():
+    # criado uma vez por processo; no --loop o corpus só é relido quando a época acaba
+    global _scheduler
+    if _scheduler is None or _scheduler[0] != os.getpid():
+        sched = PhraseScheduler(
+            get_corpus(), get_ledger(), state_path=SCHEDULER_STATE,
+            weights=PHRASE_WEIGHTS, window=NO_REPEAT_WINDOW, base_dir=BASE_DIR,
+        )
+        _scheduler = (os.getpid(), sched)
+    return _scheduler[1]
+
 def pick_phrase_or_fail():
-    phrases = collect_phrases()
-    if not phrases:
+    # cursor embaralhado sobre o corpus + janela de não-repetição (phrase_scheduler)
+    row = get_scheduler().next()
+    if not row:
         print("❌ Nenhuma frase encontrada nos arquivos. Coloque frases em 'frases/' ou arquivos fallback.")
         telegram_notify("❌ Nenhuma frase encontrada para postar.")
         return None
-    return random.choice(phrases)
+    return row["text"]
 
 def run_once(test_mode=False):
-    # 1) pick phrase
-    phrase = pick_phrase_or_fail()
-    if not phrase:
-        return False
-
-    # 2) generate image
-    print("🔧 Gerando imagem com frase selecionada...")
-    try:
-        img_path = generate_image(phrase)
-        print("✅ Imagem gerada:", img_path)
-    except Exception as e:
-        print("❌ Erro ao gerar imagem:", e)
-        telegram_notify(f"❌ Erro ao gerar imagem: {e}")
-        return False
-
-    # 3) upload to Cloudinary
-    print("☁️  Enviando para Cloudinary...")
-    url = upload_cloudinary(img_path)
-    if not url:
-        print("❌ Upload falhou.")
-        return False
-    print("✔ Imagem enviada para Cloudinary:", url)
-
-    # If test mode: stop here (no publish)
+    # cada ciclo vira um "cycle" no metrics: duração total, ok/falha e o tempo de cada etapa
+    with metrics.cycle() as cycle:
+        cycle.ok = _run_once(test_mode)
+    return cycle.ok
+
+def _run_once(test_mode=False):
+    # 0) post que ficou pela metade (queda, erro de rede...) tem prioridade:
+    #    retoma do último passo concluído em vez de renderizar e subir outra imagem
+    journal = get_ledger()
+    job = None if test_mode else next_resumable(journal)
+    if job:
+        print(f"♻️ Retomando post #{job['id']} a partir de '{job['state']}'")
+        if job["state"] != "published":
+            return run_job(journal, job)
+        # já publicado, só faltava o arquivamento: conclui e segue para um post novo
+        run_job(journal, job)
+
+    # If test mode: render + upload only, no publish (nothing taken from the queue or journaled)
     if test_mode:
+        phrase = pick_phrase_or_fail()
+        if not phrase:
+            return False
+        print("🔧 Gerando imagem com frase selecionada...")
+        try:
+            img_path = generate_image(phrase)
+            print("✅ Imagem gerada:", img_path)
+        except Exception as e:
+            print("❌ Erro ao gerar imagem:", e)
+            telegram_notify(f"❌ Erro ao gerar imagem: {e}")
+            return False
+        print("☁️  Enviando para Cloudinary...")
+        try:
+            with metrics.stage("upload"):
+                url = upload_cloudinary(img_path)
+                if not url:
+                    raise RuntimeError("upload falhou")
+        except RuntimeError:
+            print("❌ Upload falhou.")
+            return False
         telegram_notify(f"🧪 TEST MODE: imagem enviada para Cloudinary: {url}")
         print("🧪 Test mode: terminado sem publicar.")
         return True
 
-    # 4) build caption
-    caption = build_caption(phrase)
-
-    # 5) create media on Instagram
-    print("🛰️ Criando mídia no Instagram...")
-    resp = create_instagram_media(url, caption)
-    if not resp or "id" not in resp:
-        print("❌ Falha ao criar mídia:", resp)
-        telegram_notify("❌ Falha ao criar mídia no Instagram.")
-        return False
-
-    creation_id = resp["id"]
-    print("⏳ Mídia criada, id:", creation_id, " — aguardando publicação...")
-    time.sleep(6)
-
-    # 6) publish
-    pub = publish_instagram_media(creation_id)
-    if not pub or "id" not in pub:
-        print("❌ Falha ao publicar:", pub)
-        telegram_notify("❌ Falha ao publicar mídia no Instagram.")
+    # 1-2) post já renderizado da fila render-ahead (frase + imagem + legenda)
+    #      O post só sai do manifest depois de virar job no journal: uma queda entre
+    #      os dois deixa a entrada na fila, e ela é descartada aqui (o job já existe)
+    queue = get_render_queue()
+    with metrics.stage("queue_pop"):
+        post = queue.peek(timeout=RENDER_WAIT)
+        while post and job_for_image(journal, post["path"]):
+            queue.discard(post)
+            post = queue.peek(timeout=RENDER_WAIT)
+    if not post:
+        print("❌ Nenhum post pronto na fila (erro ao renderizar?).")
+        telegram_notify("❌ Fila de posts vazia: nada para publicar.")
         return False
+    # etapas medidas no processo que renderizou (já estão no JSONL de lá)
+    for name, seconds in (post.get("timings") or {}).items():
+        metrics.record_stage(name, seconds, log=False)
+    print("✅ Post da fila:", post["file"])
+    job = create_job(journal, phrase=post.get("phrase"), image=post["path"], caption=post.get("caption"))
+    queue.discard(post)
+    return run_job(journal, job)
+
+def run_job(journal, job):
+    """Leva o job até archived, gravando cada passo no journal. False se parar num erro."""
+    steps = {
+        "rendered": _job_upload,
+        "uploaded": _job_create_container,
+        "container_created": _job_publish,
+        "published": _job_archive,
+    }
+    while job["state"] != "archived":
+        try:
+            job = steps[job["state"]](journal, job)
+        except RateLimitError as e:
+            # cota de publicação: não é erro do job; fica em container_created e
+            # o próximo ciclo retoma (sem gastar MAX_ATTEMPTS)
+            job = defer(journal, job["id"], e)
+            print(f"⏸️ Post #{job['id']} adiado em '{job['state']}':", e)
+            telegram_notify(f"⏸️ Post #{job['id']} adiado (cota de publicação): {e}")
+            return False
+        except Exception as e:
+            job = record_failure(journal, job["id"], e)
+            print(f"❌ Post #{job['id']} parou em '{job['state']}':", e)
+            if job["state"] == FAILED:
+                telegram_notify(f"❌ Desisti do post #{job['id']} depois de {job['attempts']} erros: {e}")
+            else:
+                telegram_notify(f"❌ Post #{job['id']} parou em '{job['state']}' (será retomado): {e}")
+            return False
+    return True
 
-    print("✅ Publicado com sucesso! id:", pub.get("id"))
-    telegram_notify(f"✅ Post publicado: {img_path}")
+def _job_upload(journal, job):
+    if not job["image"] or not os.path.exists(job["image"]):
+        raise RuntimeError(f"imagem não encontrada: {job['image']}")
+    print("☁️  Enviando para Cloudinary...")
+    with metrics.stage("upload", job=job["id"]):
+        url = upload_cloudinary(job["image"])
+        if not url:
+            raise RuntimeError("upload falhou")
+    print("✔ Imagem enviada para Cloudinary:", url)
+    return advance(journal, job["id"], "uploaded", url=url)
 
-    # 7) bookkeeping: move file and mark used
+def _job_create_container(journal, job):
+    # a legenda é gerada uma vez e fica no journal (o retry usa a mesma)
+    caption = job["caption"] or build_caption(job["phrase"])
+    print("🛰️ Criando mídia no Instagram...")
+    with metrics.stage("create_container", job=job["id"]):
+        resp = create_instagram_media(job["url"], caption)
+        if resp and is_media_url_error(resp):
+            forget_uploaded_image(job)
+            reset_upload(journal, job["id"])
+            raise RuntimeError(f"Instagram não baixou a imagem ({job['url']}); vai subir de novo: {resp}")
+        if not resp or "id" not in resp:
+            raise RuntimeError(f"falha ao criar mídia: {resp}")
+    print("⏳ Mídia criada, id:", resp["id"], " — aguardando processamento...")
+    return advance(journal, job["id"], "container_created", creation_id=resp["id"], caption=caption)
+
+def _job_publish(journal, job):
+    if container_expired(job):
+        print("⌛ Container expirou; criando outro.")
+        return reset_container(journal, job["id"])
+    # polling do status_code com backoff; publica assim que ficar FINISHED
     try:
-        base_name = os.path.basename(img_path)
-        target = os.path.join(POSTED_DIR, base_name)
-        os.replace(img_path, target)
-        mark_image_used(base_name)
-    except Exception as e:
-        print("⚠️ Não consegui mover arquivo:", e)
-
-    return True
+        with metrics.stage("container_wait", job=job["id"]):
+            status = wait_for_container(job["creation_id"], ACCESS_TOKEN)
+    except PublishError as e:
+        if e.state == "ERROR":
+            # o container não processou a imagem (URL que o Instagram não baixou, na
+            # maioria): próximo retry sobe de novo e cria outro container
+            forget_uploaded_image(job)
+            reset_upload(journal, job["id"])
+        elif e.state == "EXPIRED":
+            reset_container(journal, job["id"])     # próximo retry cria outro container
+        raise
+    if status == "PUBLISHED":
+        # caiu depois de publicar e antes de gravar: não publica de novo
+        print("ℹ️ Container já estava publicado.")
+        return advance(journal, job["id"], "published")
+    with metrics.stage("publish", job=job["id"]):
+        pub = publish_instagram_media(job["creation_id"])
+        if not pub or "id" not in pub:
+            raise RuntimeError(f"falha ao publicar: {pub}")
+    metrics.count("posts_published_total")
+    print("✅ Publicado com sucesso! id:", pub["id"])
+    telegram_notify(f"✅ Post publicado: {job['image']}")
+    return advance(journal, job["id"], "published", media_id=pub["id"])
+
+def _job_archive(journal, job):
+    # bookkeeping: record image/phrase/caption/media in the ledger and move the file
+    base_name = os.path.basename(job["image"])
+    with metrics.stage("archive", job=job["id"]):
+        if not (job["media_id"] and is_used(journal, "media", job["media_id"])):
+            record_post(journal, image=base_name, phrase=job["phrase"], caption=job["caption"],
+                        media_id=job["media_id"], creation_id=job["creation_id"], job_id=job["id"])
+        if os.path.exists(job["image"]):
+            try:
+                os.replace(job["image"], os.path.join(POSTED_DIR, base_name))
+            except Exception as e:
+                print("⚠️ Não consegui mover arquivo:", e)
+    return advance(journal, job["id"], "archived")
 
 # -----------------------
 # CLI / Scheduler
 # -----------------------
+def prerender_next(slot=None):
+    """Garante a fila cheia antes do slot: no horário, run_once só tira um post, sobe e publica."""
+    n = get_render_queue().fill()
+    if n:
+        print(f"🖼️ {n} post(s) pré-renderizados para {slot.isoformat() if slot else 'o próximo slot'}")
+
 def main():
     parser = argparse.ArgumentParser(description="Agente Recomeço - AutoPost")
     parser.add_argument("--test", action="store_true", help="Gera imagem e envia ao Cloudinary, mas não publica no Instagram.")
     parser.add_argument("--once", action="store_true", help="Executa apenas uma vez (sem scheduler).")
-    parser.add_argument("--loop", action="store_true", help="Roda em loop de 12h (por padrão inicia 07:00 se --start07 fornecido).")
-    parser.add_argument("--start07", action="store_true", help="Se usado com --loop, aguarda até 07:00 para iniciar primeiro post.")
+    parser.add_argument("--loop", action="store_true", help="Roda continuamente, postando nos horários de --slots / --cron.")
+    parser.add_argument("--slots", default=os.getenv("POST_SLOTS", DEFAULT_SLOTS), help="Horários de postagem, ex.: 07:00,12:30,19:00.")
+    parser.add_argument("--cron", default=os.getenv("POST_CRON"), help="Agenda em formato cron (m h dia mês dia-da-semana); substitui --slots.")
+    parser.add_argument("--tz", default=os.getenv("POST_TZ"), help="Fuso horário dos slots (ex.: America/Sao_Paulo). Padrão: o da máquina.")
+    parser.add_argument("--catch-up", choices=CATCH_UP_POLICIES, default=os.getenv("POST_CATCH_UP", CATCH_UP),
+                        help="O que fazer com slots perdidos enquanto o agente estava parado.")
+    parser.add_argument("--lead", type=float, default=float(os.getenv("PRERENDER_LEAD_MIN", PRERENDER_LEAD / 60)),
+                        help="Minutos antes do slot para pré-renderizar o post (0 = renderiza na hora).")
+    parser.add_argument("--render-ahead", type=int, default=RENDER_AHEAD,
+                        help="Quantos posts manter prontos em cache/render_queue/ (fila render-ahead).")
+    parser.add_argument("--start07", action="store_true", help="(obsoleto) Igual a --loop --slots 07:00,19:00.")
+    parser.add_argument("--render-batch", type=int, metavar="N", help="Renderiza N posts em paralelo em input_images/ (não publica).")
     args = parser.parse_args()
 
+    if args.render_batch:
+        render_batch(args.render_batch)
+        return
+
     if args.once or args.test:
         ok = run_once(test_mode=args.test)
         if ok:
@@ -457,26 +593,31 @@ def main():
             print("❌ Execução falhou.")
         return
 
-    if args.loop:
-        # optional: wait until 07:00 if requested
+    if args.loop or args.start07:
+        queue = get_render_queue()
+        queue.target = max(1, args.render_ahead)
+        queue.low_water = min(queue.low_water, queue.target)
         if args.start07:
-            print("⏳ Aguardando início às 07:00 para começar o loop...")
-            while True:
-                now = datetime.now()
-                if now.hour == 7 and now.minute == 0:
-                    break
-                time.sleep(30)
-        # loop infinito com intervalo de 12h
+            args.slots, args.cron = "07:00,19:00", None
+        schedule = SlotSchedule(slots=None if args.cron else args.slots, cron=args.cron, tz=args.tz)
+        print(f"🗓️ Agenda: {schedule.description} ({schedule.tz}), catch-up: {args.catch_up}, "
+              f"pré-render {args.lead:g} min antes")
+        queue.start()       # repõe a fila em segundo plano
+        if metrics.serve():
+            print(f"📈 Métricas em http://0.0.0.0:{metrics.METRICS_PORT}/metrics")
         try:
-            while True:
-                print("▶️ Iniciando ciclo de postagem:", datetime.now().isoformat())
-                success = run_once(test_mode=False)
-                if not success:
-                    print("⚠ Erro nesta rodada. Vou tentar novamente em 12h.")
-                print("⏸ Pausando 12 horas...")
-                time.sleep(12 * 60 * 60)
+            run_schedule(
+                schedule,
+                job=lambda slot: run_once(test_mode=False),
+                prepare=prerender_next if args.lead > 0 else None,
+                lead=args.lead * 60,
+                catch_up=args.catch_up,
+                state_path=os.path.join(BASE_DIR, SCHEDULE_STATE),
+            )
         except KeyboardInterrupt:
             print("🛑 Interrompido pelo usuário.")
+        finally:
+            queue.stop()
         return
 
     # default: run once
@@ -0,0 +1,157 @@
+"""
+render_cache.py
+
+Cache de renders endereçado por conteúdo. A chave é o SHA-256 de tudo que entra
+no render: texto da frase, hash do conteúdo da imagem de fundo, parâmetros do
+template (os que mudam pixels) e hash dos arquivos de fonte. Pedir de novo a
+mesma frase + fundo + template + tamanho (retry depois de falha no upload,
+repost) devolve o arquivo que já existe em vez de renderizar outro. Mudou
+qualquer entrada, muda a chave: a entrada antiga só deixa de ser usada e sai
+pelo despejo.
+
+Os arquivos ficam em cache/renders/<chave>.<ext>, indexados em
+cache/renders.db (SQLite WAL). O total em disco é limitado por RENDER_CACHE_MB:
+passando disso, saem os menos usados recentemente (LRU).
+
+Fundos aleatórios (abstrato, granulação) não têm conteúdo fixo e não entram
+no cache.
+
+Uso:
+    conn = open_render_cache()
+    key = render_key(frase, template, "base_images/006.jpg", fontes)
+    path = lookup(conn, key)            # caminho ou None
+    store(conn, key, "input_images/post_123.jpg")
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+from asset_store import source_hash
+
+RENDER_CACHE_DB = os.path.join("cache", "renders.db")
+RENDER_CACHE_DIR = os.path.join("cache", "renders")
+RENDER_CACHE_MB = float(os.getenv("RENDER_CACHE_MB", "512"))    # teto do disco (MB)
+RENDER_VERSION = 1          # incremente se mudar o desenho do renderer (invalida tudo)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS renders (
+    key         TEXT PRIMARY KEY,
+    path        TEXT NOT NULL,
+    bytes       INTEGER NOT NULL,
+    created_at  REAL NOT NULL,
+    last_used   REAL NOT NULL,
+    hits        INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_renders_last_used ON renders(last_used);
+"""
+
+
+def render_key(phrase, params, background=None, fonts=()):
+    """
+    Hash das entradas do render. params: dict JSON-serializável com os parâmetros
+    que mudam pixels; background: caminho da imagem (hash do conteúdo) ou None;
+    fonts: caminhos dos arquivos de fonte usados.
+    """
+    payload = {
+        "v": RENDER_VERSION,
+        "phrase": phrase,
+        "params": params,
+        "background": source_hash(background) if background else None,
+        "fonts": [source_hash(f) if os.path.exists(f) else f for f in fonts],
+    }
+    data = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=list)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def open_render_cache(db_path=RENDER_CACHE_DB):
+    if os.path.dirname(db_path):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=30000")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def lookup(conn, key, now=None):
+    """Caminho do render em cache para esta chave, ou None (entrada sem arquivo é descartada)."""
+    row = conn.execute("SELECT path FROM renders WHERE key = ?", (key,)).fetchone()
+    if row is None:
+        return None
+    if not os.path.exists(row[0]):
+        conn.execute("DELETE FROM renders WHERE key = ?", (key,))
+        return None
+    now = time.time() if now is None else now
+    conn.execute("UPDATE renders SET hits = hits + 1, last_used = ? WHERE key = ?", (now, key))
+    return row[0]
+
+
+def store(conn, key, path, cache_dir=None, max_bytes=None, now=None):
+    """Guarda uma cópia (hardlink quando dá) de `path` no cache e aplica o limite de disco."""
+    cache_dir = cache_dir or RENDER_CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+    ext = os.path.splitext(path)[1]
+    cached = os.path.join(cache_dir, key + ext)
+    if not os.path.exists(cached):
+        materialize(path, cached)
+    now = time.time() if now is None else now
+    conn.execute(
+        "INSERT OR REPLACE INTO renders (key, path, bytes, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+        (key, cached, os.path.getsize(cached), now, now),
+    )
+    evict(conn, RENDER_CACHE_MB * 1024 * 1024 if max_bytes is None else max_bytes)
+    return cached
+
+
+def materialize(src, dest):
+    """Coloca o conteúdo de `src` em `dest`: hardlink (sem copiar bytes) ou cópia atômica."""
+    if os.path.dirname(dest):
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+    if os.path.abspath(src) == os.path.abspath(dest):
+        return dest
+    try:
+        if os.path.exists(dest):
+            os.remove(dest)
+        os.link(src, dest)
+    except OSError:
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(dest) or ".", suffix=".tmp")
+        os.close(fd)
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, dest)
+    return dest
+
+
+def evict(conn, max_bytes):
+    """Apaga os renders menos usados recentemente até o total caber em `max_bytes`."""
+    total = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM renders").fetchone()[0]
+    removed = 0
+    if total <= max_bytes:
+        return removed
+    for key, path, size in conn.execute("SELECT key, path, bytes FROM renders ORDER BY last_used").fetchall():
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        conn.execute("DELETE FROM renders WHERE key = ?", (key,))
+        total -= size
+        removed += 1
+    return removed
+
+
+if __name__ == "__main__":
+    conn = open_render_cache(sys.argv[1] if len(sys.argv) > 1 else RENDER_CACHE_DB)
+    removed = evict(conn, RENDER_CACHE_MB * 1024 * 1024)
+    total, hits, size = conn.execute(
+        "SELECT COUNT(*), COALESCE(SUM(hits), 0), COALESCE(SUM(bytes), 0) FROM renders"
+    ).fetchone()
+    print(f"🖼️ Render cache: {total} imagens ({size / 1e6:.1f} MB de {RENDER_CACHE_MB:g} MB), "
+          f"{hits} reaproveitamentos, {removed} removidas")
@@ -0,0 +1,206 @@
+"""
+render_queue.py
+
+Fila de posts renderizados com antecedência ("render-ahead"). Mantém até
+`target` posts prontos em cache/render_queue/ (imagem + frase + legenda),
+descritos no manifest.json da pasta, em ordem de chegada. A pasta é só da fila:
+input_images/ é de quem posta à mão (postar_5_imagens.py, --render-batch) e
+não pode consumir os posts do agente. Uma thread de fundo repõe a fila
+sempre que ela cai abaixo de `low_water`; o publicador só faz pop(). No horário
+do post sobra só o upload e a publicação.
+
+A renderização roda num ProcessPoolExecutor: tira o Pillow do processo do
+publicador, e cada worker tem suas próprias conexões sqlite (corpus/ledger).
+
+`render_one(filename)` precisa ser uma função de módulo (picklable) que grava
+a imagem em `directory/filename` e devolve o dict do post (phrase, caption...).
+
+Uso:
+    queue = RenderQueue(RENDER_QUEUE_DIR, render_one, target=4, low_water=2)
+    queue.start()
+    post = queue.peek(timeout=600)   # {"file", "path", "phrase", "caption", ...}
+    ...                              # grava o post (journal)
+    queue.discard(post)
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+MANIFEST_NAME = "manifest.json"
+RENDER_QUEUE_DIR = os.path.join("cache", "render_queue")
+QUEUE_TARGET = int(os.getenv("RENDER_AHEAD", "4"))      # posts prontos a manter
+QUEUE_LOW_WATER = 2         # abaixo disso a thread de fundo repõe até QUEUE_TARGET
+REFILL_CHECK = 60.0         # além do aviso do pop, confere a fila a cada N s
+
+
+def load_manifest(path, directory=None):
+    """Posts do manifest cujo arquivo ainda existe (os já movidos/publicados saem)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        posts = data.get("posts", []) if isinstance(data, dict) else []
+    except Exception:
+        posts = []
+    directory = directory or os.path.dirname(path)
+    return [p for p in posts if os.path.exists(os.path.join(directory, p.get("file", "")))]
+
+
+def save_manifest(path, posts):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"posts": posts}, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+class RenderQueue:
+    def __init__(self, directory, render_one, target=QUEUE_TARGET, low_water=QUEUE_LOW_WATER,
+                 workers=1, initializer=None, manifest=None):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.manifest = manifest or os.path.join(directory, MANIFEST_NAME)
+        self.render_one = render_one
+        self.target = max(1, target)
+        self.low_water = max(1, min(low_water, self.target))
+        self.workers = max(1, workers)
+        self.initializer = initializer
+        self.lock = threading.Lock()            # manifest
+        self.fill_lock = threading.Lock()       # um refill por vez
+        self.changed = threading.Condition()
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+        self.thread = None
+        self.pool = None
+        self.seq = 0
+
+    # ---------- manifest ----------
+
+    def entries(self):
+        with self.lock:
+            return load_manifest(self.manifest, self.directory)
+
+    def __len__(self):
+        return len(self.entries())
+
+    def _append(self, entry):
+        with self.lock:
+            save_manifest(self.manifest, load_manifest(self.manifest, self.directory) + [entry])
+        with self.changed:
+            self.changed.notify_all()
+
+    def _head(self):
+        with self.lock:
+            posts = load_manifest(self.manifest, self.directory)
+        if not posts:
+            return None
+        head = posts[0]
+        head["path"] = os.path.join(self.directory, head["file"])
+        return head
+
+    def discard(self, entry):
+        """Tira `entry` do manifest (o arquivo fica: agora é de quem o consumiu)."""
+        with self.lock:
+            posts = load_manifest(self.manifest, self.directory)
+            save_manifest(self.manifest, [p for p in posts if p.get("file") != entry["file"]])
+        self.wakeup.set()       # consumiu: a thread confere o low-water
+
+    # ---------- render ----------
+
+    def _executor(self):
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=self.initializer)
+        return self.pool
+
+    def _next_filename(self):
+        self.seq += 1
+        return f"queued_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}_{self.seq:04d}.jpg"
+
+    def fill(self, target=None):
+        """Renderiza (bloqueando) até a fila ter `target` posts. Devolve quantos entraram."""
+        target = self.target if target is None else target
+        added = 0
+        with self.fill_lock:
+            missing = target - len(self)
+            if missing <= 0:
+                return 0
+            pool = self._executor()
+            names = [self._next_filename() for _ in range(missing)]
+            futures = [(name, pool.submit(self.render_one, name)) for name in names]
+            for name, fut in futures:     # em ordem: a fila continua FIFO
+                try:
+                    entry = fut.result()
+                except Exception as e:
+                    print("❌ Erro ao pré-renderizar post:", e)
+                    continue
+                entry = dict(entry or {}, file=name)
+                entry.setdefault("rendered_at", datetime.now().isoformat(timespec="seconds"))
+                self._append(entry)
+                added += 1
+        return added
+
+    # ---------- thread de fundo ----------
+
+    def _run(self):
+        while not self.stopping.is_set():
+            try:
+                if len(self) < self.low_water:
+                    n = self.fill()
+                    if n:
+                        print(f"🖼️ Fila de posts reposta (+{n}, total {len(self)})")
+            except Exception as e:
+                print("⚠️ Erro ao repor a fila de posts:", e)
+            self.wakeup.wait(REFILL_CHECK)
+            self.wakeup.clear()
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.stopping.clear()
+            self.thread = threading.Thread(target=self._run, name="render-queue", daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopping.set()
+        self.wakeup.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    # ---------- consumo ----------
+
+    def peek(self, timeout=None):
+        """
+        O post mais antigo da fila, sem tirá-lo do manifest: quem consome grava o
+        post no seu próprio registro (journal) e só então chama discard().
+        Fila vazia: pede reposição e espera até `timeout` s. Sem a thread de
+        fundo rodando, renderiza um na hora. None se não chegar nenhum.
+        """
+        entry = self._head()
+        if entry is None:
+            if self.thread is None or not self.thread.is_alive():
+                self.fill(1)
+                entry = self._head()
+            else:
+                deadline = None if timeout is None else time.monotonic() + timeout
+                self.wakeup.set()
+                with self.changed:
+                    while entry is None:
+                        remaining = None if deadline is None else deadline - time.monotonic()
+                        if remaining is not None and remaining <= 0:
+                            break
+                        self.changed.wait(remaining if remaining is not None else REFILL_CHECK)
+                        entry = self._head()
+        return entry
+
+    def pop(self, timeout=None):
+        """peek() + discard(): tira o post mais antigo da fila (o arquivo fica)."""
+        entry = self.peek(timeout)
+        if entry is not None:
+            self.discard(entry)
+        return entry
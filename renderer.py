@@ -0,0 +1,491 @@
+"""
+renderer.py
+
+Renderizador único de posts. Cada formato (feed do agente, quadrado abstrato,
+foto, profissional, story, simples) é um template declarativo: tamanho, fonte
+do fundo, overlay, fontes, box do texto, sombra e assinatura. Todos passam pelo
+mesmo caminho de desenho, então uma otimização aqui vale para todos os scripts.
+
+O texto é rasterizado uma única vez por bloco numa máscara L; contorno
+(max-filter) e sombra suave (um blur) saem dessa mesma máscara, em vez de
+redesenhar cada linha várias vezes deslocada (ver text_sprites).
+
+Recursos reaproveitados entre renders:
+- fontes pelo font_cache (um FreeTypeFont por arquivo/tamanho no processo)
+- medidas de texto pelo text_layout (avanços por glifo, sem rasterizar)
+- fundos de foto pelo asset_store (recortados e escurecidos uma vez por formato)
+- fundos abstratos pelo background_engine (máscaras em cache)
+- camadas de texto já rasterizadas (frase, assinatura) pelo text_sprites
+
+Template (dict; só o que muda em relação a DEFAULTS):
+    size        (w, h); None = tamanho nativo da imagem de fundo
+    background  {"source": "assets" | "file" | "abstract" | "noise" | "solid", ...}
+    overlay     escurecimento do fundo, 0..1
+    text        {"font", "size" | "fit", "box", "align", "spacing", "gap", "offset",
+                 "color", "shadow"}
+    signature   {"text", "font", "size", "color", "bottom", "shadow"} ou None
+    output      {"dir", "prefix", "format", "quality", "optimize", "ext"}
+
+Uso:
+    import renderer
+    img = renderer.render("Recomeçar é coragem.", "feed")
+    path = renderer.render_to_file(frase, "story", output_dir="input_stories")
+    tpl = renderer.get_template("feed", overlay=0.5, text={"color": (240, 230, 200)})
+    imgs = renderer.render_formats(frase, ["feed", "square", "story"])   # {formato: Image}
+"""
+
+import copy
+import os
+import random
+import time
+
+from PIL import Image, ImageFilter, ImageFont
+
+import render_cache
+from asset_store import crop_to_format, darken, list_backgrounds, prepared_background
+from background_engine import make_background
+from font_cache import get_font
+from text_layout import fit_text, line_height, wrap_lines
+from text_sprites import paste_sprite
+
+FONTS_DIR = "fonts"
+PLAYFAIR = os.path.join(FONTS_DIR, "PlayfairDisplay-Italic.ttf")
+CINZEL = os.path.join(FONTS_DIR, "Cinzel-VariableFont_wght.ttf")
+MONTSERRAT_LIGHT = os.path.join(FONTS_DIR, "Montserrat-Light.ttf")
+SIGNATURE = "@iamjulianocezarh"
+FALLBACK_SIZE = (1080, 1350)    # size None sem imagem de fundo
+
+DEFAULTS = {
+    "size": (1080, 1350),
+    "background": {"source": "solid", "color": (12, 12, 12), "folders": None, "path": None},
+    "overlay": 0.0,
+    "text": {
+        "font": PLAYFAIR,
+        "size": 72,                 # int ou [(até_n_caracteres, tamanho), ..., (None, tamanho)]
+        "fit": None,                # (min, max): maior tamanho que cabe no box (substitui size)
+        "box": (0.1, 0.0, 0.8, 1.0),  # x, y, largura, altura (frações do tamanho ou px)
+        "align": "center",          # left | center | right
+        "spacing": 1.25,            # passo entre linhas, em alturas de linha
+        "gap": 0,                   # px extras entre linhas
+        "offset": 0,                # px: desloca o bloco (negativo = sobe)
+        "color": (255, 255, 255),
+        "shadow": None,             # {"color": (r, g, b[, a]), "stroke": px, "blur": raio, "offset": (dx, dy)}
+    },
+    "signature": {
+        "text": SIGNATURE,
+        "font": PLAYFAIR,
+        "size": 46,
+        "color": (255, 255, 255),
+        "bottom": 90,               # px entre a base da assinatura e a borda de baixo
+        "shadow": None,
+    },
+    "output": {"dir": "generated_images", "prefix": "post", "format": "JPEG", "quality": 95,
+               "optimize": False, "ext": "jpg"},
+}
+
+TEMPLATES = {
+    # recomeco_agent_auto: foto de base_images/ escurecida, 4:5
+    "feed": {
+        "background": {"source": "assets"},
+        "overlay": 0.38,
+        "text": {
+            "size": [(40, 77), (90, 68), (None, 60)],
+            "box": (0.11, 0.0, 0.78, 1.0),
+            "offset": -14,
+            # contorno de 2 px + blur leve (antes: o texto desenhado 4x deslocado ±2 px)
+            "shadow": {"stroke": 2, "blur": 1.5, "color": (0, 0, 0, 220)},
+        },
+        "signature": {"shadow": {"offset": (1, 1), "blur": 1, "color": (0, 0, 0, 200)}},
+        "output": {"dir": "input_images"},
+    },
+    # create_and_publish_local: fundo abstrato (NumPy), quadrado, texto ajustado ao box
+    "abstract_square": {
+        "size": (1080, 1080),
+        "background": {"source": "abstract", "variation": 0.8, "vignette": 0.6, "spotlight": True},
+        "text": {"fit": (16, 96), "box": (120, 0.22, 840, 0.58), "align": "left", "spacing": 1.08},
+        "signature": {"font": [MONTSERRAT_LIGHT, PLAYFAIR], "size": 28, "color": (170, 170, 170),
+                      "bottom": 86},
+        "output": {"dir": "generated_posts", "quality": 92, "optimize": True},
+    },
+    # create_and_publish: foto de base_images/ no tamanho original, Cinzel
+    "photo": {
+        "size": None,
+        "background": {"source": "assets"},
+        "text": {"font": CINZEL, "size": 70, "box": (0.075, 0.0, 0.85, 1.0), "spacing": 1.15,
+                 "offset": -50},
+        "signature": {"size": 45, "bottom": 60},
+    },
+    # postar_profissional_completo: fundo liso quase preto, 4:5
+    "profissional": {
+        "background": {"source": "solid", "color": (10, 10, 10)},
+        "text": {"size": 86, "box": (0.12, 0.0, 0.76, 1.0), "spacing": 1.0, "gap": 6, "offset": -40},
+        "signature": {"size": 52, "color": (255, 255, 255, 90), "bottom": 90},
+        "output": {"dir": "input_images"},
+    },
+    # stories_generator: 9:16 com granulação leve
+    "story": {
+        "size": (1080, 1920),
+        "background": {"source": "noise", "color": (12, 12, 12), "sigma": 12, "alpha": 50 / 255},
+        "text": {"size": 70, "box": (0.075, 0.0, 0.85, 1.0), "spacing": 1.0, "gap": 10},
+        "signature": {"size": 42, "bottom": 80},
+        "output": {"dir": "input_stories", "prefix": "story", "quality": 75},
+    },
+    # image_creator: fundo fixo, fonte grande, PNG
+    "simple": {
+        "size": None,
+        "background": {"source": "file", "path": os.path.join("base_images", "background.png")},
+        "text": {"size": 110, "box": (0.1, 0.0, 0.8, 1.0), "spacing": 1.0, "offset": -100},
+        "signature": {"size": 60, "bottom": 120},
+        "output": {"format": "PNG", "ext": "png"},
+    },
+}
+
+RENDER_CACHE = os.getenv("RENDER_CACHE", "1") == "1"    # reaproveitar renders idênticos (render_cache)
+_render_cache = None        # (pid, conexão, diretório dos arquivos)
+
+# variantes de formato para render_formats: o template base muda só tamanho e margens
+FORMAT_VARIANTS = {
+    "feed": {"size": (1080, 1350)},
+    "square": {"size": (1080, 1080), "signature": {"bottom": 80}},
+    "story": {"size": (1080, 1920), "signature": {"bottom": 160}},
+}
+FANOUT_FORMATS = ("feed", "square", "story")
+
+
+# ---------- templates ----------
+
+def _merge(base, override):
+    out = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(out.get(key), dict):
+            out[key] = _merge(out[key], value)
+        else:
+            out[key] = value
+    return out
+
+
+def get_template(template="feed", **overrides):
+    """
+    Template completo: DEFAULTS + TEMPLATES[nome] (ou um dict) + overrides.
+    Seções (text, signature...) são mescladas chave a chave; signature=None tira a assinatura.
+    """
+    if isinstance(template, str):
+        if template not in TEMPLATES:
+            raise KeyError(f"Template desconhecido: {template}")
+        template = TEMPLATES[template]
+    return _merge(_merge(copy.deepcopy(DEFAULTS), template), overrides)
+
+
+# ---------- recursos ----------
+
+def load_font(spec, size):
+    """Primeira fonte de `spec` (caminho ou lista de caminhos) que abrir; senão a padrão do PIL."""
+    for path in [spec] if isinstance(spec, str) else spec:
+        try:
+            return get_font(path, size)
+        except Exception:
+            continue
+    return ImageFont.load_default()
+
+
+def _font_path(spec):
+    paths = [spec] if isinstance(spec, str) else list(spec)
+    return next((p for p in paths if os.path.exists(p)), paths[0])
+
+
+def _font_size(spec, text):
+    if isinstance(spec, (int, float)):
+        return int(spec)
+    for limit, size in spec:
+        if limit is None or len(text) < limit:
+            return int(size)
+    return int(spec[-1][1])
+
+
+def _freeze_spec(value):
+    return tuple(_freeze_spec(v) for v in value) if isinstance(value, (list, tuple)) else value
+
+
+def _px(value, total):
+    # frações (<= 1.0 em float) viram px; inteiros já são px
+    return int(round(value * total)) if isinstance(value, float) and value <= 1.0 else int(value)
+
+
+# ---------- fundo ----------
+
+def _source_path(bg, background):
+    if isinstance(background, str):
+        return background
+    if bg.get("path") and bg["source"] == "file":
+        return bg["path"]
+    if bg["source"] == "assets":
+        available = list_backgrounds(bg.get("folders"))
+        return random.choice(available) if available else None
+    return None
+
+
+def render_background(tpl, background=None):
+    """Fundo RGB pronto para desenhar (já escurecido pelo overlay do template)."""
+    bg, size, overlay = tpl["background"], tpl["size"], tpl["overlay"]
+    if isinstance(background, Image.Image):
+        img = background.convert("RGB") if background.mode != "RGB" else background.copy()
+        if size and img.size != tuple(size):
+            img = crop_to_format(img, tuple(size))
+        return darken(img, overlay)
+
+    if bg["source"] in ("assets", "file"):
+        path = _source_path(bg, background)
+        if path:
+            try:
+                if size:
+                    return prepared_background(path, tuple(size), darken=overlay)
+                with Image.open(path) as src:
+                    return darken(src.convert("RGB"), overlay)
+            except Exception:
+                pass
+    size = tuple(size or FALLBACK_SIZE)
+    if bg["source"] == "abstract":
+        img = make_background(size, variation=bg.get("variation", 0.8),
+                              vignette_strength=bg.get("vignette", 0.6), spotlight=bg.get("spotlight", True))
+        return darken(img, overlay)
+    img = Image.new("RGB", size, tuple(bg.get("color", (12, 12, 12))))
+    if bg["source"] == "noise":
+        noise = Image.effect_noise(size, bg.get("sigma", 12)).filter(ImageFilter.GaussianBlur(1))
+        img = Image.blend(img, noise.convert("RGB"), bg.get("alpha", 0.2))
+    return darken(img, overlay)
+
+
+# ---------- texto ----------
+
+def _shape(phrase, t, bw, bh):
+    if t.get("fit"):
+        min_size, max_size = t["fit"]
+        return fit_text(phrase, _font_path(t["font"]), bw, bh,
+                        max_size=max_size, min_size=min_size, spacing=t["spacing"])
+    font = load_font(t["font"], _font_size(t["size"], phrase))
+    return font, wrap_lines(phrase, font, bw)
+
+
+def layout_text(phrase, tpl, size, shaped=None):
+    """
+    Fonte, linhas e posição (px inteiros) de cada linha do bloco de texto para uma
+    imagem de `size`. `shaped` (dict) reaproveita fonte + quebra de linhas entre
+    formatos com o mesmo box de texto (ver render_formats).
+    """
+    t = tpl["text"]
+    w, h = size
+    bx, by = _px(t["box"][0], w), _px(t["box"][1], h)
+    bw, bh = _px(t["box"][2], w), _px(t["box"][3], h)
+    key = (phrase, _freeze_spec(t["font"]), _freeze_spec(t["size"]), t.get("fit") and tuple(t["fit"]),
+           t["spacing"], bw, bh if t.get("fit") else None)
+    if shaped is not None and key in shaped:
+        font, lines = shaped[key]
+    else:
+        font, lines = _shape(phrase, t, bw, bh)
+        if shaped is not None:
+            shaped[key] = (font, lines)
+
+    lh = line_height(font)
+    pitch = lh * t["spacing"] + t["gap"]
+    block_h = pitch * (len(lines) - 1) + lh if lines else 0
+    # inteiros: o mesmo bloco em outro formato só muda de lugar (e reaproveita o sprite)
+    top = round(by + max(0, (bh - block_h) / 2) + t["offset"])
+    align = t["align"]
+    x = round({"left": bx, "center": bx + bw / 2, "right": bx + bw}[align])
+    anchor = {"left": "la", "center": "ma", "right": "ra"}[align]
+    return {
+        "font": font,
+        "lines": lines,
+        "positions": [(x, top + round(i * pitch)) for i in range(len(lines))],
+        "anchor": anchor,
+        "height": block_h,
+    }
+
+
+def _draw_lines(img, items, font, color, anchor, shadow=None):
+    # caminho único de desenho: a camada RGBA (texto + sombra) vem do cache de sprites
+    if not items:
+        return
+    paste_sprite(img, items, font, anchor, color, shadow)
+
+
+def draw_text(img, layout, tpl):
+    t = tpl["text"]
+    _draw_lines(img, list(zip(layout["positions"], layout["lines"])), layout["font"],
+                t["color"], layout["anchor"], t.get("shadow"))
+
+
+def draw_signature(img, tpl):
+    s = tpl["signature"]
+    if not s or not s.get("text"):
+        return
+    font = load_font(s["font"], s["size"])
+    pos = (img.width / 2, img.height - s["bottom"])
+    _draw_lines(img, [(pos, s["text"])], font, s["color"], "md", s.get("shadow"))
+
+
+# ---------- render ----------
+
+def render(phrase, template="feed", background=None, sw=None, shaped=None):
+    """
+    Imagem RGB final para `phrase`. background: caminho de imagem ou PIL.Image
+    (senão o template escolhe). sw: metrics.stopwatch opcional (render.background...).
+    """
+    tpl = get_template(template)
+    img = render_background(tpl, background)
+    if sw:
+        sw.lap("render.background")
+    layout = layout_text(phrase, tpl, img.size, shaped)
+    if sw:
+        sw.lap("render.layout")
+    draw_text(img, layout, tpl)
+    draw_signature(img, tpl)
+    if sw:
+        sw.lap("render.draw")
+    return img
+
+
+def save_image(img, tpl, output_dir=None, filename=None):
+    out = tpl["output"]
+    output_dir = output_dir or out["dir"]
+    os.makedirs(output_dir, exist_ok=True)
+    if not filename:
+        filename = f"{out['prefix']}_{int(time.time())}_{random.randint(1000, 9999)}.{out['ext']}"
+    path = os.path.join(output_dir, filename)
+    params = {"quality": out["quality"], "optimize": out["optimize"]} if out["format"] == "JPEG" else {}
+    img.save(path, format=out["format"], **params)
+    return path
+
+
+def _cache_conn():
+    global _render_cache
+    if _render_cache is None or _render_cache[0] != os.getpid():
+        _render_cache = (os.getpid(), render_cache.open_render_cache(), None)
+    return _render_cache[1]
+
+
+def set_render_cache(db_path=None, cache_dir=None):
+    """
+    Aponta o render_cache deste processo para outro banco/diretório (benchmark,
+    testes); sem argumentos volta ao padrão (cache/renders.db, cache/renders/).
+    """
+    global _render_cache
+    _render_cache = (os.getpid(), render_cache.open_render_cache(db_path), cache_dir) if db_path else None
+
+
+def _cache_inputs(tpl, background):
+    """(params, fundo, fontes) para a chave do render_cache; None se o render não for reprodutível."""
+    bg = tpl["background"]
+    if bg["source"] in ("abstract", "noise") or isinstance(background, Image.Image):
+        return None         # fundo aleatório / em memória: sem conteúdo fixo para hashear
+    if background is not None and not os.path.exists(background):
+        return None
+    params = {key: tpl[key] for key in ("size", "overlay", "text", "signature")}
+    params["background"] = {k: v for k, v in bg.items() if k not in ("folders", "path")}
+    params["output"] = {k: tpl["output"][k] for k in ("format", "quality", "optimize")}
+    fonts = [_font_path(tpl["text"]["font"])]
+    if tpl["signature"]:
+        fonts.append(_font_path(tpl["signature"]["font"]))
+    return params, background, fonts
+
+
+def render_to_file(phrase, template="feed", background=None, output_dir=None, filename=None, sw=None,
+                   cache=None):
+    """
+    render() + grava no diretório/formato do template. Devolve o caminho.
+    Com o render_cache (RENDER_CACHE=1, padrão), as mesmas entradas devolvem o
+    arquivo já renderizado (hardlink em output_dir) sem desenhar nada; sem
+    filename, o nome vira `{prefix}_{hash}` em vez de um nome novo a cada vez.
+    """
+    tpl = get_template(template)
+    if background is None and tpl["background"]["source"] in ("assets", "file"):
+        background = _source_path(tpl["background"], None)     # sorteia antes: entra na chave
+    key = None
+    use_cache = RENDER_CACHE if cache is None else cache
+    if use_cache:
+        try:
+            inputs = _cache_inputs(tpl, background)
+            key = render_cache.render_key(phrase, *inputs) if inputs else None
+        except Exception:
+            key = None
+    if key:
+        out = tpl["output"]
+        filename = filename or f"{out['prefix']}_{key[:16]}.{out['ext']}"
+        try:
+            hit = render_cache.lookup(_cache_conn(), key)
+            if hit:
+                path = render_cache.materialize(hit, os.path.join(output_dir or out["dir"], filename))
+                if sw:
+                    sw.lap("render.cached")
+                return path
+        except Exception as e:
+            print("⚠️ Render cache indisponível:", e)
+            key = None
+
+    img = render(phrase, tpl, background, sw)
+    path = save_image(img, tpl, output_dir, filename)
+    if sw:
+        sw.lap("render.encode")
+    if key:
+        try:
+            render_cache.store(_cache_conn(), key, path, cache_dir=_render_cache[2])
+        except Exception as e:
+            print("⚠️ Não consegui guardar o render no cache:", e)
+    return path
+
+
+# ---------- vários formatos de uma vez ----------
+
+def format_template(template, fmt):
+    """Template base (nome ou dict) ajustado para o formato `fmt` de FORMAT_VARIANTS."""
+    if fmt not in FORMAT_VARIANTS:
+        raise KeyError(f"Formato desconhecido: {fmt}")
+    return get_template(get_template(template), **FORMAT_VARIANTS[fmt])
+
+
+def render_formats(phrase, formats=FANOUT_FORMATS, template="feed", background=None, sw=None):
+    """
+    A mesma frase em vários formatos numa chamada: {formato: Image}.
+    Fundo (mesma foto), fontes, quebra de linhas e camadas de texto são
+    compartilhados; por formato só mudam o recorte do fundo e o encaixe no box.
+    """
+    base = get_template(template)
+    if background is None and base["background"]["source"] in ("assets", "file"):
+        background = _source_path(base["background"], None)     # a mesma foto em todos
+    shaped = {}
+    out = {}
+    for fmt in formats:
+        out[fmt] = render(phrase, format_template(base, fmt), background, sw, shaped)
+    return out
+
+
+def render_formats_to_files(phrase, formats=FANOUT_FORMATS, template="feed", background=None,
+                            output_dir=None, stem=None, sw=None):
+    """render_formats() + grava cada variante como `{stem}_{formato}.{ext}`. {formato: caminho}."""
+    base = get_template(template)
+    stem = stem or f"{base['output']['prefix']}_{int(time.time())}_{random.randint(1000, 9999)}"
+    images = render_formats(phrase, formats, base, background, sw)
+    paths = {}
+    for fmt, img in images.items():
+        tpl = format_template(base, fmt)
+        paths[fmt] = save_image(img, tpl, output_dir, f"{stem}_{fmt}.{tpl['output']['ext']}")
+    if sw:
+        sw.lap("render.encode")
+    return paths
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Renderiza uma frase com um template")
+    parser.add_argument("phrase")
+    parser.add_argument("--template", default="feed", choices=sorted(TEMPLATES))
+    parser.add_argument("--out", help="Pasta de saída (padrão: a do template)")
+    parser.add_argument("--formats", help=f"Vários formatos de uma vez, ex.: {','.join(FANOUT_FORMATS)}")
+    args = parser.parse_args()
+    if args.formats:
+        paths = render_formats_to_files(args.phrase, args.formats.split(","), args.template, output_dir=args.out)
+        for fmt, path in paths.items():
+            print(f"✅ {fmt}: {path}")
+    else:
+        print("✅ Imagem salva em:", render_to_file(args.phrase, args.template, output_dir=args.out))
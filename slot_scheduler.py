@@ -0,0 +1,297 @@
+"""
+slot_scheduler.py
+
+Agenda de postagem por horários fixos ("slots"), no lugar do laço que olhava o
+relógio a cada 30 s esperando 07:00 e depois dormia 12 h (e atrasava um pouco
+a cada ciclo).
+
+- slots explícitos ("07:00,12:30,19:00") ou cron de 5 campos
+  ("0 7,19 * * *": minuto hora dia mês dia-da-semana, com *, listas, faixas e /passo)
+- fuso horário explícito (zoneinfo), independente do fuso da máquina
+- dorme exatamente até o próximo slot (em blocos, reconferindo o relógio: se a
+  máquina suspender ou o relógio for ajustado, a hora certa continua valendo)
+- slots perdidos (máquina desligada, queda) seguem uma política de catch-up:
+    skip   = ignora e espera o próximo
+    latest = roda uma vez pelo mais recente perdido, se ainda estiver dentro de max_late
+    all    = roda um por slot perdido dentro de max_late, em sequência
+- `prepare(slot)` roda `lead` segundos antes de cada slot (ex.: renderizar o
+  post), para que no horário só falte a parte de rede
+
+O último slot executado fica em cache/slot_scheduler.json.
+
+Uso:
+    sched = SlotSchedule(slots="07:00,19:00", tz="America/Sao_Paulo")
+    run_schedule(sched, job=lambda slot: run_once(), prepare=lambda slot: prerender(), lead=600)
+"""
+
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+SCHEDULE_STATE = os.path.join("cache", "slot_scheduler.json")
+DEFAULT_SLOTS = "07:00,19:00"
+PRERENDER_LEAD = 600.0      # quanto antes do slot preparar o post (s)
+CATCH_UP = "latest"         # skip | latest | all
+MAX_LATE = 3 * 3600.0       # slot perdido há mais que isso não é compensado (s)
+MAX_SLEEP_CHUNK = 300.0     # dorme no máximo isso de uma vez antes de reconferir o relógio (s)
+LOCALTIME = "/etc/localtime"
+
+CATCH_UP_POLICIES = ("skip", "latest", "all")
+
+_CRON_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+
+def _zone_from_file(path):
+    # /etc/localtime costuma ser link para .../zoneinfo/<Área>/<Cidade>: usa o nome IANA
+    real = os.path.realpath(path)
+    if "zoneinfo" + os.sep in real:
+        try:
+            return ZoneInfo(real.split("zoneinfo" + os.sep, 1)[1])
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    with open(path, "rb") as f:
+        return ZoneInfo.from_file(f, key=os.path.basename(path))
+
+
+def local_tz():
+    """Fuso da máquina com as regras de horário de verão; sem /etc/localtime, o offset atual."""
+    try:
+        return _zone_from_file(LOCALTIME)
+    except (OSError, ValueError):
+        return datetime.now().astimezone().tzinfo
+
+
+def resolve_tz(tz=None):
+    """
+    ZoneInfo pelo nome (ou POST_TZ / TZ do ambiente); sem nada, o fuso local da
+    máquina. TZ no formato POSIX (":/etc/localtime", "BRT3") ou nome
+    desconhecido não derruba o agendador: avisa e usa o fuso local.
+    """
+    name = tz or os.getenv("POST_TZ") or os.getenv("TZ")
+    if not name:
+        return local_tz()
+    if not isinstance(name, str):
+        return name
+    spec = name[1:] if name.startswith(":") else name
+    try:
+        if os.path.isabs(spec):
+            return _zone_from_file(spec)
+        return ZoneInfo(spec)
+    except (ZoneInfoNotFoundError, ValueError, OSError) as e:
+        print(f"⚠️ Fuso horário '{name}' inválido ({e}); usando o fuso local da máquina.")
+        return local_tz()
+
+
+def _cron_field(text, lo, hi):
+    values = set()
+    for part in text.split(","):
+        step = 1
+        if "/" in part:
+            part, step = part.split("/", 1)
+            step = int(step)
+        if part == "*":
+            start, end = lo, hi
+        elif "-" in part:
+            start, end = (int(x) for x in part.split("-", 1))
+        else:
+            start = end = int(part)
+            if step != 1:
+                end = hi
+        if not (lo <= start <= end <= hi) or step < 1:
+            raise ValueError(f"Campo de cron fora da faixa {lo}-{hi}: {text!r}")
+        values.update(range(start, end + 1, step))
+    return sorted(values)
+
+
+def parse_cron(expr):
+    """'m h dom mon dow' -> (minutos, horas, dias, meses, dias_da_semana, dom_livre, dow_livre)."""
+    fields = expr.split()
+    if len(fields) != 5:
+        raise ValueError(f"Cron precisa de 5 campos (m h dia mês dia-da-semana): {expr!r}")
+    parsed = [_cron_field(f, lo, hi) for f, (lo, hi) in zip(fields, _CRON_RANGES)]
+    parsed[4] = sorted({d % 7 for d in parsed[4]})     # domingo = 0 ou 7
+    return (*parsed, fields[2] == "*", fields[4] == "*")
+
+
+def parse_slots(text):
+    """'07:00, 12:30,19:00' -> [(7, 0), (12, 30), (19, 0)]."""
+    slots = set()
+    for part in text.replace(";", ",").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        hour, _, minute = part.partition(":")
+        h, m = int(hour), int(minute or 0)
+        if not (0 <= h <= 23 and 0 <= m <= 59):
+            raise ValueError(f"Horário inválido: {part!r}")
+        slots.add((h, m))
+    if not slots:
+        raise ValueError("Nenhum horário informado")
+    return sorted(slots)
+
+
+class SlotSchedule:
+    def __init__(self, slots=None, cron=None, tz=None):
+        if cron and slots:
+            raise ValueError("Use slots ou cron, não os dois")
+        self.tz = resolve_tz(tz)
+        if cron:
+            minutes, hours, self.days, self.months, self.weekdays, self.any_day, self.any_weekday = parse_cron(cron)
+            self.times = [(h, m) for h in hours for m in minutes]
+        else:
+            self.times = parse_slots(slots or DEFAULT_SLOTS)
+            self.days, self.months, self.weekdays = None, None, None
+            self.any_day = self.any_weekday = True
+        self.description = cron or ",".join(f"{h:02d}:{m:02d}" for h, m in self.times)
+
+    def _day_matches(self, day):
+        if self.months is not None and day.month not in self.months:
+            return False
+        if self.days is None:
+            return True
+        dom = day.day in self.days
+        dow = (day.isoweekday() % 7) in self.weekdays
+        # regra do cron: com os dois campos restritos, basta um bater
+        if self.any_day:
+            return dow
+        if self.any_weekday:
+            return dom
+        return dom or dow
+
+    def next_slot(self, after):
+        """Primeiro slot estritamente depois de `after` (datetime com fuso)."""
+        local = after.astimezone(self.tz)
+        day = local.date()
+        for offset in range(0, 366 * 5):
+            d = day + timedelta(days=offset)
+            if not self._day_matches(d):
+                continue
+            for h, m in self.times:
+                slot = datetime(d.year, d.month, d.day, h, m, tzinfo=self.tz)
+                if slot > local:
+                    return slot
+        raise ValueError(f"Agenda sem próximos horários: {self.description}")
+
+    def slots_between(self, start, end):
+        """Slots em (start, end]."""
+        out = []
+        slot = self.next_slot(start)
+        while slot <= end:
+            out.append(slot)
+            slot = self.next_slot(slot)
+        return out
+
+
+def _load_state(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def _save_state(path, state):
+    try:
+        folder = os.path.dirname(path) or "."
+        os.makedirs(folder, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=folder, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+    except Exception:
+        pass
+
+
+def sleep_until(target, clock=time.time, sleep=time.sleep, chunk=MAX_SLEEP_CHUNK):
+    """Dorme até o instante `target` (datetime com fuso), em blocos de no máximo `chunk` s."""
+    deadline = target.timestamp()
+    while True:
+        remaining = deadline - clock()
+        if remaining <= 0:
+            return
+        sleep(min(remaining, chunk))
+
+
+def missed_slots(schedule, last_done, now, policy=CATCH_UP, max_late=MAX_LATE):
+    """Slots perdidos desde `last_done` que a política manda executar agora."""
+    if policy not in CATCH_UP_POLICIES:
+        raise ValueError(f"Política de catch-up desconhecida: {policy}")
+    if last_done is None or policy == "skip":
+        return []
+    recent = [s for s in schedule.slots_between(last_done, now)
+              if (now - s).total_seconds() <= max_late]
+    if policy == "latest":
+        return recent[-1:]
+    return recent
+
+
+def run_schedule(schedule, job, prepare=None, lead=PRERENDER_LEAD, catch_up=CATCH_UP, max_late=MAX_LATE,
+                 state_path=SCHEDULE_STATE, clock=time.time, sleep=time.sleep, max_runs=None):
+    """
+    Laço principal: para cada slot, chama prepare(slot) `lead` s antes e job(slot) na hora.
+    Erros em prepare/job são mostrados e não derrubam o laço. max_runs limita (testes).
+    """
+    state = _load_state(state_path)
+    last_done = state.get("last_slot")
+    last_done = datetime.fromisoformat(last_done) if last_done else None
+    runs = 0
+
+    def now():
+        return datetime.fromtimestamp(clock(), schedule.tz)
+
+    def execute(slot, late=False):
+        nonlocal runs, last_done
+        tag = " (atrasado)" if late else ""
+        print(f"▶️ Slot {slot.isoformat()}{tag} — iniciando em {now().isoformat(timespec='seconds')}")
+        try:
+            job(slot)
+        except Exception as e:
+            print(f"❌ Erro no slot {slot.isoformat()}:", e)
+        last_done = slot
+        state["last_slot"] = slot.isoformat()
+        _save_state(state_path, state)
+        runs += 1
+
+    while max_runs is None or runs < max_runs:
+        # slots que passaram desde o último executado (agente parado, ou um job longo
+        # que atravessou o horário seguinte) seguem a política de catch-up
+        for slot in missed_slots(schedule, last_done, now(), catch_up, max_late):
+            execute(slot, late=True)
+            if max_runs is not None and runs >= max_runs:
+                return runs
+
+        slot = schedule.next_slot(now())
+        if prepare is not None and lead > 0:
+            prepare_at = slot - timedelta(seconds=lead)
+            if now() < prepare_at:
+                print(f"⏳ Próximo slot {slot.isoformat()}; preparando às {prepare_at.isoformat()}")
+                sleep_until(prepare_at, clock, sleep)
+            try:
+                prepare(slot)
+            except Exception as e:
+                print("⚠️ Erro ao preparar o post (tento de novo no horário):", e)
+        else:
+            print(f"⏳ Próximo slot {slot.isoformat()}")
+        sleep_until(slot, clock, sleep)
+        execute(slot)
+    return runs
+
+    while max_runs is None or runs < max_runs:
+        slot = schedule.next_slot(now())
+        if prepare is not None and lead > 0:
+            prepare_at = slot - timedelta(seconds=lead)
+            if now() < prepare_at:
+                print(f"⏳ Próximo slot {slot.isoformat()}; preparando às {prepare_at.isoformat()}")
+                sleep_until(prepare_at, clock, sleep)
+            try:
+                prepare(slot)
+            except Exception as e:
+                print("⚠️ Erro ao preparar o post (tento de novo no horário):", e)
+        else:
+            print(f"⏳ Próximo slot {slot.isoformat()}")
+        sleep_until(slot, clock, sleep)
+        execute(slot)
+    return runs
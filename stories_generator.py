@@ -1,6 +1,7 @@
 import os
 import random
-from PIL import Image, ImageDraw, ImageFont, ImageFilter
+
+import renderer
 
 # -----------------------------
 # CONFIGURAÇÕES
@@ -11,6 +12,13 @@ PASTA_SAIDA = "input_stories"
 FONT_TITULO = "fonts/PlayfairDisplay-Italic.ttf"
 FONT_ASSINATURA = "fonts/PlayfairDisplay-Italic.ttf"
 
+TEMPLATE = renderer.get_template(
+    "story",
+    size=(LARGURA, ALTURA),
+    text={"font": FONT_TITULO},
+    signature={"font": FONT_ASSINATURA},
+)
+
 os.makedirs(PASTA_SAIDA, exist_ok=True)
 
 # -----------------------------
@@ -35,42 +43,9 @@ def gerar_story():
 
     pergunta = random.choice(perguntas)
 
-    # Fundo com leve granulação
-    img = Image.new("RGB", (LARGURA, ALTURA), color=(12, 12, 12))
-    draw = ImageDraw.Draw(img)
-
-    # Texturas leves
-    textura = Image.effect_noise((LARGURA, ALTURA), 12)
-    textura = textura.convert("RGB").filter(ImageFilter.GaussianBlur(1))
-    textura.putalpha(50)
-    img.paste(textura, (0, 0), textura)
-
-    # Fonte principal
-    fonte = ImageFont.truetype(FONT_TITULO, 70)
-    assinatura_font = ImageFont.truetype(FONT_ASSINATURA, 42)
-
-    # CENTRALIZAR A PERGUNTA
-    bbox = draw.multiline_textbbox((0, 0), pergunta, font=fonte, spacing=10)
-    w = bbox[2] - bbox[0]
-    h = bbox[3] - bbox[1]
-    x = (LARGURA - w) // 2
-    y = (ALTURA - h) // 2
-
-    draw.multiline_text((x, y), pergunta, font=fonte, fill=(255, 255, 255), spacing=10, align="center")
-
-    # Assinatura
-    assinatura = "@iamjulianocezarh"
-    bbox2 = draw.textbbox((0, 0), assinatura, font=assinatura_font)
-    w2 = bbox2[2] - bbox2[0]
-    h2 = bbox2[3] - bbox2[1]
-    x2 = (LARGURA - w2) // 2
-    y2 = ALTURA - h2 - 80
-    draw.text((x2, y2), assinatura, font=assinatura_font, fill=(255, 255, 255))
-
-    # Salvar
+    # template "story" do renderer: fundo com leve granulação, pergunta centralizada e assinatura
     nome = f"story_{random.randint(100000, 999999)}.jpg"
-    caminho = os.path.join(PASTA_SAIDA, nome)
-    img.save(caminho)
+    caminho = renderer.render_to_file(pergunta, TEMPLATE, output_dir=PASTA_SAIDA, filename=nome)
 
     print(f"✅ Story criado: {caminho}")
 
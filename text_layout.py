@@ -0,0 +1,132 @@
+"""
+text_layout.py
+
+Layout de texto sem rasterizar: as larguras vêm de um cache de avanços por glifo
+e de kerning por par de caracteres, calculado uma vez por fonte (arquivo + tamanho).
+Medir uma linha candidata vira soma de números, e a quebra de linhas é
+incremental (cada palavra nova custa O(1)). O ajuste ao box faz busca binária
+pelo maior tamanho de fonte que cabe.
+
+Uso:
+    from text_layout import wrap_lines, fit_text
+    lines = wrap_lines(frase, font, max_width=840)
+    font, lines = fit_text(frase, "fonts/PlayfairDisplay-Italic.ttf", 840, 620, max_size=96)
+"""
+
+from collections import OrderedDict
+
+from font_cache import get_font
+
+MAX_METRICS = 64            # quantas (fonte, tamanho) manter com avanços em cache
+
+
+class GlyphMetrics:
+    """Avanços por caractere e kerning por par de uma fonte já carregada."""
+
+    def __init__(self, font):
+        self.font = font
+        self._advance = {}
+        self._kern = {}
+
+    def advance(self, ch):
+        adv = self._advance.get(ch)
+        if adv is None:
+            adv = self._advance[ch] = self.font.getlength(ch)
+        return adv
+
+    def kern(self, a, b):
+        pair = a + b
+        k = self._kern.get(pair)
+        if k is None:
+            k = self._kern[pair] = self.font.getlength(pair) - self.advance(a) - self.advance(b)
+        return k
+
+    def width(self, text):
+        if not text:
+            return 0.0
+        total = self.advance(text[0])
+        for prev, ch in zip(text, text[1:]):
+            total += self.kern(prev, ch) + self.advance(ch)
+        return total
+
+    def join_width(self, left_w, left, right_w, right, sep=" "):
+        # largura de left + sep + right sabendo as larguras das duas partes
+        if not left:
+            return right_w
+        return (left_w + self.kern(left[-1], sep) + self.advance(sep)
+                + self.kern(sep, right[0]) + right_w)
+
+
+_METRICS = OrderedDict()
+
+
+def metrics_for(font):
+    # chave pela identidade do objeto: o font_cache devolve sempre o mesmo
+    key = id(font)
+    m = _METRICS.get(key)
+    if m is not None and m.font is font:
+        _METRICS.move_to_end(key)
+        return m
+    m = _METRICS[key] = GlyphMetrics(font)
+    while len(_METRICS) > MAX_METRICS:
+        _METRICS.popitem(last=False)
+    return m
+
+
+def text_width(text, font):
+    return metrics_for(font).width(text)
+
+
+def line_height(font, spacing=1.0):
+    # altura de referência de uma linha (equivale ao antigo font.getsize("A")[1])
+    return font.getbbox("A")[3] * spacing
+
+
+def wrap_lines(text, font, max_width):
+    """Quebra gulosa por palavras; devolve a lista de linhas."""
+    m = metrics_for(font)
+    lines = []
+    cur, cur_w = "", 0.0
+    for word in text.split():
+        word_w = m.width(word)
+        test_w = m.join_width(cur_w, cur, word_w, word)
+        if not cur or test_w <= max_width:
+            cur = f"{cur} {word}" if cur else word
+            cur_w = test_w
+        else:
+            lines.append(cur)
+            cur, cur_w = word, word_w
+    if cur:
+        lines.append(cur)
+    return lines
+
+
+def layout_fits(text, font, box_width, box_height, spacing=1.0):
+    lines = wrap_lines(text, font, box_width)
+    m = metrics_for(font)
+    widest = max((m.width(l) for l in lines), default=0)
+    total_h = len(lines) * line_height(font, spacing)
+    return widest <= box_width and total_h <= box_height, lines
+
+
+def fit_text(text, font_path, box_width, box_height, max_size=96, min_size=16, spacing=1.0):
+    """
+    Busca binária pelo maior tamanho em [min_size, max_size] cujo texto quebrado
+    cabe no box. Se nem min_size couber, devolve min_size mesmo.
+    Retorna (font, lines).
+    """
+    lo, hi = int(min_size), int(max_size)
+    best = None
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        font = get_font(font_path, mid)
+        ok, lines = layout_fits(text, font, box_width, box_height, spacing)
+        if ok:
+            best = (font, lines)
+            lo = mid + 1
+        else:
+            hi = mid - 1
+    if best is None:
+        font = get_font(font_path, min_size)
+        best = (font, wrap_lines(text, font, box_width))
+    return best
@@ -0,0 +1,235 @@
+"""
+text_sprites.py
+
+Cache de camadas de texto já rasterizadas ("sprites"): o bloco da frase ou a
+assinatura, com sombra/contorno, vira uma imagem RGBA que só é composta sobre o
+fundo. A assinatura (igual em todo post) e a mesma frase em outro fundo ou em
+outro formato não são rasterizadas de novo.
+
+A chave é tudo o que muda os pixels da camada: linhas já quebradas (ou seja,
+texto + largura máxima), arquivo/tamanho/eixos da fonte, âncora, posições
+relativas das linhas, cor e sombra. O despejo é LRU limitado em bytes
+(SPRITE_CACHE_MB); com SPRITE_DISK=1 as camadas também vão para cache/sprites/
+(PNG, com a origem no próprio arquivo) e outros processos só as carregam.
+
+A camada sai de uma única rasterização numa máscara L: contorno por max-filter
+e sombra suave por um blur dessa mesma máscara.
+
+Uso:
+    from text_sprites import paste_sprite
+    paste_sprite(img, [((540, 600), "Recomeçar é coragem.")], font, "ma", (255, 255, 255),
+                 shadow={"stroke": 2, "blur": 1.5, "color": (0, 0, 0, 220)})
+"""
+
+import hashlib
+import math
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, PngImagePlugin
+
+SPRITE_DIR = os.path.join("cache", "sprites")
+SPRITE_CACHE_MB = float(os.getenv("SPRITE_CACHE_MB", "64"))     # teto da memória do cache
+SPRITE_DISK = os.getenv("SPRITE_DISK", "0") == "1"              # persistir em SPRITE_DIR
+SPRITE_VERSION = 1          # incremente se mudar o desenho da camada
+
+_PROBE = Image.new("L", (1, 1))
+_SPRITES = OrderedDict()    # chave -> (sprite RGBA, (ox, oy))
+_LOCK = threading.Lock()
+_STATS = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "bytes": 0}
+
+
+# ---------- máscaras ----------
+
+def _scaled(mask, alpha):
+    return mask if alpha >= 255 else mask.point([v * alpha // 255 for v in range(256)])
+
+
+def dilate(mask, radius):
+    """
+    Max-filter quadrado (2r+1)x(2r+1) separável em NumPy: mesmo resultado do
+    ImageFilter.MaxFilter, sem o custo do rank filter do PIL.
+    """
+    src = np.asarray(mask)
+    out = src.copy()
+    for d in range(1, radius + 1):
+        np.maximum(out[:, d:], src[:, :-d], out=out[:, d:])
+        np.maximum(out[:, :-d], src[:, d:], out=out[:, :-d])
+    rows = out.copy()
+    for d in range(1, radius + 1):
+        np.maximum(out[d:], rows[:-d], out=out[d:])
+        np.maximum(out[:-d], rows[d:], out=out[:-d])
+    return Image.fromarray(out)
+
+
+def _shadow_pad(shadow):
+    if not shadow:
+        return 0
+    dx, dy = shadow.get("offset", (0, 0))
+    return shadow.get("stroke", 0) + math.ceil(3 * shadow.get("blur", 0)) + max(abs(dx), abs(dy))
+
+
+def text_masks(items, font, anchor, shadow=None):
+    """
+    Rasteriza as linhas UMA vez numa máscara L recortada ao bbox do bloco e deriva
+    dela a sombra: contorno por max-filter (stroke) e suavização por um único
+    GaussianBlur (blur). Devolve (origem, máscara, máscara_da_sombra ou None).
+    """
+    probe = ImageDraw.Draw(_PROBE)          # textbbox só usa as métricas da fonte
+    boxes = [probe.textbbox(pos, line, font=font, anchor=anchor) for pos, line in items]
+    pad = _shadow_pad(shadow)
+    left = math.floor(min(b[0] for b in boxes)) - pad
+    top = math.floor(min(b[1] for b in boxes)) - pad
+    right = math.ceil(max(b[2] for b in boxes)) + pad
+    bottom = math.ceil(max(b[3] for b in boxes)) + pad
+
+    mask = Image.new("L", (max(1, right - left), max(1, bottom - top)), 0)
+    draw = ImageDraw.Draw(mask)
+    for (x, y), line in items:
+        draw.text((x - left, y - top), line, font=font, fill=255, anchor=anchor)
+
+    shadow_mask = None
+    if shadow:
+        shadow_mask = mask
+        if shadow.get("stroke"):
+            shadow_mask = dilate(shadow_mask, int(shadow["stroke"]))
+        if shadow.get("blur"):
+            shadow_mask = shadow_mask.filter(ImageFilter.GaussianBlur(shadow["blur"]))
+    return (left, top), mask, shadow_mask
+
+
+def build_sprite(items, font, anchor, color, shadow=None):
+    """Camada RGBA (sombra por baixo, texto por cima) e sua origem relativa às posições de `items`."""
+    origin, mask, shadow_mask = text_masks(items, font, anchor, shadow)
+    sprite = Image.new("RGBA", mask.size, (0, 0, 0, 0))
+    if shadow_mask is not None:
+        scolor = tuple(shadow["color"])
+        layer = Image.new("RGBA", mask.size, scolor[:3] + (0,))
+        layer.putalpha(_scaled(shadow_mask, scolor[3] if len(scolor) > 3 else 255))
+        dx, dy = shadow.get("offset", (0, 0))
+        if dx or dy:
+            shifted = Image.new("RGBA", mask.size, scolor[:3] + (0,))
+            shifted.paste(layer, (dx, dy))
+            layer = shifted
+        sprite = layer
+    color = tuple(color)
+    fill = Image.new("RGBA", mask.size, color[:3] + (0,))
+    fill.putalpha(_scaled(mask, color[3] if len(color) > 3 else 255))
+    return Image.alpha_composite(sprite, fill), origin
+
+
+# ---------- cache ----------
+
+def _font_key(font):
+    # axes_key vem do font_cache (eixos de variação aplicados na fonte compartilhada)
+    path = getattr(font, "path", None)
+    return (path or repr(font), getattr(font, "size", 0), getattr(font, "index", 0),
+            getattr(font, "axes_key", ()))
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def sprite_key(rel_items, font, anchor, color, shadow=None):
+    return (_font_key(font), anchor, tuple(rel_items), _freeze(color), _freeze(shadow))
+
+
+def _disk_path(key, font):
+    h = hashlib.sha256(repr((SPRITE_VERSION, key)).encode("utf-8"))
+    path = getattr(font, "path", None)
+    if path and os.path.exists(path):
+        st = os.stat(path)                  # fonte trocada no disco = outra chave
+        h.update(f"{st.st_size}:{st.st_mtime_ns}".encode())
+    return os.path.join(SPRITE_DIR, h.hexdigest()[:32] + ".png")
+
+
+def _load_disk(path):
+    try:
+        with Image.open(path) as img:
+            img.load()
+            ox, oy = (int(v) for v in img.info["origin"].split(","))
+            return img.convert("RGBA") if img.mode != "RGBA" else img.copy(), (ox, oy)
+    except Exception:
+        return None
+
+
+def _save_disk(path, sprite, origin):
+    try:
+        os.makedirs(SPRITE_DIR, exist_ok=True)
+        info = PngImagePlugin.PngInfo()
+        info.add_text("origin", f"{origin[0]},{origin[1]}")
+        fd, tmp = tempfile.mkstemp(dir=SPRITE_DIR, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            sprite.save(f, format="PNG", pnginfo=info, compress_level=1)
+        os.replace(tmp, path)
+    except Exception:
+        pass
+
+
+def _remember(key, entry):
+    sprite = entry[0]
+    size = sprite.width * sprite.height * 4
+    limit = SPRITE_CACHE_MB * 1024 * 1024
+    with _LOCK:
+        if key in _SPRITES:
+            return
+        _SPRITES[key] = entry
+        _STATS["bytes"] += size
+        while _STATS["bytes"] > limit and len(_SPRITES) > 1:
+            _, (old, _) = _SPRITES.popitem(last=False)
+            _STATS["bytes"] -= old.width * old.height * 4
+            _STATS["evictions"] += 1
+
+
+def get_sprite(items, font, anchor, color, shadow=None, disk=None):
+    """
+    (sprite, (x, y)): camada RGBA de `items` e onde colá-la. As posições podem
+    mudar (outro fundo, outro formato); enquanto o bloco for igual, a camada é a mesma.
+    """
+    x0, y0 = round(items[0][0][0]), round(items[0][0][1])
+    rel = [((round(x) - x0, round(y) - y0), line) for (x, y), line in items]
+    key = sprite_key(rel, font, anchor, color, shadow)
+    with _LOCK:
+        entry = _SPRITES.get(key)
+        if entry is not None:
+            _SPRITES.move_to_end(key)
+            _STATS["hits"] += 1
+    disk = SPRITE_DISK if disk is None else disk
+    if entry is None:
+        path = _disk_path(key, font) if disk else None
+        entry = _load_disk(path) if path and os.path.exists(path) else None
+        if entry is not None:
+            _STATS["disk_hits"] += 1
+        else:
+            _STATS["misses"] += 1
+            entry = build_sprite(rel, font, anchor, color, shadow)
+            if path:
+                _save_disk(path, *entry)
+        _remember(key, entry)
+    sprite, (ox, oy) = entry
+    return sprite, (x0 + ox, y0 + oy)
+
+
+def paste_sprite(img, items, font, anchor, color, shadow=None):
+    """Compõe a camada de texto (do cache) sobre `img` (RGB ou RGBA), no lugar."""
+    sprite, pos = get_sprite(items, font, anchor, color, shadow)
+    img.paste(sprite, pos, sprite)
+
+
+def sprite_cache_stats():
+    with _LOCK:
+        return dict(_STATS, size=len(_SPRITES))
+
+
+def clear_sprite_cache():
+    with _LOCK:
+        _SPRITES.clear()
+        _STATS["bytes"] = 0
@@ -0,0 +1,111 @@
+"""
+upload_cache.py
+
+Cache de uploads endereçado por conteúdo. A chave é o SHA-256 dos bytes da
+imagem (+ destino: URL de upload e preset), e o valor é o que o Cloudinary
+devolveu: secure_url, public_id, tamanho, quando subiu e quando expira.
+
+Antes de cada upload procuramos o hash aqui; achou e não expirou, usamos a URL
+que já está hospedada. Retry depois de falha no Instagram ou repostar a mesma
+imagem não manda nenhum byte de novo.
+
+Fica em cache/uploads.db (SQLite WAL), compartilhado por todos os scripts e
+processos.
+
+Uso:
+    conn = open_upload_cache()
+    hit = lookup(conn, sha, target)     # dict ou None
+    store(conn, sha, target, resposta_do_cloudinary)
+"""
+
+import hashlib
+import os
+import sqlite3
+import sys
+import time
+
+UPLOAD_CACHE_DB = os.path.join("cache", "uploads.db")
+UPLOAD_TTL = float(os.getenv("UPLOAD_CACHE_TTL_DAYS", "30")) * 86400   # validade de uma URL (s)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploads (
+    sha256      TEXT NOT NULL,
+    target      TEXT NOT NULL,      -- URL de upload + preset (contas diferentes não se misturam)
+    secure_url  TEXT NOT NULL,
+    public_id   TEXT,
+    bytes       INTEGER,
+    uploaded_at REAL NOT NULL,
+    expires_at  REAL NOT NULL,
+    hits        INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (sha256, target)
+) WITHOUT ROWID;
+"""
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def target_key(upload_url, preset=None):
+    return f"{upload_url}|{preset or ''}"
+
+
+def open_upload_cache(db_path=UPLOAD_CACHE_DB):
+    if os.path.dirname(db_path):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=30000")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def lookup(conn, sha, target, now=None):
+    """Upload ainda válido para este conteúdo/destino, ou None."""
+    now = time.time() if now is None else now
+    row = conn.execute(
+        "SELECT secure_url, public_id, bytes, uploaded_at, expires_at FROM uploads "
+        "WHERE sha256 = ? AND target = ? AND expires_at > ?", (sha, target, now)
+    ).fetchone()
+    if row is None:
+        return None
+    conn.execute("UPDATE uploads SET hits = hits + 1 WHERE sha256 = ? AND target = ?", (sha, target))
+    return {"secure_url": row[0], "public_id": row[1], "bytes": row[2],
+            "uploaded_at": row[3], "expires_at": row[4]}
+
+
+def store(conn, sha, target, response, ttl=UPLOAD_TTL, now=None):
+    """Guarda a resposta do Cloudinary (precisa ter secure_url ou url)."""
+    url = response.get("secure_url") or response.get("url")
+    if not url:
+        return
+    now = time.time() if now is None else now
+    conn.execute(
+        "INSERT OR REPLACE INTO uploads (sha256, target, secure_url, public_id, bytes, uploaded_at, expires_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (sha, target, url, response.get("public_id"), response.get("bytes"), now, now + ttl),
+    )
+
+
+def forget(conn, sha, target=None):
+    """Invalida um conteúdo (ex.: a URL sumiu do Cloudinary)."""
+    if target is None:
+        conn.execute("DELETE FROM uploads WHERE sha256 = ?", (sha,))
+    else:
+        conn.execute("DELETE FROM uploads WHERE sha256 = ? AND target = ?", (sha, target))
+
+
+def prune(conn, now=None):
+    now = time.time() if now is None else now
+    return conn.execute("DELETE FROM uploads WHERE expires_at <= ?", (now,)).rowcount
+
+
+if __name__ == "__main__":
+    conn = open_upload_cache(sys.argv[1] if len(sys.argv) > 1 else UPLOAD_CACHE_DB)
+    removed = prune(conn)
+    total, hits, saved = conn.execute(
+        "SELECT COUNT(*), COALESCE(SUM(hits), 0), COALESCE(SUM(hits * bytes), 0) FROM uploads"
+    ).fetchone()
+    print(f"☁️ Upload cache: {total} imagens, {hits} reaproveitamentos "
+          f"({saved / 1e6:.1f} MB não reenviados), {removed} expiradas removidas")